@@ -0,0 +1,207 @@
+# Las nueve preguntas de problema.md y sus consultas sobre el modelo estrella.
+# Fuente única para Tests.ipynb y el reporte (src/analysis/reporte.py), que también
+# abren sus conexiones y consultan la caché con las mismas funciones (conectar, consultar).
+from ..utils.partitions import connect_dw, needs_decoding
+from .query_cache import query_dw
+
+CONSULTAS = {
+    "p1": {
+        "pregunta": "1. ¿En qué meses del año los clientes solicitan más servicios de mensajería?",
+        "sql": """
+            SELECT
+                df.Ano,
+                df.Nombre_Mes,
+                COUNT(DISTINCT f.Servicio_ID_Operacional) AS Total_Servicios
+            FROM Fact_Cambio_Estado_Servicio f
+            JOIN Dim_Fecha df ON f.Fecha_Key = df.Fecha_Key
+            GROUP BY df.Ano, df.Nombre_Mes, df.Numero_Mes
+            ORDER BY df.Ano, df.Numero_Mes;
+        """
+    },
+    "p2": {
+        "pregunta": "2. ¿Cuáles son los días donde más solicitudes hay?",
+        "sql": """
+            SELECT
+                df.Nombre_Dia_Semana,
+                COUNT(DISTINCT f.Servicio_ID_Operacional) AS Total_Servicios
+            FROM Fact_Cambio_Estado_Servicio f
+            JOIN Dim_Fecha df ON f.Fecha_Key = df.Fecha_Key
+            JOIN Dim_Estado_Servicio des ON f.Estado_Servicio_Key = des.Estado_Servicio_Key
+            WHERE des.Nombre_Estado = 'Iniciado'
+            GROUP BY df.Numero_Dia_Semana, df.Nombre_Dia_Semana
+            ORDER BY df.Numero_Dia_Semana;
+        """
+    },
+    "p3": {
+        "pregunta": "3. ¿A qué hora los mensajeros están más ocupados?",
+        "sql": """
+            SELECT
+                dh.Hora_Del_Dia,
+                COUNT(DISTINCT f.Servicio_ID_Operacional) AS Total_Servicios
+            FROM Fact_Cambio_Estado_Servicio f
+            JOIN Dim_Hora dh ON f.Hora_Key = dh.Hora_Key
+            JOIN Dim_Estado_Servicio des ON f.Estado_Servicio_Key = des.Estado_Servicio_Key
+            WHERE des.Nombre_Estado = 'Iniciado'
+            GROUP BY dh.Hora_Del_Dia
+            ORDER BY dh.Hora_Del_Dia;
+        """
+    },
+    "p4": {
+        "pregunta": "4. Número de servicios solicitados por cliente y por mes",
+        "sql": """
+            SELECT
+                dc.Nombre_Cliente,
+                df.Ano,
+                df.Nombre_Mes,
+                df.Numero_Mes,
+                COALESCE(COUNT(DISTINCT CASE WHEN f.Servicio_ID_Operacional IS NOT NULL THEN f.Servicio_ID_Operacional END), 0) AS Total_Servicios
+            FROM Dim_Cliente dc
+            CROSS JOIN (
+                SELECT DISTINCT Ano, Nombre_Mes, Numero_Mes, Fecha_Key
+                FROM Dim_Fecha
+                WHERE Fecha_Key IN (SELECT DISTINCT Fecha_Key FROM Fact_Cambio_Estado_Servicio)
+            ) df
+            LEFT JOIN Fact_Cambio_Estado_Servicio f ON dc.Cliente_Key = f.Cliente_Key
+                AND df.Fecha_Key = f.Fecha_Key
+            GROUP BY dc.Nombre_Cliente, df.Ano, df.Nombre_Mes, df.Numero_Mes
+            ORDER BY dc.Nombre_Cliente, df.Ano, df.Numero_Mes;
+        """
+    },
+    "p5": {
+        "pregunta": "5. Mensajeros más eficientes (los que más servicios prestan)",
+        "sql": """
+            SELECT
+                dm.Nombre_Mensajero,
+                COUNT(DISTINCT f.Servicio_ID_Operacional) AS Total_Servicios_Prestados
+            FROM Fact_Cambio_Estado_Servicio f
+            JOIN Dim_Mensajero dm ON f.Mensajero_Key = dm.Mensajero_Key
+            WHERE f.Mensajero_Key IS NOT NULL
+            GROUP BY dm.Nombre_Mensajero
+            ORDER BY Total_Servicios_Prestados DESC
+            LIMIT 15;
+        """
+    },
+    "p6": {
+        "pregunta": "6. ¿Cuáles son las sedes que más servicios solicitan por cada cliente?",
+        "sql": """
+            SELECT
+                dc.Nombre_Cliente,
+                ds.Nombre_Sede,
+                COUNT(DISTINCT f.Servicio_ID_Operacional) AS Total_Servicios
+            FROM Fact_Cambio_Estado_Servicio f
+            JOIN Dim_Sede ds ON f.Sede_Origen_Key = ds.Sede_Key
+            JOIN Dim_Cliente dc ON ds.Cliente_Key = dc.Cliente_Key
+            GROUP BY dc.Nombre_Cliente, ds.Nombre_Sede
+            ORDER BY Total_Servicios DESC
+            LIMIT 20;
+        """
+    },
+    "p7": {
+        "pregunta": "7. ¿Cuál es el tiempo promedio de entrega desde que se solicita el servicio hasta que se cierra el caso?",
+        "sql": """
+            WITH TiemposExtremos AS (
+                SELECT
+                    Servicio_ID_Operacional,
+                    MIN(Timestamp_Estado) AS Inicio_Servicio,
+                    MAX(CASE WHEN des.Nombre_Estado = 'Terminado completo' THEN f.Timestamp_Estado END) AS Fin_Servicio
+                FROM Fact_Cambio_Estado_Servicio f
+                JOIN Dim_Estado_Servicio des ON f.Estado_Servicio_Key = des.Estado_Servicio_Key
+                GROUP BY Servicio_ID_Operacional
+                HAVING Fin_Servicio IS NOT NULL
+            ),
+            DuracionTotal AS (
+               SELECT (julianday(Fin_Servicio) - julianday(Inicio_Servicio)) * 24 AS Tiempo_Total_Horas FROM TiemposExtremos
+            )
+            SELECT AVG(Tiempo_Total_Horas) AS Tiempo_Promedio_Total_Horas
+            FROM DuracionTotal
+            WHERE Tiempo_Total_Horas >= 0 AND Tiempo_Total_Horas < 1000; -- Filtro atípicos
+        """
+    },
+    "p8": {
+        "pregunta": "8. Tiempos de espera por cada fase del servicio. ¿En qué fase hay más demoras?",
+        "sql": """
+            WITH TimestampsOrdenados AS (
+                SELECT
+                    Servicio_ID_Operacional,
+                    des.Nombre_Estado,
+                    f.Timestamp_Estado,
+                    LAG(f.Timestamp_Estado, 1, 0) OVER (
+                        PARTITION BY f.Servicio_ID_Operacional
+                        ORDER BY des.Orden_Estado, f.Timestamp_Estado
+                    ) AS Timestamp_Anterior,
+                    LAG(des.Nombre_Estado, 1, 'Solicitado') OVER (
+                        PARTITION BY f.Servicio_ID_Operacional
+                        ORDER BY des.Orden_Estado, f.Timestamp_Estado
+                    ) AS Estado_Anterior
+                FROM Fact_Cambio_Estado_Servicio f
+                JOIN Dim_Estado_Servicio des ON f.Estado_Servicio_Key = des.Estado_Servicio_Key
+            ),
+            DuracionFases AS (
+                SELECT
+                    Estado_Anterior,
+                    Nombre_Estado AS Estado_Actual,
+                    (julianday(Timestamp_Estado) - julianday(Timestamp_Anterior)) * 24 AS Duracion_Horas
+                FROM TimestampsOrdenados
+                WHERE Timestamp_Anterior != 0
+            )
+            SELECT
+                Estado_Anterior || ' -> ' || Estado_Actual AS Fase,
+                AVG(Duracion_Horas) AS Tiempo_Promedio_Horas
+            FROM DuracionFases
+            WHERE Duracion_Horas >= 0
+              AND Duracion_Horas < 500 -- Filtro para valores atípicos
+              AND Estado_Anterior != Estado_Actual -- Ignorar transiciones al mismo estado
+            GROUP BY Fase
+            ORDER BY Tiempo_Promedio_Horas DESC;
+        """
+    },
+    "p9": {
+        "pregunta": "9. ¿Cuáles son las novedades que más se presentan durante la prestación del servicio?",
+        "sql": """
+            SELECT
+                dn.Descripcion_Novedad,
+                COUNT(*) AS Total_Ocurrencias
+            FROM Fact_Novedad_Servicio f
+            JOIN Dim_Novedad dn ON f.Novedad_Key = dn.Novedad_Key
+            GROUP BY dn.Descripcion_Novedad
+            ORDER BY Total_Ocurrencias DESC;
+        """
+    }
+}
+
+def conectar(clave, archivos=None):
+    """
+    Abre la conexión con la que se ejecuta una pregunta: la vista de hechos solo
+    decodifica Direccion_Destino si la consulta la usa (needs_decoding). El
+    contexto de la conexión forma parte de la clave de la caché de consultas, así
+    que el notebook y el reporte comparten las entradas de cada pregunta.
+
+    Args:
+        clave (str): Pregunta ('p1' a 'p9')
+        archivos (dict): Archivos de partición ya resueltos por otra conexión de
+            la misma versión del DW (ver connect_dw; None = se leen del catálogo)
+
+    Returns:
+        ConexionDW: Conexión de solo lectura al DW
+    """
+    return connect_dw(decodificar=needs_decoding(CONSULTAS[clave]["sql"]), archivos=archivos)
+
+def consultar(clave, connection=None, cache=None):
+    """
+    Ejecuta una pregunta a través de la caché de consultas.
+
+    Args:
+        clave (str): Pregunta ('p1' a 'p9')
+        connection (ConexionDW): Conexión abierta con conectar (None = se abre y se cierra aquí)
+        cache (QueryCache): Caché a usar (None = la caché por defecto)
+
+    Returns:
+        pd.DataFrame: Resultado de la consulta
+    """
+    if connection is not None:
+        return query_dw(CONSULTAS[clave]["sql"], connection, cache)
+    connection = conectar(clave)
+    try:
+        return query_dw(CONSULTAS[clave]["sql"], connection, cache)
+    finally:
+        connection.close()
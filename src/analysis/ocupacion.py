@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+MINUTOS_POR_DIA = 1440
+
+def timestamps_a_minutos(serie):
+    """
+    Convierte una columna de timestamps a minutos enteros desde la época Unix.
+
+    Args:
+        serie (pd.Series): Timestamps (datetime64 o texto ISO)
+
+    Returns:
+        np.ndarray: Minutos desde 1970-01-01 (int64)
+    """
+    valores = pd.to_datetime(serie, format="ISO8601").to_numpy()
+    return valores.astype("datetime64[m]").astype(np.int64)
+
+def calcular_segmentos(mensajero, inicio, fin):
+    """
+    Barrido (sweep-line) vectorizado sobre intervalos de servicios activos.
+
+    Cada intervalo [inicio, fin) aporta +1 en su minuto de inicio y -1 en su minuto
+    de fin. Los eventos se ordenan por (mensajero, minuto) y se acumulan con un único
+    cumsum: como los eventos de cada mensajero suman cero, el acumulado global es
+    exactamente la concurrencia de cada mensajero. No hay bucles por servicio.
+
+    Args:
+        mensajero (array): Clave del mensajero de cada intervalo
+        inicio (array): Minuto de inicio de cada intervalo (int64)
+        fin (array): Minuto de fin (exclusivo) de cada intervalo (int64)
+
+    Returns:
+        tuple: Arrays (mensajero, desde, hasta, activos) de los segmentos con
+        concurrencia constante y mayor que cero
+    """
+    mensajero = np.asarray(mensajero, dtype=np.int64)
+    inicio = np.asarray(inicio, dtype=np.int64)
+    fin = np.asarray(fin, dtype=np.int64)
+    validos = fin > inicio
+    mensajero, inicio, fin = mensajero[validos], inicio[validos], fin[validos]
+
+    n = len(mensajero)
+    if n == 0:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, vacio, vacio
+
+    m = np.concatenate([mensajero, mensajero])
+    t = np.concatenate([inicio, fin])
+    delta = np.concatenate([np.ones(n, dtype=np.int64), -np.ones(n, dtype=np.int64)])
+
+    orden = np.lexsort((t, m))
+    m, t, delta = m[orden], t[orden], delta[orden]
+
+    # Agrupar eventos del mismo mensajero en el mismo minuto
+    nuevo = np.ones(len(m), dtype=bool)
+    nuevo[1:] = (m[1:] != m[:-1]) | (t[1:] != t[:-1])
+    grupo = np.cumsum(nuevo) - 1
+    delta = np.bincount(grupo, weights=delta).astype(np.int64)
+    m, t = m[nuevo], t[nuevo]
+
+    activos = np.cumsum(delta)
+
+    # El segmento i cubre [t[i], t[i+1]) si ambos eventos son del mismo mensajero
+    mismo_mensajero = m[:-1] == m[1:]
+    seleccion = mismo_mensajero & (activos[:-1] > 0)
+    return m[:-1][seleccion], t[:-1][seleccion], t[1:][seleccion], activos[:-1][seleccion]
+
+def ocupacion_por_minuto(desde, hasta, activos, minuto_minimo=None):
+    """
+    Agrega los segmentos de todos los mensajeros a granularidad de minuto usando
+    arreglos de diferencias (dos bincount y un cumsum).
+
+    Args:
+        desde (array): Minuto de inicio de cada segmento
+        hasta (array): Minuto de fin (exclusivo) de cada segmento
+        activos (array): Servicios activos en cada segmento
+        minuto_minimo (int): Si se indica, se descartan los minutos anteriores
+
+    Returns:
+        pd.DataFrame: Columnas Minuto, Servicios_Activos y Mensajeros_Ocupados (solo minutos con actividad)
+    """
+    columnas = ["Minuto", "Servicios_Activos", "Mensajeros_Ocupados"]
+    if len(desde) == 0:
+        return pd.DataFrame(columns=columnas)
+
+    base = int(desde.min())
+    largo = int(hasta.max()) - base + 1
+    d_inicio, d_fin = desde - base, hasta - base
+
+    servicios = np.cumsum(
+        np.bincount(d_inicio, weights=activos, minlength=largo) - np.bincount(d_fin, weights=activos, minlength=largo)
+    )
+    mensajeros = np.cumsum(np.bincount(d_inicio, minlength=largo) - np.bincount(d_fin, minlength=largo))
+
+    minutos = base + np.arange(largo, dtype=np.int64)
+    seleccion = servicios > 0
+    if minuto_minimo is not None:
+        seleccion &= minutos >= minuto_minimo
+
+    return pd.DataFrame({
+        "Minuto": minutos[seleccion],
+        "Servicios_Activos": servicios[seleccion].astype(np.int64),
+        "Mensajeros_Ocupados": mensajeros[seleccion].astype(np.int64)
+    })
+
+def ocupacion_por_hora(mensajero, desde, hasta, activos, minuto_minimo=None):
+    """
+    Agrega los segmentos a granularidad de hora por mensajero. Cada segmento se
+    parte en los tramos de hora que cubre (np.repeat) y se agrupa por (mensajero, hora).
+
+    Args:
+        mensajero (array): Clave del mensajero de cada segmento
+        desde (array): Minuto de inicio de cada segmento
+        hasta (array): Minuto de fin (exclusivo) de cada segmento
+        activos (array): Servicios activos en cada segmento
+        minuto_minimo (int): Si se indica, se descartan los minutos anteriores
+
+    Returns:
+        pd.DataFrame: Columnas Mensajero_Key, Hora (horas desde la época), Minutos_Ocupado,
+        Servicios_Activos_Promedio y Servicios_Activos_Max
+    """
+    if minuto_minimo is not None:
+        desde = np.maximum(desde, minuto_minimo)
+        seleccion = hasta > desde
+        mensajero, desde, hasta, activos = mensajero[seleccion], desde[seleccion], hasta[seleccion], activos[seleccion]
+
+    hora_inicio = desde // 60
+    horas_por_segmento = (hasta - 1) // 60 - hora_inicio + 1
+    indice = np.repeat(np.arange(len(desde)), horas_por_segmento)
+    desplazamiento = np.arange(len(indice)) - np.repeat(np.cumsum(horas_por_segmento) - horas_por_segmento, horas_por_segmento)
+    hora = hora_inicio[indice] + desplazamiento
+
+    minutos = np.minimum(hasta[indice], (hora + 1) * 60) - np.maximum(desde[indice], hora * 60)
+    df = pd.DataFrame({
+        "Mensajero_Key": mensajero[indice],
+        "Hora": hora,
+        "Minutos_Ocupado": minutos,
+        "Servicio_Minutos": minutos * activos[indice],
+        "Servicios_Activos_Max": activos[indice]
+    })
+    df = df.groupby(["Mensajero_Key", "Hora"], sort=True).agg(
+        Minutos_Ocupado=("Minutos_Ocupado", "sum"),
+        Servicio_Minutos=("Servicio_Minutos", "sum"),
+        Servicios_Activos_Max=("Servicios_Activos_Max", "max")
+    ).reset_index()
+    df["Servicios_Activos_Promedio"] = df["Servicio_Minutos"] / 60
+    return df.drop(columns="Servicio_Minutos")
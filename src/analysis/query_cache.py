@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from ..utils.etl_runs import get_load_version
+from ..utils.file_locks import lock_file, unlock_file
+
+DEFAULT_CACHE_DIR = ".cache_consultas"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def normalize_sql(sql_query):
+    """
+    Normaliza una consulta para usarla como clave de caché: elimina comentarios,
+    colapsa espacios y quita el ';' final. No cambia mayúsculas para no alterar
+    literales de texto.
+
+    Args:
+        sql_query (str): Consulta SQL
+
+    Returns:
+        str: Consulta normalizada
+    """
+    sin_comentarios = re.sub(r"/\*.*?\*/", " ", sql_query, flags=re.S)
+    sin_comentarios = re.sub(r"--[^\n]*", " ", sin_comentarios)
+    return re.sub(r"\s+", " ", sin_comentarios).strip().rstrip(";").strip()
+
+class QueryCache:
+    """
+    Caché en disco (Parquet) de resultados de consultas al DW.
+
+    La clave combina la consulta normalizada, sus parámetros, la versión de carga
+    del DW (Run_ID de la última ejecución del ETL que cargó datos) y el contexto de
+    la conexión. Cuando aparece una versión nueva, todas las entradas se invalidan.
+    El tamaño total se limita con desalojo LRU. Varios procesos pueden compartir el
+    directorio: el índice solo se lee y modifica bajo un bloqueo de archivo.
+    """
+
+    def __init__(self, directorio=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._ruta_indice = os.path.join(directorio, "index.json")
+        self._ruta_bloqueo = os.path.join(directorio, "index.lock")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        os.makedirs(directorio, exist_ok=True)
+        with self._bloqueo():
+            pass
+
+    @contextmanager
+    def _bloqueo(self):
+        """
+        Sección crítica sobre el índice: serializa los hilos del proceso (RLock) y
+        los procesos que comparten el directorio (bloqueo exclusivo de index.lock).
+        Al entrar el índice se relee de disco, así ningún proceso sobrescribe con
+        una copia vieja las entradas que agregó otro. No es reentrante.
+        """
+        with self._lock:
+            with open(self._ruta_bloqueo, "a+b") as f:
+                lock_file(f)
+                try:
+                    self._indice = self._leer_indice()
+                    yield
+                finally:
+                    unlock_file(f)
+
+    def _leer_indice(self):
+        """
+        Lee el índice de entradas desde disco.
+        """
+        if os.path.exists(self._ruta_indice):
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                return json.load(f)
+        return {"version": None, "entradas": {}}
+
+    def _guardar_indice(self):
+        """
+        Escribe el índice de entradas en disco de forma atómica (llamar dentro de _bloqueo).
+        """
+        ruta_tmp = f"{self._ruta_indice}.tmp"
+        with open(ruta_tmp, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f, indent=1)
+        os.replace(ruta_tmp, self._ruta_indice)
+
+    def _borrar_entrada(self, clave):
+        """
+        Elimina una entrada del índice y su archivo Parquet.
+        """
+        entrada = self._indice["entradas"].pop(clave, None)
+        if entrada:
+            ruta = os.path.join(self.directorio, entrada["archivo"])
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def _sincronizar_version(self, version):
+        """
+        Invalida todas las entradas si el DW fue recargado desde la última consulta.
+        """
+        if self._indice["version"] != version:
+            if self._indice["entradas"]:
+                self.invalidations += 1
+            for clave in list(self._indice["entradas"]):
+                self._borrar_entrada(clave)
+            self._indice["version"] = version
+            self._guardar_indice()
+
+    def _desalojar(self):
+        """
+        Elimina las entradas menos usadas recientemente hasta respetar max_bytes.
+        """
+        entradas = self._indice["entradas"]
+        total = sum(e["bytes"] for e in entradas.values())
+        for clave in sorted(entradas, key=lambda c: entradas[c]["ultimo_acceso"]):
+            if total <= self.max_bytes:
+                break
+            total -= entradas[clave]["bytes"]
+            self._borrar_entrada(clave)
+            self.evictions += 1
+
+    def key(self, sql_query, params, version, contexto=None):
+        """
+        Calcula la clave de caché de una consulta. El contexto identifica lo que
+        expone la conexión: una conexión podada por rango de Fecha_Key o sin
+        decodificar puede dar otro resultado para la misma consulta.
+        """
+        contenido = json.dumps([normalize_sql(sql_query), params, version, contexto], default=str)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def query(self, sql_query, conn, params=None):
+        """
+        Retorna el resultado de la consulta desde la caché o, si no está, la ejecuta
+        y guarda el resultado. Si el DW no registra versión de carga la consulta
+        se ejecuta sin caché.
+
+        Args:
+            sql_query (str): Consulta SQL
+            conn (sqlite3.Connection): Conexión al DW
+            params (tuple|dict): Parámetros de la consulta
+
+        Returns:
+            pd.DataFrame: Resultado de la consulta
+        """
+        version = get_load_version(conn)
+        if version is None:
+            with self._lock:
+                self.misses += 1
+            return pd.read_sql_query(sql_query, conn, params=params)
+
+        clave = self.key(sql_query, params, version, self._contexto(conn))
+        with self._bloqueo():
+            self._sincronizar_version(version)
+            entrada = self._indice["entradas"].get(clave)
+            if entrada is not None:
+                ruta = os.path.join(self.directorio, entrada["archivo"])
+                if os.path.exists(ruta):
+                    entrada["ultimo_acceso"] = time.time()
+                    self._guardar_indice()
+                    self.hits += 1
+                    return pd.read_parquet(ruta)
+                self._borrar_entrada(clave)
+                self._guardar_indice()
+            self.misses += 1
+
+        df = pd.read_sql_query(sql_query, conn, params=params)
+
+        # El Parquet se escribe fuera del bloqueo con un nombre propio del proceso/hilo
+        archivo = f"{clave}.parquet"
+        ruta_tmp = os.path.join(self.directorio, f"{clave}.{os.getpid()}_{threading.get_ident()}.tmp")
+        df.to_parquet(ruta_tmp, index=False)
+        with self._bloqueo():
+            if self._indice["version"] != version:
+                os.remove(ruta_tmp)
+            else:
+                ruta = os.path.join(self.directorio, archivo)
+                os.replace(ruta_tmp, ruta)
+                self._indice["entradas"][clave] = {
+                    "archivo": archivo,
+                    "bytes": os.path.getsize(ruta),
+                    "ultimo_acceso": time.time(),
+                    "sql": normalize_sql(sql_query)[:200]
+                }
+                self._desalojar()
+                self._guardar_indice()
+        return df
+
+    @staticmethod
+    def _contexto(conn):
+        """
+        Contexto de la conexión para la clave: el de connect_dw (rango de Fecha_Key,
+        decodificación y archivos/periodos adjuntos) o, para otras conexiones, las
+        bases de datos adjuntas.
+        """
+        contexto = getattr(conn, "contexto", None)
+        if contexto is not None:
+            return contexto
+        return [fila[1] for fila in conn.execute("PRAGMA database_list").fetchall()]
+
+    def stats(self):
+        """
+        Estadísticas de uso de la caché.
+
+        Returns:
+            dict: hits, misses, tasa de acierto, desalojos, invalidaciones, entradas y bytes
+        """
+        with self._bloqueo():
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entradas": len(self._indice["entradas"]),
+                "bytes": sum(e["bytes"] for e in self._indice["entradas"].values()),
+                "version": self._indice["version"]
+            }
+
+    def clear(self):
+        """
+        Elimina todas las entradas de la caché.
+        """
+        with self._bloqueo():
+            for clave in list(self._indice["entradas"]):
+                self._borrar_entrada(clave)
+            self._guardar_indice()
+
+_default_cache = None
+
+def get_default_cache():
+    """
+    Retorna la caché compartida por defecto (se crea en el primer uso).
+
+    Returns:
+        QueryCache: Caché por defecto
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QueryCache()
+    return _default_cache
+
+def query_dw(sql_query, conn, cache=None, params=None):
+    """
+    Ejecuta una consulta y retorna un DataFrame de pandas, reutilizando el
+    resultado en caché si el DW no se ha recargado desde la última ejecución.
+
+    Args:
+        sql_query (str): Consulta SQL
+        conn (sqlite3.Connection): Conexión al DW
+        cache (QueryCache): Caché a usar. Si es None se usa la caché por defecto
+        params (tuple|dict): Parámetros de la consulta
+
+    Returns:
+        pd.DataFrame: Resultado de la consulta
+    """
+    return (cache or get_default_cache()).query(sql_query, conn, params=params)
@@ -0,0 +1,339 @@
+import html
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from ..utils import db_connections
+from ..utils.etl_runs import get_load_version
+from ..utils.planner import leer_recursos
+from .consultas import CONSULTAS, conectar, consultar
+from .query_cache import get_default_cache
+
+# Filas de cada resultado incluidas en la tabla del reporte
+MAX_FILAS_TABLA = 30
+# Directorio del reporte cuando el DW no registra ejecuciones (no se reutilizan gráficos)
+SIN_VERSION = "sin-version"
+# Intentos de abrir las conexiones de las consultas sobre una misma versión del DW
+INTENTOS_VERSION = 3
+
+# --- Gráficos (se dibujan en los procesos del pool, con el backend Agg) ---
+
+def _grafico_p1(df, plt, sns):
+    df = df.assign(Mes_Ano=df['Nombre_Mes'] + ' ' + df['Ano'].astype(str))
+    fig, ax = plt.subplots()
+    sns.barplot(data=df, x='Total_Servicios', y='Mes_Ano', orient='h', palette='plasma', ax=ax)
+    ax.set(title='Volumen de Servicios por Mes', xlabel='Número de Servicios Únicos', ylabel='Mes')
+    return fig
+
+def _grafico_p2(df, plt, sns):
+    fig, ax = plt.subplots()
+    sns.barplot(data=df, x='Nombre_Dia_Semana', y='Total_Servicios', palette='cividis', ax=ax)
+    ax.set(title='Solicitudes de Servicio por Día de la Semana', xlabel='Día de la Semana',
+           ylabel='Número de Servicios Iniciados')
+    ax.tick_params(axis='x', rotation=45)
+    return fig
+
+def _grafico_p3(df, plt, sns):
+    fig, ax = plt.subplots()
+    sns.lineplot(data=df, x='Hora_Del_Dia', y='Total_Servicios', marker='o', color='purple', ax=ax)
+    ax.set(title='Demanda de Servicios por Hora del Día', xlabel='Hora del Día (0-23)',
+           ylabel='Número de Servicios Iniciados')
+    ax.set_xticks(range(0, 24))
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    return fig
+
+def _grafico_p4(df, plt, sns):
+    df = df.assign(Mes_Ano=df['Nombre_Mes'] + ' ' + df['Ano'].astype(str))
+    pivot = df.pivot_table(index='Nombre_Cliente', columns='Mes_Ano', values='Total_Servicios', fill_value=0)
+    # Columnas en orden cronológico
+    orden = df.drop_duplicates('Mes_Ano').sort_values(['Ano', 'Numero_Mes'])['Mes_Ano']
+    pivot = pivot[[c for c in orden if c in pivot.columns]]
+    fig, ax = plt.subplots(figsize=(16, 10))
+    sns.heatmap(pivot, annot=True, fmt='g', cmap='YlGnBu', cbar_kws={'label': 'Número de Servicios'}, ax=ax)
+    ax.set_title('Servicios por Cliente y Mes (todos los clientes)', fontsize=14, fontweight='bold')
+    ax.set(xlabel='Mes', ylabel='Cliente')
+    ax.tick_params(axis='x', rotation=45)
+    ax.tick_params(axis='y', rotation=0)
+    return fig
+
+def _grafico_p5(df, plt, sns):
+    fig, ax = plt.subplots()
+    sns.barplot(data=df, y='Nombre_Mensajero', x='Total_Servicios_Prestados', orient='h', palette='magma', ax=ax)
+    ax.set(title='Top 15 Mensajeros por Servicios Prestados', ylabel='Mensajero', xlabel='Número de Servicios Únicos')
+    return fig
+
+def _grafico_p6(df, plt, sns):
+    df = df.assign(Sede_Cliente=df['Nombre_Sede'] + ' (' + df['Nombre_Cliente'] + ')')
+    fig, ax = plt.subplots(figsize=(12, 10))
+    sns.barplot(data=df, y='Sede_Cliente', x='Total_Servicios', orient='h', palette='inferno', ax=ax)
+    ax.set(title='Top 20 Sedes por Volumen de Servicios Solicitados', ylabel='Sede (Cliente)',
+           xlabel='Número de Servicios Únicos')
+    return fig
+
+def _grafico_p8(df, plt, sns):
+    fig, ax = plt.subplots()
+    sns.barplot(data=df.head(10), y='Fase', x='Tiempo_Promedio_Horas', orient='h', palette='coolwarm', ax=ax)
+    ax.set(title='Top 10 Fases con Mayor Tiempo de Espera Promedio', ylabel='Fase del Servicio',
+           xlabel='Tiempo Promedio (Horas)')
+    return fig
+
+def _grafico_p9(df, plt, sns):
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.pie(df['Total_Ocurrencias'], labels=df['Descripcion_Novedad'], autopct='%1.1f%%', startangle=140,
+           wedgeprops={"edgecolor": "k", 'linewidth': 0.5, 'antialiased': True})
+    ax.set_title('Distribución de Novedades en Servicios')
+    ax.axis('equal')
+    return fig
+
+# Pregunta -> función del gráfico (la 7 es un único valor y no tiene gráfico)
+GRAFICOS = {
+    "p1": _grafico_p1, "p2": _grafico_p2, "p3": _grafico_p3, "p4": _grafico_p4, "p5": _grafico_p5,
+    "p6": _grafico_p6, "p8": _grafico_p8, "p9": _grafico_p9
+}
+
+def _iniciar_worker_graficos():
+    """
+    Inicializa un proceso del pool de gráficos: backend no interactivo (Agg) y el
+    mismo estilo que el notebook.
+    """
+    import warnings
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    warnings.filterwarnings('ignore')
+    plt.style.use('seaborn-v0_8-whitegrid')
+    sns.set_palette("viridis")
+    plt.rcParams['figure.figsize'] = (12, 7)
+    plt.rcParams['font.size'] = 12
+
+def _renderizar_grafico(clave, df, ruta):
+    """
+    Dibuja el gráfico de una pregunta y lo guarda como PNG (se ejecuta en un
+    proceso del pool).
+
+    Returns:
+        float: Segundos empleados
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    inicio = time.perf_counter()
+    fig = GRAFICOS[clave](df, plt, sns)
+    try:
+        fig.tight_layout()
+        fig.savefig(f"{ruta}.tmp.png", dpi=100)
+    finally:
+        plt.close(fig)
+    os.replace(f"{ruta}.tmp.png", ruta)
+    return time.perf_counter() - inicio
+
+def _abrir_conexiones():
+    """
+    Abre una conexión de solo lectura por pregunta, todas sobre la misma versión
+    del DW. Solo la primera lee el catálogo de particiones; las demás adjuntan los
+    mismos archivos. Cada conexión conserva el archivo que abrió aunque una carga
+    publique otro DW (rename), así que basta con que todas registren la misma
+    versión de carga; si una publicación ocurre mientras se abren, se reintenta.
+
+    Returns:
+        tuple: (versión de carga o None, {pregunta: ConexionDW})
+
+    Raises:
+        RuntimeError: Si la versión cambia en todos los intentos
+    """
+    for _ in range(INTENTOS_VERSION):
+        conexiones = {}
+        try:
+            for clave in CONSULTAS:
+                primera = next(iter(conexiones.values()), None)
+                conexiones[clave] = conectar(clave, primera.contexto["archivos"] if primera else None)
+            versiones = {get_load_version(connection) for connection in conexiones.values()}
+        except Exception:
+            _cerrar_conexiones(conexiones)
+            raise
+        if len(versiones) == 1:
+            return versiones.pop(), conexiones
+        _cerrar_conexiones(conexiones)
+    raise RuntimeError(f"El DW se publicó {INTENTOS_VERSION} veces mientras se abrían las conexiones del reporte")
+
+def _cerrar_conexiones(conexiones):
+    for connection in conexiones.values():
+        connection.close()
+
+def _ejecutar_consulta(clave, connection, cache):
+    """
+    Ejecuta la consulta de una pregunta en su conexión (se ejecuta en una hebra;
+    SQLite libera el GIL mientras avanza la consulta).
+
+    Returns:
+        tuple: (resultado, segundos)
+    """
+    inicio = time.perf_counter()
+    df = consultar(clave, connection, cache)
+    return df, time.perf_counter() - inicio
+
+def get_reports_dir():
+    """
+    Directorio de los reportes, junto al DW (un subdirectorio por versión de carga).
+
+    Returns:
+        str: Ruta del directorio (no se crea)
+    """
+    return f"{os.path.splitext(db_connections.DW_PATH)[0]}_reportes"
+
+def _escribir_html(ruta, version, resultados, tiempos):
+    """
+    Escribe el reporte estático: resumen de tiempos y, por pregunta, la tabla de
+    resultados, el gráfico y sus tiempos.
+    """
+    partes = [
+        "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>",
+        "<title>Fast and Safe - Preguntas de negocio</title><style>",
+        "body{font-family:sans-serif;margin:2em auto;max-width:1100px;color:#222}",
+        "table{border-collapse:collapse;margin:.5em 0;font-size:.9em}",
+        "td,th{border:1px solid #ccc;padding:3px 8px;text-align:right}",
+        "img{max-width:100%}.error{color:#b00}.nota{color:#666;font-size:.9em}",
+        "</style></head><body>",
+        "<h1>Fast and Safe - Preguntas de negocio</h1>",
+        f"<p class='nota'>Versión de carga del DW: <b>{html.escape(version)}</b> | "
+        f"Generado: {tiempos['generado']} | Total: {tiempos['segundos_total']:.2f} s "
+        f"(consultas {tiempos['segundos_consultas']:.2f} s, gráficos {tiempos['segundos_graficos']:.2f} s en paralelo) | "
+        f"Caché: {tiempos['cache']['hits']} hits, {tiempos['cache']['misses']} misses</p>",
+        "<table><tr><th>Pregunta</th><th>Consulta (s)</th><th>Filas</th><th>Gráfico (s)</th></tr>"
+    ]
+    for clave in CONSULTAS:
+        consulta, grafico = tiempos["consultas"][clave], tiempos["graficos"].get(clave, {})
+        segundos_grafico = "reutilizado" if grafico.get("reutilizado") else (
+            f"{grafico['segundos']:.3f}" if "segundos" in grafico else "-")
+        partes.append(
+            f"<tr><td><a href='#{clave}'>{clave}</a></td><td>{consulta.get('segundos', 0):.3f}</td>"
+            f"<td>{consulta.get('filas', '-')}</td><td>{segundos_grafico}</td></tr>"
+        )
+    partes.append("</table>")
+
+    for clave, consulta in CONSULTAS.items():
+        partes.append(f"<h2 id='{clave}'>{html.escape(consulta['pregunta'])}</h2>")
+        error = tiempos["consultas"][clave].get("error") or tiempos["graficos"].get(clave, {}).get("error")
+        if error:
+            partes.append(f"<p class='error'>Error: {html.escape(error)}</p>")
+        df = resultados.get(clave)
+        if df is not None:
+            if clave == "p7" and len(df):
+                valor = df.iloc[0, 0]
+                partes.append(f"<p><b>Tiempo promedio de entrega (inicio a cierre):</b> "
+                              f"{'sin datos' if pd.isna(valor) else f'{valor:.2f} horas'}</p>")
+            partes.append(df.head(MAX_FILAS_TABLA).to_html(index=False, float_format=lambda x: f"{x:,.2f}", border=0))
+            if len(df) > MAX_FILAS_TABLA:
+                partes.append(f"<p class='nota'>Primeras {MAX_FILAS_TABLA} de {len(df)} filas.</p>")
+        if clave in tiempos["graficos"] and "error" not in tiempos["graficos"][clave]:
+            partes.append(f"<img src='{clave}.png' alt='{clave}'>")
+    partes.append("</body></html>")
+
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(partes))
+    os.replace(f"{ruta}.tmp", ruta)
+
+def generar_reporte(hebras=None, procesos=None, cache=None, forzar=False):
+    """
+    Genera el reporte estático (HTML + PNG) de las nueve preguntas de negocio
+    para la versión de carga actual del DW, sin notebook ni pantalla.
+
+    Las consultas corren en paralelo en un pool de hebras, cada una con su
+    conexión de solo lectura; las conexiones se abren antes sobre una misma
+    versión del DW (ver _abrir_conexiones), así una publicación a mitad del
+    reporte no mezcla versiones. Pasan por la caché de consultas: si el DW no
+    cambió se leen del Parquet. Cada gráfico se envía a un pool de procesos
+    (backend Agg) en cuanto su consulta termina. Los PNG de una versión ya
+    reportada se reutilizan (la versión identifica los datos).
+
+    Args:
+        hebras (int): Consultas simultáneas (None = una por pregunta)
+        procesos (int): Procesos del pool de gráficos (None = núcleos disponibles)
+        cache (QueryCache): Caché de consultas (None = la caché por defecto)
+        forzar (bool): Vuelve a dibujar los gráficos aunque existan para la versión
+
+    Returns:
+        dict: Tiempos por consulta y por gráfico, total y ruta del reporte
+    """
+    cache = cache or get_default_cache()
+    version, conexiones = _abrir_conexiones()
+    directorio = os.path.join(get_reports_dir(), version or SIN_VERSION)
+    os.makedirs(directorio, exist_ok=True)
+    reutilizar = version is not None and not forzar
+    hebras = max(1, min(hebras or len(CONSULTAS), len(CONSULTAS)))
+    procesos = max(1, min(procesos or leer_recursos()["nucleos"], len(GRAFICOS)))
+    print(f"Generando reporte para la versión {version or SIN_VERSION} "
+          f"(hebras de consulta: {hebras}, procesos de gráficos: {procesos})...")
+
+    stats_inicio = cache.stats()
+    inicio = time.perf_counter()
+    resultados = {}
+    tiempos = {"consultas": {}, "graficos": {}}
+    # 'spawn': los procesos no heredan las conexiones ni los bloqueos de las hebras de consulta
+    contexto = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_iniciar_worker_graficos) as pool, \
+                ThreadPoolExecutor(max_workers=hebras) as executor:
+            pendientes = {executor.submit(_ejecutar_consulta, clave, conexiones[clave], cache): clave
+                          for clave in CONSULTAS}
+            graficos = {}
+            for futuro in as_completed(pendientes):
+                clave = pendientes[futuro]
+                try:
+                    df, segundos = futuro.result()
+                except Exception as e:
+                    tiempos["consultas"][clave] = {"error": str(e)}
+                    print(f"  {clave}: consulta FALLIDA ({e})")
+                    continue
+                resultados[clave] = df
+                tiempos["consultas"][clave] = {"segundos": round(segundos, 3), "filas": len(df)}
+                print(f"  {clave}: consulta en {segundos:.3f} s ({len(df)} filas)")
+
+                if clave not in GRAFICOS or df.empty:
+                    continue
+                ruta = os.path.join(directorio, f"{clave}.png")
+                if reutilizar and os.path.exists(ruta):
+                    tiempos["graficos"][clave] = {"reutilizado": True}
+                    continue
+                graficos[pool.submit(_renderizar_grafico, clave, df, ruta)] = clave
+
+            for futuro in as_completed(graficos):
+                clave = graficos[futuro]
+                try:
+                    segundos = futuro.result()
+                    tiempos["graficos"][clave] = {"segundos": round(segundos, 3)}
+                    print(f"  {clave}: gráfico en {segundos:.3f} s")
+                except Exception as e:
+                    tiempos["graficos"][clave] = {"error": str(e)}
+                    print(f"  {clave}: gráfico FALLIDO ({e})")
+    finally:
+        _cerrar_conexiones(conexiones)
+
+    stats_fin = cache.stats()
+    tiempos.update({
+        "version": version,
+        "generado": datetime.now().isoformat(sep=" ", timespec="seconds"),
+        "segundos_total": round(time.perf_counter() - inicio, 3),
+        "segundos_consultas": round(sum(t.get("segundos", 0) for t in tiempos["consultas"].values()), 3),
+        "segundos_graficos": round(sum(t.get("segundos", 0) for t in tiempos["graficos"].values()), 3),
+        "cache": {
+            "hits": stats_fin["hits"] - stats_inicio["hits"],
+            "misses": stats_fin["misses"] - stats_inicio["misses"]
+        }
+    })
+
+    ruta_html = os.path.join(directorio, "index.html")
+    _escribir_html(ruta_html, version or SIN_VERSION, resultados, tiempos)
+    with open(os.path.join(directorio, "tiempos.json"), "w", encoding="utf-8") as f:
+        json.dump(tiempos, f, indent=1)
+    tiempos["reporte"] = ruta_html
+
+    print(f"Reporte escrito en '{ruta_html}' en {tiempos['segundos_total']:.2f} s "
+          f"(suma de consultas {tiempos['segundos_consultas']:.2f} s, de gráficos {tiempos['segundos_graficos']:.2f} s; "
+          f"caché: {tiempos['cache']['hits']} hits, {tiempos['cache']['misses']} misses).")
+    return tiempos
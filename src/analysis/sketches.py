@@ -0,0 +1,450 @@
+import struct
+import zlib
+import numpy as np
+import pandas as pd
+
+# Precisión de HyperLogLog: m = 2^p registros de 1 byte. Error estándar relativo
+# 1.04 / sqrt(m): p=12 -> 4096 registros, 1.6 % (±3.3 % al 95 %, ±4.9 % al 99.7 %)
+PRECISION = 12
+# En modo 'hll' un sketch guarda los ids exactos hasta este tamaño (error 0) y
+# después pasa a HyperLogLog; en modo 'exacto' nunca pasa a HyperLogLog
+UMBRAL_EXACTO = 256
+MODOS = ("hll", "exacto")
+# Ids exactos (int64) que una unión o un rollup mantiene en memoria antes de pasar
+# a HyperLogLog en modo 'hll': 4M ids = 32 MB
+LIMITE_IDS_UNION = 1 << 22
+# Grupos HyperLogLog que rollup_servicios fusiona a la vez (bloques de 2^p bytes por grupo)
+BLOQUE_GRUPOS_HLL = 4096
+
+# Tabla del DW con un sketch por celda y columnas que definen la celda
+TABLA_SKETCHES = "Fact_Sketch_Servicios"
+COLUMNAS_CELDA = ["Fecha_Key", "Cliente_Key", "Sede_Origen_Key", "Mensajero_Key"]
+
+# Tipos de serialización (primer byte; el bit alto indica contenido comprimido con zlib)
+_TIPO_EXACTO = 1
+_TIPO_HLL_DENSO = 2
+_TIPO_HLL_DISPERSO = 3
+_COMPRIMIDO = 0x80
+_CABECERA = struct.Struct("<BB")
+
+# Constantes de splitmix64 (mezcla de 64 bits para distribuir ids consecutivos)
+_MEZCLA = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+def hash64(ids):
+    """
+    Hash de 64 bits (finalizador de splitmix64) vectorizado sobre ids enteros.
+
+    Args:
+        ids (array): Ids enteros
+
+    Returns:
+        np.ndarray: Hashes uint64
+    """
+    x = np.asarray(ids, dtype=np.int64).astype(np.uint64) + _MEZCLA[0]
+    x = (x ^ (x >> np.uint64(30))) * _MEZCLA[1]
+    x = (x ^ (x >> np.uint64(27))) * _MEZCLA[2]
+    return x ^ (x >> np.uint64(31))
+
+def _bit_length(x):
+    """
+    Número de bits significativos de cada valor uint64 (exacto, sin pasar por float).
+    """
+    x = x.copy()
+    bits = np.zeros(len(x), dtype=np.int64)
+    for desplazamiento in (32, 16, 8, 4, 2, 1):
+        mayor = x >= (np.uint64(1) << np.uint64(desplazamiento))
+        bits[mayor] += desplazamiento
+        x[mayor] >>= np.uint64(desplazamiento)
+    return bits + (x > 0)
+
+def _indice_rho(ids, precision):
+    """
+    Registro (primeros p bits del hash) y posición del primer 1 en los bits
+    restantes para cada id.
+    """
+    h = hash64(ids)
+    resto = 64 - precision
+    indice = (h >> np.uint64(resto)).astype(np.int64)
+    rho = resto - _bit_length(h & ((np.uint64(1) << np.uint64(resto)) - np.uint64(1))) + 1
+    return indice, rho.astype(np.uint8)
+
+def registros_hll(ids, precision=PRECISION):
+    """
+    Registros HyperLogLog de un conjunto de ids: los primeros p bits del hash
+    eligen el registro y se guarda la posición del primer 1 en los bits restantes.
+
+    Args:
+        ids (array): Ids enteros
+        precision (int): Precisión p (4..16)
+
+    Returns:
+        np.ndarray: 2^p registros uint8
+    """
+    registros = np.zeros(1 << precision, dtype=np.uint8)
+    if len(ids) == 0:
+        return registros
+    indice, rho = _indice_rho(ids, precision)
+    np.maximum.at(registros, indice, rho)
+    return registros
+
+def estimar_hll(registros):
+    """
+    Estimación de cardinalidad de HyperLogLog, con conteo lineal para
+    cardinalidades pequeñas (hash de 64 bits: sin corrección de rango alto).
+    Acepta una matriz con un conjunto de registros por fila.
+
+    Returns:
+        float|np.ndarray: Estimación (una por fila si se pasa una matriz)
+    """
+    registros = np.asarray(registros)
+    m = registros.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimacion = alpha * m * m / np.sum(np.ldexp(1.0, -registros.astype(np.int64)), axis=-1)
+    ceros = np.count_nonzero(registros == 0, axis=-1)
+    lineal = m * np.log(m / np.maximum(ceros, 1))
+    estimacion = np.where((estimacion <= 2.5 * m) & (ceros > 0), lineal, estimacion)
+    return float(estimacion) if estimacion.ndim == 0 else estimacion
+
+class SketchServicios:
+    """
+    Sketch de conteo distinto de servicios, fusionable. Guarda los ids exactos
+    mientras el conjunto es pequeño (o siempre, en modo 'exacto') y registros de
+    HyperLogLog cuando crece. La fusión de sketches equivale a la unión de los
+    conjuntos: el conteo de cualquier rollup se obtiene fusionando los sketches de
+    sus celdas, sin volver a leer la tabla de hechos.
+    """
+
+    __slots__ = ("ids", "registros", "modo", "precision")
+
+    def __init__(self, ids=None, registros=None, modo="hll", precision=PRECISION, compactar=True):
+        # compactar=False conserva exacto un conjunto grande (uniones y sketches deserializados)
+        if modo not in MODOS:
+            raise ValueError(f"Modo de sketch desconocido: '{modo}' (modos: {', '.join(MODOS)})")
+        self.ids = ids
+        self.registros = registros
+        self.modo = modo
+        self.precision = precision
+        if self.registros is None and self.ids is None:
+            self.ids = np.empty(0, dtype=np.int64)
+        if compactar and self.registros is None and modo == "hll" and len(self.ids) > UMBRAL_EXACTO:
+            self.registros = registros_hll(self.ids, precision)
+            self.ids = None
+
+    @classmethod
+    def desde_ids(cls, ids, modo="hll", precision=PRECISION):
+        """
+        Crea un sketch a partir de ids (con o sin repetidos).
+        """
+        return cls(np.unique(np.asarray(ids, dtype=np.int64)), None, modo, precision)
+
+    @property
+    def es_exacto(self):
+        return self.registros is None
+
+    def cardinalidad(self):
+        """
+        Número de servicios distintos (exacto o estimado).
+        """
+        return len(self.ids) if self.es_exacto else estimar_hll(self.registros)
+
+    def error_relativo(self):
+        """
+        Error estándar relativo de cardinalidad(): 0 si el sketch es exacto.
+        """
+        return 0.0 if self.es_exacto else 1.04 / np.sqrt(1 << self.precision)
+
+    def merge(self, *otros):
+        """
+        Fusiona este sketch con otros (unión de conjuntos).
+
+        Returns:
+            SketchServicios: Sketch nuevo con la unión
+        """
+        return unir_sketches([self, *otros], self.modo, self.precision)
+
+    def a_bytes(self):
+        """
+        Serializa el sketch para guardarlo en un BLOB de SQLite. Ids exactos como
+        deltas (uint32 o uint64), registros HLL dispersos (índice uint16 + valor) o
+        densos según qué ocupe menos; con zlib solo si reduce el tamaño.
+        """
+        if self.es_exacto:
+            tipo = _TIPO_EXACTO
+            deltas = np.diff(self.ids, prepend=np.int64(0)).astype(np.uint64)
+            ancho = np.uint32 if len(deltas) == 0 or deltas.max() < (1 << 32) else np.uint64
+            cuerpo = bytes([8 if ancho is np.uint64 else 4]) + deltas.astype(ancho).tobytes()
+        else:
+            indices = np.flatnonzero(self.registros)
+            if len(indices) * 3 < len(self.registros):
+                tipo = _TIPO_HLL_DISPERSO
+                cuerpo = indices.astype(np.uint16).tobytes() + self.registros[indices].tobytes()
+            else:
+                tipo = _TIPO_HLL_DENSO
+                cuerpo = self.registros.tobytes()
+        comprimido = zlib.compress(cuerpo, 6)
+        if len(comprimido) < len(cuerpo):
+            tipo, cuerpo = tipo | _COMPRIMIDO, comprimido
+        modo = 0 if self.modo == "hll" else 1
+        return _CABECERA.pack(tipo, self.precision | (modo << 7)) + cuerpo
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        """
+        Reconstruye un sketch serializado con a_bytes().
+        """
+        tipo, precision = _CABECERA.unpack_from(datos)
+        modo = MODOS[precision >> 7]
+        precision &= 0x7F
+        cuerpo = bytes(datos[_CABECERA.size:])
+        if tipo & _COMPRIMIDO:
+            cuerpo = zlib.decompress(cuerpo)
+        tipo &= ~_COMPRIMIDO
+        if tipo == _TIPO_EXACTO:
+            ancho = np.uint64 if cuerpo[0] == 8 else np.uint32
+            ids = np.cumsum(np.frombuffer(cuerpo, dtype=ancho, offset=1).astype(np.int64))
+            return cls(ids, None, modo, precision, compactar=False)
+        if tipo == _TIPO_HLL_DENSO:
+            return cls(None, np.frombuffer(cuerpo, dtype=np.uint8).copy(), modo, precision)
+        if tipo == _TIPO_HLL_DISPERSO:
+            n = len(cuerpo) // 3
+            registros = np.zeros(1 << precision, dtype=np.uint8)
+            registros[np.frombuffer(cuerpo, dtype=np.uint16, count=n)] = np.frombuffer(cuerpo, dtype=np.uint8, offset=2 * n)
+            return cls(None, registros, modo, precision)
+        raise ValueError(f"Tipo de sketch desconocido: {tipo}")
+
+def _registros_de_exactos(exactos, precision):
+    """
+    Registros HyperLogLog de la unión de varios conjuntos de ids, concatenando a
+    lo sumo LIMITE_IDS_UNION ids a la vez (los repetidos no cambian los registros).
+    """
+    registros = np.zeros(1 << precision, dtype=np.uint8)
+    lote, n = [], 0
+    for ids in exactos + [None]:
+        if lote and (ids is None or n + len(ids) > LIMITE_IDS_UNION):
+            np.maximum(registros, registros_hll(np.concatenate(lote), precision), out=registros)
+            lote, n = [], 0
+        if ids is not None:
+            lote.append(ids)
+            n += len(ids)
+    return registros
+
+def unir_sketches(sketches, modo=None, precision=None):
+    """
+    Fusiona varios sketches (objetos o BLOBs serializados) en uno solo. Si todos
+    son exactos la unión sigue siendo exacta (sin importar UMBRAL_EXACTO, que
+    solo limita lo que se guarda por celda) mientras reúna a lo sumo
+    LIMITE_IDS_UNION ids, o siempre en modo 'exacto'.
+
+    Args:
+        sketches (iterable): SketchServicios o bytes
+        modo (str): Modo del resultado (None = el del primer sketch)
+        precision (int): Precisión del resultado (None = la del primer sketch)
+
+    Returns:
+        SketchServicios: Unión de los sketches
+    """
+    sketches = [s if isinstance(s, SketchServicios) else SketchServicios.desde_bytes(s) for s in sketches]
+    if not sketches:
+        return SketchServicios(modo=modo or "hll", precision=precision or PRECISION)
+    modo = modo or sketches[0].modo
+    precision = precision or sketches[0].precision
+    if any(s.precision != precision for s in sketches if not s.es_exacto):
+        raise ValueError("No se pueden fusionar sketches HLL de distinta precisión.")
+
+    exactos = [s.ids for s in sketches if s.es_exacto]
+    densos = [s.registros for s in sketches if not s.es_exacto]
+    if not densos and (modo == "exacto" or sum(len(ids) for ids in exactos) <= LIMITE_IDS_UNION):
+        ids = np.unique(np.concatenate(exactos)) if exactos else np.empty(0, dtype=np.int64)
+        return SketchServicios(ids, None, modo, precision, compactar=False)
+    registros = np.maximum.reduce(densos + [_registros_de_exactos(exactos, precision)])
+    return SketchServicios(None, registros, modo, precision)
+
+def sketches_por_grupo(df, claves, columna_id, modo="hll", precision=PRECISION):
+    """
+    Construye un sketch por combinación de claves.
+
+    Args:
+        df (pd.DataFrame): Filas con las claves y el id a contar
+        claves (list): Columnas que definen la celda (pueden tener nulos)
+        columna_id (str): Columna con el id a contar (ej: 'Servicio_ID_Operacional')
+        modo (str): 'hll' o 'exacto'
+        precision (int): Precisión de HyperLogLog
+
+    Returns:
+        pd.DataFrame: Claves, 'Servicios' (conteo exacto de la celda) y 'Sketch' (BLOB)
+    """
+    df = df[claves + [columna_id]].dropna(subset=[columna_id])
+    if df.empty:
+        return pd.DataFrame(columns=claves + ["Servicios", "Sketch"])
+    grupo = df.groupby(claves, dropna=False, sort=True).ngroup().to_numpy()
+    ids = df[columna_id].to_numpy(dtype=np.int64)
+    orden = np.lexsort((ids, grupo))
+    grupo, ids = grupo[orden], ids[orden]
+
+    # Una fila por (celda, id) y límites de cada celda en el arreglo ordenado
+    nuevo = np.ones(len(ids), dtype=bool)
+    nuevo[1:] = (grupo[1:] != grupo[:-1]) | (ids[1:] != ids[:-1])
+    grupo, ids = grupo[nuevo], ids[nuevo]
+    limites = np.flatnonzero(np.r_[True, grupo[1:] != grupo[:-1], True])
+
+    resultado = df.iloc[orden[nuevo][limites[:-1]]][claves].reset_index(drop=True)
+    resultado["Servicios"] = np.diff(limites)
+    resultado["Sketch"] = [
+        SketchServicios(ids[inicio:fin], None, modo, precision).a_bytes()
+        for inicio, fin in zip(limites[:-1], limites[1:])
+    ]
+    return resultado
+
+def _decodificar_bloque(blobs):
+    """
+    Decodifica en bloque BLOBs serializados con a_bytes(): solo la
+    descompresión zlib recorre los BLOBs en Python; los deltas de los ids
+    exactos se leen y acumulan (cumsum segmentado) sobre un único arreglo.
+
+    Returns:
+        tuple: (fila de cada id, ids exactos, filas HLL, registros de cada fila
+        HLL, modo, precisión)
+    """
+    cabeceras = np.frombuffer(b"".join(bytes(b[:_CABECERA.size]) for b in blobs), dtype=np.uint8).reshape(-1, 2)
+    comprimido = (cabeceras[:, 0] & _COMPRIMIDO) != 0
+    tipos = cabeceras[:, 0] & ~np.uint8(_COMPRIMIDO)
+    modo, precision = MODOS[cabeceras[0, 1] >> 7], int(cabeceras[0, 1] & 0x7F)
+    if np.any(cabeceras[:, 1] & 0x7F != precision) and np.any(tipos != _TIPO_EXACTO):
+        raise ValueError("No se pueden fusionar sketches HLL de distinta precisión.")
+
+    filas_exactas = np.flatnonzero(tipos == _TIPO_EXACTO)
+    cuerpos = [
+        zlib.decompress(blobs[f][_CABECERA.size:]) if comprimido[f] else bytes(blobs[f][_CABECERA.size:])
+        for f in filas_exactas
+    ]
+    datos = np.frombuffer(b"".join(cuerpos), dtype=np.uint8)
+    largos = np.fromiter((len(c) for c in cuerpos), dtype=np.int64, count=len(cuerpos))
+    inicios = np.cumsum(largos) - largos
+    anchos = datos[inicios].astype(np.int64) if len(datos) else np.empty(0, dtype=np.int64)
+    cantidades = (largos - 1) // np.maximum(anchos, 1)
+
+    # Posición en 'datos' del primer byte de cada delta, y valor little-endian de 4 u 8 bytes
+    fila_ids = np.repeat(filas_exactas, cantidades)
+    base = np.cumsum(cantidades) - cantidades
+    j = np.arange(int(cantidades.sum())) - np.repeat(base, cantidades)
+    ancho_ids = np.repeat(anchos, cantidades)
+    posicion = np.repeat(inicios + 1, cantidades) + ancho_ids * j
+    deltas = np.zeros(len(posicion), dtype=np.uint64)
+    for k in range(8):
+        con_byte = ancho_ids > k
+        deltas[con_byte] |= datos[posicion[con_byte] + k].astype(np.uint64) << np.uint64(8 * k)
+    acumulado = np.cumsum(deltas.astype(np.int64))
+    previo = np.r_[0, acumulado][np.repeat(base, cantidades)]
+    ids = acumulado - previo
+
+    filas_hll = np.flatnonzero(tipos != _TIPO_EXACTO)
+    registros = [SketchServicios.desde_bytes(blobs[f]).registros for f in filas_hll]
+    return fila_ids, ids, filas_hll, registros, modo, precision
+
+def rollup_servicios(df_sketches, por):
+    """
+    Conteo distinto de servicios para un agrupamiento más grueso que la celda de
+    los sketches, fusionando los sketches de cada grupo. Equivale a unir_sketches
+    por grupo, pero sin un bucle de Python por grupo: los BLOBs se decodifican una
+    vez y los grupos se fusionan en bloque (pares grupo-id únicos con lexsort para
+    los grupos exactos, np.maximum.reduceat / np.maximum.at sobre una matriz de
+    registros para los grupos HyperLogLog).
+
+    Args:
+        df_sketches (pd.DataFrame): Filas con las columnas de 'por' y 'Sketch'
+        por (list): Columnas del agrupamiento (lista vacía = total)
+
+    Returns:
+        pd.DataFrame: Columnas de 'por', 'Total_Servicios' (redondeado) y
+        'Error_Relativo' (error estándar relativo; 0 = exacto)
+    """
+    por = list(por)
+    columnas = por + ["Total_Servicios", "Error_Relativo"]
+    if df_sketches.empty:
+        return pd.DataFrame(columns=columnas) if por else pd.DataFrame([(0, 0.0)], columns=columnas)
+    if por:
+        grupo = df_sketches.groupby(por, dropna=False, sort=True).ngroup().to_numpy()
+    else:
+        grupo = np.zeros(len(df_sketches), dtype=np.int64)
+    n_grupos = int(grupo.max()) + 1
+
+    # Decodificación: ids exactos y registros HLL, cada uno con el grupo de su fila
+    fila_ids, ids, filas_hll, densos, modo, precision = _decodificar_bloque(df_sketches["Sketch"].tolist())
+    grupo_ids = grupo[fila_ids]
+
+    # Un grupo pasa a HyperLogLog si tiene algún sketch HLL o, en modo 'hll', más ids que el límite
+    hll = np.zeros(n_grupos, dtype=bool)
+    hll[grupo[filas_hll]] = True
+    if modo == "hll":
+        hll |= np.bincount(grupo_ids, minlength=n_grupos) > LIMITE_IDS_UNION
+
+    total = np.zeros(n_grupos)
+    exacto = ~hll[grupo_ids]
+    g, i = grupo_ids[exacto], ids[exacto]
+    orden = np.lexsort((i, g))
+    g, i = g[orden], i[orden]
+    nuevo = np.ones(len(g), dtype=bool)
+    nuevo[1:] = (g[1:] != g[:-1]) | (i[1:] != i[:-1])
+    total[:] = np.bincount(g[nuevo], minlength=n_grupos)
+
+    grupos_hll = np.flatnonzero(hll)
+    if len(grupos_hll):
+        m = 1 << precision
+        posicion = np.full(n_grupos, -1, dtype=np.int64)
+        posicion[grupos_hll] = np.arange(len(grupos_hll))
+        orden_hll = np.argsort(posicion[grupo[filas_hll]], kind="stable")
+        pos_filas = posicion[grupo[filas_hll]][orden_hll]
+        en_hll = ~exacto
+        pos_ids, (indice, rho) = posicion[grupo_ids[en_hll]], _indice_rho(ids[en_hll], precision)
+        for desde in range(0, len(grupos_hll), BLOQUE_GRUPOS_HLL):
+            hasta = min(desde + BLOQUE_GRUPOS_HLL, len(grupos_hll))
+            registros = np.zeros((hasta - desde, m), dtype=np.uint8)
+            sel = (pos_filas >= desde) & (pos_filas < hasta)
+            if sel.any():
+                bloque = np.stack([densos[f] for f in orden_hll[sel]])
+                inicios = np.flatnonzero(np.r_[True, pos_filas[sel][1:] != pos_filas[sel][:-1]])
+                registros[pos_filas[sel][inicios] - desde] = np.maximum.reduceat(bloque, inicios, axis=0)
+            sel = (pos_ids >= desde) & (pos_ids < hasta)
+            np.maximum.at(registros.reshape(-1), (pos_ids[sel] - desde) * m + indice[sel], rho[sel])
+            total[grupos_hll[desde:hasta]] = estimar_hll(registros)
+
+    primera = np.unique(grupo, return_index=True)[1]
+    resultado = df_sketches.iloc[primera][por].reset_index(drop=True)
+    resultado["Total_Servicios"] = np.round(total).astype(np.int64)
+    resultado["Error_Relativo"] = np.where(hll, 1.04 / np.sqrt(1 << precision), 0.0)
+    return resultado[columnas]
+
+def servicios_distintos(conn, por, exacto=False):
+    """
+    COUNT(DISTINCT Servicio_ID_Operacional) agrupado por columnas de la celda
+    (Fecha_Key, Cliente_Key, Sede_Origen_Key, Mensajero_Key) y/o de Dim_Fecha
+    (Ano, Numero_Mes, Nombre_Dia_Semana, ...), sin recorrer la tabla de hechos:
+    fusiona los sketches de Fact_Sketch_Servicios.
+
+    Args:
+        conn (sqlite3.Connection): Conexión al DW (ver partitions.connect_dw)
+        por (list): Columnas del agrupamiento
+        exacto (bool): Si es True cuenta sobre la tabla de hechos (exacto, más lento)
+
+    Returns:
+        pd.DataFrame: Columnas de 'por', 'Total_Servicios' y 'Error_Relativo'
+    """
+    por = list(por)
+    de_celda = [c for c in por if c in COLUMNAS_CELDA]
+    de_fecha = [c for c in por if c not in COLUMNAS_CELDA]
+    seleccion = [f's."{c}"' for c in de_celda] + [f'df."{c}"' for c in de_fecha]
+    join_fecha = 'JOIN "Dim_Fecha" df ON s."Fecha_Key" = df."Fecha_Key"' if de_fecha else ""
+
+    if exacto:
+        grupo = f" GROUP BY {', '.join(seleccion)}" if seleccion else ""
+        df = pd.read_sql_query(
+            f'SELECT {"".join(c + ", " for c in seleccion)}COUNT(DISTINCT s."Servicio_ID_Operacional") AS "Total_Servicios" '
+            f'FROM "Fact_Cambio_Estado_Servicio" s {join_fecha}{grupo}', conn
+        )
+        df["Error_Relativo"] = 0.0
+        return df.sort_values(por).reset_index(drop=True) if por else df
+
+    df = pd.read_sql_query(
+        f'SELECT {"".join(c + ", " for c in seleccion)}s."Sketch" FROM "{TABLA_SKETCHES}" s {join_fecha}', conn
+    )
+    return rollup_servicios(df, por)
@@ -0,0 +1,259 @@
+import importlib
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+import pandas as pd
+from .utils import db_connections
+from .utils.db_connections import get_oltp_engine, get_dw_engine
+from .utils.fingerprints import upsert_fingerprint, delete_fingerprints
+from .utils.dictionaries import CLAVE_DIRECCION, encode_values
+from .utils.partitions import (
+    FACT_TABLE, get_partitions_dir, build_partition_file, recode_partition, ensure_catalog, register_partition,
+    drop_partition, list_partitions, compact_partitions, read_partition, merge_into_compacted
+)
+from .utils.etl_runs import new_run_id, record_run
+from .utils.planner import LOTE_HECHOS, MAX_CONEXIONES_OLTP, leer_recursos
+
+PASO_HECHOS = "10_fact_cambio_estado_servicio"
+REINTENTOS_DEFECTO = 2
+
+def _paso_hechos():
+    """
+    Módulo del paso de la tabla de hechos (su nombre empieza con un dígito).
+    """
+    return importlib.import_module(f".etl.{PASO_HECHOS}", package="src")
+
+def ventanas_mensuales(desde, hasta):
+    """
+    Divide un rango de meses en ventanas mensuales.
+
+    Args:
+        desde (str): Primer mes 'YYYY-MM'
+        hasta (str): Último mes 'YYYY-MM' (incluido)
+
+    Returns:
+        list: Periodos 'YYYY-MM' del rango
+
+    Raises:
+        ValueError: Si los meses no tienen el formato 'YYYY-MM' o el rango está invertido
+    """
+    inicio = datetime.strptime(desde, "%Y-%m").date()
+    fin = datetime.strptime(hasta, "%Y-%m").date()
+    if inicio > fin:
+        raise ValueError(f"Rango de backfill invertido: {desde} > {hasta}")
+    ventanas = []
+    while inicio <= fin:
+        ventanas.append(f"{inicio.year:04d}-{inicio.month:02d}")
+        inicio = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    return ventanas
+
+def _iniciar_worker(dw_path, ruta_dw):
+    """
+    Inicializa un proceso del pool: descarta los motores heredados del padre (cada
+    proceso abre su propio pool de conexiones al OLTP) y apunta al mismo DW.
+    """
+    db_connections.reset_engines()
+    db_connections.DW_PATH = dw_path
+    db_connections.set_staging_path(None if ruta_dw == dw_path else ruta_dw)
+
+def _procesar_ventana(periodo, particiones, lote):
+    """
+    Extrae y transforma una ventana mensual y construye su archivo de partición
+    (se ejecuta en un proceso del pool). No escribe en el DW: la dirección se
+    guarda con códigos locales 1..n y las direcciones vuelven al proceso
+    principal, que las codifica en el diccionario (ver cargar_ventana).
+
+    Returns:
+        dict: Partición construida (archivo, filas, rango de Fecha_Key),
+        direcciones de los códigos locales y duración
+    """
+    inicio = time.perf_counter()
+    paso = _paso_hechos()
+    direcciones = []
+
+    def codificar_local(serie):
+        codigos, valores = pd.factorize(serie.astype(object).where(serie.notna(), None))
+        direcciones.extend(str(v) for v in valores)
+        return pd.Series(codigos + 1, index=serie.index).where(codigos >= 0).astype('Int64')
+
+    df_oltp = paso.extract_cambios_estado_oltp(get_oltp_engine(), periodo, particiones=particiones)
+    df_fact = paso.transform_fact_table(df_oltp, get_dw_engine(), codificador=codificar_local)
+    particion = build_partition_file(df_fact, periodo, chunksize=lote)
+    particion["direcciones"] = direcciones
+    particion["segundos"] = time.perf_counter() - inicio
+    return particion
+
+def cargar_ventana(engine_dw, periodo, particion, huella):
+    """
+    Publica una ventana: codifica sus direcciones en el diccionario del DW (solo
+    el proceso principal escribe en él) y reemplaza los códigos locales del
+    archivo. Si el periodo vive en un archivo compactado, sus filas pasan a ese
+    archivo (ver merge_into_compacted). Después la entrada del catálogo y la
+    huella del periodo se registran juntas en una sola transacción o no se registran.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodo (str): Periodo 'YYYY-MM'
+        particion (dict): Resultado de _procesar_ventana
+        huella (str): Huella del periodo en el OLTP
+    """
+    claves = encode_values(pd.Series(particion["direcciones"], dtype=object), engine_dw)
+    recode_partition(particion["archivo"], CLAVE_DIRECCION, claves)
+    particion = merge_into_compacted(
+        engine_dw, periodo, {c: particion[c] for c in ("archivo", "filas", "fecha_key_min", "fecha_key_max")}
+    )
+    with engine_dw.begin() as connection:
+        register_partition(connection, periodo, particion)
+        upsert_fingerprint(connection, f"{PASO_HECHOS}:{periodo}", huella)
+
+def verificar_ventanas(engine_oltp, engine_dw, periodos):
+    """
+    Compara las particiones cargadas por el backfill con la salida de la carga
+    serial del paso 10 para las mismas ventanas (transformar_periodo y el archivo
+    de partición que escribe la carga), fila por fila. La carga serial codifica
+    las direcciones en una copia del archivo principal del DW, así su diccionario
+    no toca el DW.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodos (list): Periodos 'YYYY-MM' a verificar
+
+    Returns:
+        list: Periodos cuya partición difiere de la carga serial
+    """
+    paso = _paso_hechos()
+    catalogo = list_partitions(engine_dw).set_index('Periodo')
+    ruta_dw = db_connections.get_dw_path()
+    ruta_copia = f"{os.path.splitext(ruta_dw)[0]}_verificacion.db"
+    fuente, copia = sqlite3.connect(f"file:{ruta_dw}?mode=ro", uri=True), sqlite3.connect(ruta_copia)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
+
+    db_connections.set_staging_path(ruta_copia)
+    engine_serie = get_dw_engine()
+    diferencias = []
+    try:
+        for periodo in periodos:
+            # Archivo mensual propio: la referencia no se escribe en los archivos compactados del DW
+            referencia = build_partition_file(paso.transformar_periodo(engine_oltp, engine_serie, periodo), periodo)["archivo"]
+            try:
+                cargada = read_partition(catalogo.loc[periodo, 'Archivo'], catalogo.loc[periodo, 'Etiqueta'])
+                if not cargada.equals(read_partition(referencia, periodo)):
+                    diferencias.append(periodo)
+            finally:
+                os.remove(os.path.join(get_partitions_dir(), referencia))
+    finally:
+        db_connections.set_staging_path(None if ruta_dw == db_connections.DW_PATH else ruta_dw)
+        db_connections.dispose_engines(str(engine_serie.url))
+        os.remove(ruta_copia)
+    return diferencias
+
+def main(desde, hasta, workers=None, reintentos=REINTENTOS_DEFECTO, particiones=1, lote=LOTE_HECHOS, verificar=False):
+    """
+    Reconstruye Fact_Cambio_Estado_Servicio para un rango de meses (por ejemplo
+    tras un cambio de esquema). Cada mes es una ventana: la extracción, la
+    transformación y la escritura del archivo de partición se reparten en un pool
+    de procesos (cada uno con su pool de conexiones al OLTP), y el proceso
+    principal publica cada ventana en su propia transacción. Una ventana que
+    falla se reintenta sola, sin afectar a las demás.
+
+    Args:
+        desde (str): Primer mes 'YYYY-MM'
+        hasta (str): Último mes 'YYYY-MM' (incluido)
+        workers (int): Procesos del pool (None = núcleos disponibles)
+        reintentos (int): Reintentos por ventana fallida
+        particiones (int): Consultas en que se reparte la extracción de cada ventana
+        lote (int): Filas por lote de escritura en SQLite
+        verificar (bool): Compara cada ventana cargada con una carga serial
+
+    Returns:
+        dict: Ventanas cargadas, fallidas (con el error) y diferencias con la carga serial
+    """
+    print(f"Iniciando backfill de {FACT_TABLE} ({desde} a {hasta})...")
+    run_id = new_run_id()
+    inicio_ejecucion = datetime.now()
+    engine_oltp = get_oltp_engine()
+    engine_dw = get_dw_engine()
+    ensure_catalog(engine_dw)
+
+    # Huellas tomadas antes de extraer: si el OLTP cambia durante el backfill,
+    # la siguiente ejecución incremental recarga los periodos afectados
+    huellas = _paso_hechos().get_fingerprints_periodos(engine_oltp, engine_dw)
+    ventanas = ventanas_mensuales(desde, hasta)
+    existentes = set(list_partitions(engine_dw)['Periodo'])
+
+    # Meses del rango sin eventos en el OLTP: como en la carga serial, sin partición
+    for periodo in [v for v in ventanas if v not in huellas and v in existentes]:
+        drop_partition(periodo, engine_dw)
+        delete_fingerprints(engine_dw, f"{PASO_HECHOS}:{periodo}")
+    ventanas = [v for v in ventanas if v in huellas]
+    if not ventanas:
+        print("No hay eventos en el OLTP para el rango indicado.")
+        return {"cargadas": {}, "fallidas": {}, "diferencias": []}
+
+    maximo = max(1, MAX_CONEXIONES_OLTP // max(1, particiones))
+    workers = max(1, min(workers or leer_recursos()["nucleos"], len(ventanas), maximo))
+    print(f"Ventanas: {len(ventanas)} | Workers: {workers} | Particiones de extracción: {particiones} | "
+          f"Reintentos: {reintentos} | Lote: {lote}")
+
+    cargadas, fallidas, intentos = {}, {}, {periodo: 0 for periodo in ventanas}
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_iniciar_worker,
+        initargs=(db_connections.DW_PATH, db_connections.get_dw_path())
+    ) as executor:
+        pendientes = {executor.submit(_procesar_ventana, p, particiones, lote): p for p in ventanas}
+        while pendientes:
+            terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                periodo = pendientes.pop(futuro)
+                intentos[periodo] += 1
+                try:
+                    particion = futuro.result()
+                    cargar_ventana(engine_dw, periodo, particion, huellas[periodo])
+                    cargadas[periodo] = particion
+                    detalle = f"{particion['filas']} filas en {particion['segundos']:.1f} s"
+                except Exception as e:
+                    if intentos[periodo] <= reintentos and not isinstance(e, BrokenProcessPool):
+                        print(f"Ventana {periodo} falló (intento {intentos[periodo]}): {e}. Reintentando...")
+                        pendientes[executor.submit(_procesar_ventana, periodo, particiones, lote)] = periodo
+                        continue
+                    fallidas[periodo] = str(e)
+                    detalle = f"FALLIDA tras {intentos[periodo]} intentos ({e})"
+
+                terminadas = len(cargadas) + len(fallidas)
+                transcurrido = time.perf_counter() - inicio
+                eta = transcurrido / terminadas * (len(ventanas) - terminadas)
+                print(f"[{terminadas}/{len(ventanas)}] {periodo}: {detalle} | "
+                      f"transcurrido {transcurrido:.0f} s | ETA {eta:.0f} s")
+
+    # El catálogo no puede referenciar más archivos de los que SQLite puede adjuntar
+    if cargadas:
+        compact_partitions(engine_dw)
+
+    # Cambia la versión de carga del DW (invalida la caché de consultas)
+    if cargadas:
+        record_run(engine_dw, run_id, inicio_ejecucion, [f"backfill:{p}" for p in cargadas], list(fallidas))
+
+    diferencias = []
+    if verificar and cargadas:
+        diferencias = verificar_ventanas(engine_oltp, engine_dw, sorted(cargadas))
+        print(f"Verificación contra la carga serial: "
+              f"{'sin diferencias' if not diferencias else 'diferencias en ' + ', '.join(diferencias)}.")
+
+    print(f"Backfill terminado en {time.perf_counter() - inicio:.1f} s: "
+          f"{len(cargadas)} ventanas cargadas, {len(fallidas)} fallidas.")
+    for periodo, error in sorted(fallidas.items()):
+        print(f"  - {periodo}: {error}")
+    if fallidas:
+        print("Para reintentar las ventanas fallidas:")
+        for periodo in sorted(fallidas):
+            print(f"  python -m src.run_etl --backfill {periodo} {periodo}")
+    return {"cargadas": cargadas, "fallidas": fallidas, "diferencias": diferencias}
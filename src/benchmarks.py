@@ -0,0 +1,453 @@
+import importlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, create_engine, text
+from .utils import db_connections
+from .utils.arrow_extract import _peak_rss_mb
+from .utils.dictionaries import CLAVE_DIRECCION, VALOR_DIRECCION, encode_values
+from .utils.partitions import (
+    FACT_TABLE, FACT_INDEXES, VIEW_COLUMNS, get_partitions_dir, partition_file, build_partition_file,
+    ensure_catalog, register_partition, connect_dw, needs_decoding
+)
+
+# Consultas medidas sobre la vista de la tabla de hechos (mismos patrones que el notebook y el paso 11)
+CONSULTAS_DICCIONARIO = {
+    "direcciones_distintas": 'SELECT COUNT(DISTINCT "Direccion_Destino") FROM "Fact_Cambio_Estado_Servicio"',
+    "servicios_por_cliente": (
+        'SELECT "Cliente_Key", COUNT(DISTINCT "Servicio_ID_Operacional") '
+        'FROM "Fact_Cambio_Estado_Servicio" GROUP BY "Cliente_Key"'
+    ),
+    "duracion_por_servicio": (
+        'SELECT "Servicio_ID_Operacional", MIN("Timestamp_Estado"), MAX("Timestamp_Estado") '
+        'FROM "Fact_Cambio_Estado_Servicio" GROUP BY "Servicio_ID_Operacional"'
+    ),
+    "entregas_por_direccion": (
+        'SELECT "Direccion_Destino", COUNT(*) FROM "Fact_Cambio_Estado_Servicio" '
+        'WHERE "Estado_Servicio_Key" = 4 GROUP BY "Direccion_Destino" ORDER BY 2 DESC LIMIT 10'
+    )
+}
+
+def hechos_sinteticos(servicios=200000, meses=6, seed=0):
+    """
+    Genera filas sintéticas de la tabla de hechos (1 a 5 estados por servicio) con
+    direcciones de hasta 100 caracteres, repetidas entre servicios como en el OLTP.
+
+    Args:
+        servicios (int): Número de servicios
+        meses (int): Meses cubiertos (una partición por mes)
+        seed (int): Semilla del generador
+
+    Returns:
+        pd.DataFrame: Columnas de la vista de la tabla de hechos (dirección en texto)
+    """
+    rng = np.random.default_rng(seed)
+    vias = np.array(["Calle", "Carrera", "Avenida Calle", "Avenida Carrera", "Diagonal", "Transversal"])
+    barrios = np.array(["Chapinero Alto", "El Poblado", "San Fernando", "Usaquén", "Laureles Estadio", "Granada Norte"])
+    n_direcciones = max(1, int(servicios * 0.8))
+    direcciones = np.array([
+        f"{vias[i % len(vias)]} {i % 170 + 1} # {i % 97 + 1}-{i % 89 + 1} Barrio {barrios[i % len(barrios)]} "
+        f"Torre {i % 9 + 1} Apartamento {i % 1200 + 101} Edificio Conjunto Residencial {i}"[:100]
+        for i in range(n_direcciones)
+    ])
+
+    estados = rng.integers(1, 6, servicios)
+    servicio = np.repeat(np.arange(1, servicios + 1), estados)
+    orden = np.arange(len(servicio)) - np.repeat(np.cumsum(estados) - estados, estados) + 1
+    inicio = np.datetime64("2024-01-01") + rng.integers(0, meses * 30 * 1440, servicios).astype("timedelta64[m]")
+    timestamp = np.repeat(inicio, estados) + (orden * rng.integers(1, 240, len(servicio))).astype("timedelta64[m]")
+    por_servicio = lambda valores: np.repeat(valores, estados)
+
+    df = pd.DataFrame({
+        "Servicio_Estado_Key": np.arange(1, len(servicio) + 1),
+        "Fecha_Key": (timestamp.astype("datetime64[D]") - np.datetime64("2024-01-01")).astype(int) + 1,
+        "Hora_Key": (timestamp - timestamp.astype("datetime64[D]")).astype("timedelta64[m]").astype(int) + 1,
+        "Cliente_Key": por_servicio(rng.integers(1, 200, servicios)),
+        "Sede_Origen_Key": por_servicio(rng.integers(1, 400, servicios)),
+        "Geografia_Destino_Key": por_servicio(rng.integers(1, 30, servicios)),
+        "Mensajero_Key": por_servicio(rng.integers(1, 500, servicios)),
+        "Estado_Servicio_Key": orden,
+        "Urgencia_Servicio_Key": por_servicio(rng.integers(1, 4, servicios)),
+        "Novedad_Key": 1,
+        "Servicio_ID_Operacional": servicio,
+        "Direccion_Destino": por_servicio(direcciones[rng.integers(0, n_direcciones, servicios)]),
+        "Timestamp_Estado": pd.to_datetime(timestamp),
+        "Contador_Estados": 1
+    })
+    df.insert(df.columns.get_loc("Direccion_Destino"), CLAVE_DIRECCION, pd.NA)
+    return df[VIEW_COLUMNS]
+
+def _escribir_particion_texto(df, periodo):
+    """
+    Escribe una partición con el formato anterior a la codificación: dirección en
+    texto e id del servicio como varchar (esquema original), con los mismos índices.
+    """
+    os.makedirs(get_partitions_dir(), exist_ok=True)
+    archivo = partition_file(periodo)
+    engine_particion = create_engine(f"sqlite:///{archivo}")
+    try:
+        df_texto = df.drop(columns=[CLAVE_DIRECCION]).astype({"Servicio_ID_Operacional": str})
+        df_texto.to_sql(FACT_TABLE, engine_particion, index=False, chunksize=10000,
+                        dtype={"Servicio_ID_Operacional": String(50), VALOR_DIRECCION: String(100)})
+        with engine_particion.begin() as connection:
+            for nombre, columnas in FACT_INDEXES.items():
+                lista = ", ".join(f'"{c}"' for c in columnas)
+                connection.execute(text(f'CREATE INDEX "{nombre}" ON "{FACT_TABLE}" ({lista})'))
+    finally:
+        engine_particion.dispose()
+    return {
+        "archivo": os.path.basename(archivo), "filas": len(df),
+        "fecha_key_min": int(df["Fecha_Key"].min()), "fecha_key_max": int(df["Fecha_Key"].max())
+    }
+
+def _medir_formato(df, codificado, repeticiones):
+    """
+    Carga las filas en un DW temporal con el formato indicado y mide el tamaño de
+    los archivos y el tiempo de cada consulta a través de connect_dw.
+    """
+    engine_dw = db_connections.get_dw_engine()
+    ensure_catalog(engine_dw)
+    inicio = time.perf_counter()
+    for periodo, df_periodo in df.groupby(df["Timestamp_Estado"].dt.strftime("%Y-%m")):
+        if codificado:
+            df_periodo = df_periodo.assign(**{CLAVE_DIRECCION: encode_values(df_periodo[VALOR_DIRECCION], engine_dw)})
+            particion = build_partition_file(df_periodo, periodo)
+        else:
+            particion = _escribir_particion_texto(df_periodo, periodo)
+        with engine_dw.begin() as connection:
+            register_partition(connection, periodo, particion)
+    carga = time.perf_counter() - inicio
+    db_connections.dispose_engines()
+
+    directorio = get_partitions_dir()
+    bytes_hechos = sum(os.path.getsize(os.path.join(directorio, a)) for a in os.listdir(directorio))
+    bytes_principal = os.path.getsize(db_connections.DW_PATH)
+    consultas = {"vista_compatible": {}, "segun_consulta": {}}
+    for nombre, sql in CONSULTAS_DICCIONARIO.items():
+        for vista, decodificar in (("vista_compatible", True), ("segun_consulta", needs_decoding(sql))):
+            tiempos = []
+            for _ in range(repeticiones):
+                connection = connect_dw(decodificar=decodificar)
+                try:
+                    inicio = time.perf_counter()
+                    connection.execute(sql).fetchall()
+                    tiempos.append(time.perf_counter() - inicio)
+                finally:
+                    connection.close()
+            consultas[vista][nombre] = min(tiempos)
+    return {
+        "bytes_particiones": bytes_hechos, "bytes_dw_principal": bytes_principal,
+        "segundos_carga": carga, "segundos_consultas": consultas
+    }
+
+def benchmark_diccionario(servicios=200000, meses=6, repeticiones=3, seed=0):
+    """
+    Compara el almacenamiento de la tabla de hechos antes y después de codificar
+    Direccion_Destino y Servicio_ID_Operacional: tamaño en disco (particiones y
+    archivo principal, donde vive el diccionario) y tiempo de las consultas sobre
+    la vista de compatibilidad. Trabaja en directorios temporales; el DW no se toca.
+
+    Args:
+        servicios (int): Servicios sintéticos
+        meses (int): Meses (particiones) sintéticos
+        repeticiones (int): Ejecuciones por consulta (se reporta la mejor)
+        seed (int): Semilla del generador
+
+    Returns:
+        dict: Formato ('texto' o 'codificado') -> tamaños y tiempos
+    """
+    df = hechos_sinteticos(servicios, meses, seed)
+    print(f"Benchmark de codificación por diccionario: {len(df)} filas, {servicios} servicios, {meses} meses.")
+    dw_path, staging_path = db_connections.DW_PATH, db_connections.get_dw_path()
+    resultados = {}
+    try:
+        for formato in ("texto", "codificado"):
+            directorio = tempfile.mkdtemp(prefix=f"benchmark_{formato}_")
+            db_connections.DW_PATH = os.path.join(directorio, "DW_FastAndSafe.db")
+            db_connections.set_staging_path(None)
+            try:
+                resultados[formato] = _medir_formato(df, formato == "codificado", repeticiones)
+            finally:
+                db_connections.dispose_engines()
+                shutil.rmtree(directorio, ignore_errors=True)
+    finally:
+        db_connections.DW_PATH = dw_path
+        db_connections.set_staging_path(None if staging_path == dw_path else staging_path)
+
+    antes, despues = resultados["texto"], resultados["codificado"]
+    total = lambda r: r["bytes_particiones"] + r["bytes_dw_principal"]
+    filas = [
+        ("particiones (MB)", antes["bytes_particiones"] / 1024 ** 2, despues["bytes_particiones"] / 1024 ** 2, None),
+        ("DW principal (MB)", antes["bytes_dw_principal"] / 1024 ** 2, despues["bytes_dw_principal"] / 1024 ** 2, None),
+        ("total (MB)", total(antes) / 1024 ** 2, total(despues) / 1024 ** 2, None),
+        ("carga (s)", antes["segundos_carga"], despues["segundos_carga"], None)
+    ] + [
+        (f"{nombre} (s)", antes["segundos_consultas"]["segun_consulta"][nombre],
+         despues["segundos_consultas"]["vista_compatible"][nombre],
+         despues["segundos_consultas"]["segun_consulta"][nombre])
+        for nombre in CONSULTAS_DICCIONARIO
+    ]
+    print(f"{'':<28}{'texto':>12}{'codificado':>12}{'cambio':>11}{'sin decodif.':>14}{'cambio':>11}")
+    for etiqueta, a, d, p in filas:
+        linea = f"{etiqueta:<28}{a:>12.3f}{d:>12.3f}{(d / a - 1) * 100:>10.1f}%"
+        if p is not None:
+            linea += f"{p:>14.3f}{(p / a - 1) * 100:>10.1f}%"
+        print(linea)
+    print("codificado: vista de compatibilidad (connect_dw); sin decodif.: diccionario unido solo "
+          "si la consulta usa Direccion_Destino (query_fact).")
+    return resultados
+
+# Paso de la tabla de hechos (su nombre empieza con un dígito: se importa con importlib)
+PASO_HECHOS = "10_fact_cambio_estado_servicio"
+
+def _paso_hechos():
+    return importlib.import_module(f".etl.{PASO_HECHOS}", package="src")
+
+def extraccion_sintetica(servicios=500000, seed=0):
+    """
+    Genera una extracción sintética del paso de la tabla de hechos (columnas de
+    QUERY_CAMBIOS_ESTADO, 1 a 5 estados por servicio) respaldada por Arrow, como
+    la entrega el backend de extracción 'arrow'. Incluye los casos que ejercitan
+    los lookups: ids sin sede, mensajero o novedad, ids que no existen en la
+    dimensión, fechas nulas y direcciones nulas.
+
+    Args:
+        servicios (int): Número de servicios
+        seed (int): Semilla del generador
+
+    Returns:
+        pd.DataFrame: Columnas de tipo pd.ArrowDtype
+    """
+    import pyarrow as pa
+
+    rng = np.random.default_rng(seed)
+    estados = rng.integers(1, 6, servicios)
+    filas = int(estados.sum())
+    servicio = np.repeat(np.arange(1, servicios + 1), estados)
+    orden = np.arange(filas) - np.repeat(np.cumsum(estados) - estados, estados) + 1
+    inicio = np.datetime64("2023-01-01") + rng.integers(0, 1000 * 1440, servicios).astype("timedelta64[m]")
+    timestamp = np.repeat(inicio, estados) + (orden * rng.integers(1, 240, filas)).astype("timedelta64[m]")
+    por_servicio = lambda valores: np.repeat(valores, estados)
+    nulos = lambda valores, fraccion: pa.array(valores, mask=rng.random(len(valores)) < fraccion)
+
+    tabla = pa.table({
+        "Servicio_Estado_ID": pa.array(np.arange(1, filas + 1)),
+        "Servicio_ID_Operacional": pa.array(servicio),
+        "estado_id": pa.array(orden),
+        "fecha": nulos(timestamp.astype("datetime64[D]"), 0.001).cast(pa.date32()),
+        "hora": pa.array((timestamp - timestamp.astype("datetime64[D]")).astype("timedelta64[us]").astype(np.int64))
+                  .cast(pa.time64("us")),
+        "cliente_id": pa.array(por_servicio(rng.integers(1, 200, servicios) * 10)),
+        "mensajero_id": nulos(por_servicio(rng.integers(5001, 5500, servicios)), 0.05),
+        "tipo_servicio_id": pa.array(por_servicio(rng.integers(1, 4, servicios))),
+        "Sede_Origen_ID": nulos(por_servicio(rng.integers(1001, 1401, servicios)), 0.02),
+        "Geografia_Destino_ID": pa.array(por_servicio(rng.integers(1, 31, servicios))),
+        "Direccion_Destino": nulos(por_servicio(np.char.add("Calle ", rng.integers(1, servicios, servicios).astype(str))), 0.01),
+        "Tipo_Novedad_ID": nulos(por_servicio(rng.integers(1, 6, servicios)), 0.8)
+    })
+    return tabla.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _dimensiones_sinteticas(engine_dw):
+    """
+    Carga en un DW temporal las dimensiones que consulta la transformación de la
+    tabla de hechos. Fecha y hora se generan con sus propios pasos; en las demás
+    los ids operacionales difieren de las claves para detectar lookups cruzados
+    (la sede 1400, la ciudad 30 y el mensajero 5499 no existen).
+    """
+    from .utils.db_connections import load_df_to_dw
+
+    for paso in ("01_dim_fecha", "02_dim_hora"):
+        importlib.import_module(f".etl.{paso}", package="src").main()
+    claves = lambda n: np.arange(1, n + 1)
+    load_df_to_dw(pd.DataFrame({"Cliente_Key": claves(199), "Cliente_ID_Operacional": claves(199) * 10}),
+                  "Dim_Cliente", engine_dw, "Cliente_Key")
+    load_df_to_dw(pd.DataFrame({"Sede_Key": claves(399), "Sede_ID_Operacional": claves(399) + 1000}),
+                  "Dim_Sede", engine_dw, "Sede_Key")
+    load_df_to_dw(pd.DataFrame({"Geografia_Key": claves(29), "Ciudad_ID_Operacional": claves(29)}),
+                  "Dim_Geografia", engine_dw, "Geografia_Key")
+    load_df_to_dw(pd.DataFrame({"Mensajero_Key": claves(498), "Mensajero_ID_Operacional": claves(498) + 5000}),
+                  "Dim_Mensajero", engine_dw, "Mensajero_Key")
+    load_df_to_dw(pd.DataFrame({"Urgencia_Servicio_Key": claves(3), "Urgencia_ID_Operacional": claves(3)}),
+                  "Dim_Urgencia_Servicio", engine_dw, "Urgencia_Servicio_Key")
+    load_df_to_dw(pd.DataFrame({"Estado_Servicio_Key": claves(5), "Orden_Estado": claves(5)}),
+                  "Dim_Estado_Servicio", engine_dw, "Estado_Servicio_Key")
+    load_df_to_dw(pd.DataFrame({
+        "Novedad_Key": claves(6), "Novedad_ID_Operacional": [-1, 1, 2, 3, 4, 5],
+        "Descripcion_Novedad": ["Sin Novedad", "Dirección errada", "Destinatario ausente", "Paquete dañado",
+                                "Reprogramado", "Otro"]
+    }), "Dim_Novedad", engine_dw, "Novedad_Key")
+
+def _medir_transformacion(backend, dw_path, ruta_entrada, ruta_salida):
+    """
+    Ejecuta la transformación de la tabla de hechos con un backend dentro de un
+    proceso nuevo (uso interno del benchmark) y guarda el resultado para compararlo.
+
+    Returns:
+        dict: Segundos de la transformación y pico de memoria residente antes y después
+    """
+    db_connections.DW_PATH = dw_path
+    db_connections.set_staging_path(None)
+    paso = _paso_hechos()
+    if backend == "polars":
+        import polars  # noqa: F401 (la importación no forma parte de la medición)
+    df_oltp = pd.read_pickle(ruta_entrada)
+    engine_dw = db_connections.get_dw_engine()
+    base = _peak_rss_mb()
+    inicio = time.perf_counter()
+    df_fact = paso.transform_fact_table(df_oltp, engine_dw, backend=backend)
+    segundos = time.perf_counter() - inicio
+    pico = _peak_rss_mb()
+    df_fact.to_pickle(ruta_salida)
+    db_connections.dispose_engines()
+    return {"segundos": segundos, "pico_mb": pico, "base_mb": base}
+
+def benchmark_transformacion(servicios=500000, repeticiones=3, seed=0):
+    """
+    Compara los backends de transformación de la tabla de hechos (merges de pandas
+    frente al plan perezoso de Polars) sobre una extracción sintética: tiempo de
+    pared y pico de memoria residente, cada ejecución en un proceso nuevo, y
+    verifica que ambos producen exactamente el mismo DataFrame. Trabaja en un
+    directorio temporal; el DW no se toca.
+
+    Args:
+        servicios (int): Servicios sintéticos
+        repeticiones (int): Procesos por backend (se reporta el mejor tiempo y el mayor pico)
+        seed (int): Semilla del generador
+
+    Returns:
+        dict: Backend -> segundos, pico y base de memoria (MB); 'identicos' -> bool
+    """
+    paso = _paso_hechos()
+    backends = [b for b in paso.BACKENDS_TRANSFORMACION if b != "polars" or paso.polars_disponible()]
+    df_oltp = extraccion_sintetica(servicios, seed)
+    print(f"Benchmark de transformación de la tabla de hechos: {len(df_oltp)} eventos, {servicios} servicios.")
+    dw_path, staging_path = db_connections.DW_PATH, db_connections.get_dw_path()
+    directorio = tempfile.mkdtemp(prefix="benchmark_transformacion_")
+    resultados = {}
+    try:
+        db_connections.DW_PATH = os.path.join(directorio, "DW_FastAndSafe.db")
+        db_connections.set_staging_path(None)
+        _dimensiones_sinteticas(db_connections.get_dw_engine())
+        # Diccionario de direcciones ya poblado (recarga): las inserciones son iguales en ambos backends
+        encode_values(df_oltp[VALOR_DIRECCION], db_connections.get_dw_engine())
+        db_connections.dispose_engines()
+        ruta_entrada = os.path.join(directorio, "extraccion.pkl")
+        df_oltp.to_pickle(ruta_entrada)
+        del df_oltp
+
+        contexto = multiprocessing.get_context("spawn")
+        for backend in backends:
+            mediciones = []
+            for i in range(repeticiones):
+                # Cada ejecución parte de una copia del mismo DW
+                copia = os.path.join(directorio, f"DW_{backend}_{i}.db")
+                shutil.copyfile(db_connections.DW_PATH, copia)
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+                    mediciones.append(pool.submit(
+                        _medir_transformacion, backend, copia, ruta_entrada,
+                        os.path.join(directorio, f"hechos_{backend}.pkl")
+                    ).result())
+            resultados[backend] = {
+                "segundos": min(m["segundos"] for m in mediciones),
+                "pico_mb": max(m["pico_mb"] or 0 for m in mediciones),
+                "base_mb": max(m["base_mb"] or 0 for m in mediciones)
+            }
+
+        referencia = pd.read_pickle(os.path.join(directorio, f"hechos_{backends[0]}.pkl"))
+        identicos = True
+        for backend in backends[1:]:
+            try:
+                pd.testing.assert_frame_equal(referencia, pd.read_pickle(os.path.join(directorio, f"hechos_{backend}.pkl")))
+            except AssertionError as e:
+                identicos = False
+                print(f"¡El resultado de '{backend}' difiere del de '{backends[0]}'!: {e}")
+        resultados["identicos"] = identicos
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+        db_connections.set_staging_path(None if staging_path == dw_path else staging_path)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print(f"{'backend':<10}{'segundos':>10}{'pico (MB)':>12}{'entrada (MB)':>14}")
+    for backend in backends:
+        r = resultados[backend]
+        print(f"{backend:<10}{r['segundos']:>10.3f}{r['pico_mb']:>12.1f}{r['base_mb']:>14.1f}")
+    # ru_maxrss no se reinicia: si el pico de la transformación no supera el de la
+    # carga de la extracción, pico y entrada coinciden (no es memoria de la transformación)
+    print(f"Resultados idénticos: {'sí' if resultados['identicos'] else 'NO'} "
+          f"(pico: memoria residente máxima del proceso, incluye el runtime de polars; "
+          f"entrada: pico tras cargar la extracción)")
+    return resultados
+
+# Agrupamientos medidos en el rollup de sketches (columnas de la celda y mes)
+AGRUPAMIENTOS_ROLLUP = [[], ["Cliente_Key"], ["Mes", "Cliente_Key"], ["Fecha_Key"], ["Fecha_Key", "Mensajero_Key"]]
+
+def _rollup_por_grupo(df_sketches, por):
+    """
+    Rollup de referencia: un unir_sketches por grupo en un bucle de Python (la
+    implementación anterior de rollup_servicios).
+    """
+    from .analysis.sketches import unir_sketches
+    filas = []
+    grupos = df_sketches.groupby(por, dropna=False, sort=True)["Sketch"] if por else [((), df_sketches["Sketch"])]
+    for clave, blobs in grupos:
+        sketch = unir_sketches(blobs.tolist())
+        clave = clave if isinstance(clave, tuple) else (clave,)
+        filas.append((*clave, int(round(sketch.cardinalidad())), sketch.error_relativo()))
+    return pd.DataFrame(filas, columns=list(por) + ["Total_Servicios", "Error_Relativo"])
+
+def benchmark_rollup_sketches(servicios=300000, meses=6, repeticiones=3, seed=0):
+    """
+    Compara el rollup de sketches vectorizado (rollup_servicios) con un bucle de
+    unir_sketches por grupo, en ambos modos de sketch, y verifica que los conteos
+    y errores sean idénticos. No usa el DW.
+
+    Args:
+        servicios (int): Servicios sintéticos
+        meses (int): Meses sintéticos
+        repeticiones (int): Ejecuciones por agrupamiento (se reporta la mejor)
+        seed (int): Semilla del generador
+
+    Returns:
+        dict: Modo -> agrupamiento -> segundos del bucle y vectorizado, e 'identicos'
+    """
+    from .analysis.sketches import COLUMNAS_CELDA, sketches_por_grupo, rollup_servicios
+    df = hechos_sinteticos(servicios, meses, seed)
+    resultados = {"identicos": True}
+    print(f"{'modo':<8}{'agrupamiento':<34}{'grupos':>8}{'bucle (s)':>12}{'vectorizado (s)':>17}{'aceleración':>13}")
+    for modo in ("hll", "exacto"):
+        df_sketches = sketches_por_grupo(df, COLUMNAS_CELDA, "Servicio_ID_Operacional", modo=modo)
+        df_sketches["Mes"] = (df_sketches["Fecha_Key"] - 1) // 30
+        resultados[modo] = {"celdas": len(df_sketches)}
+        for por in AGRUPAMIENTOS_ROLLUP:
+            tiempos = {}
+            for nombre, funcion in (("bucle", _rollup_por_grupo), ("vectorizado", rollup_servicios)):
+                mejor = None
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    salida = funcion(df_sketches, por)
+                    segundos = time.perf_counter() - inicio
+                    mejor = segundos if mejor is None else min(mejor, segundos)
+                tiempos[nombre] = (mejor, salida)
+            (t_bucle, referencia), (t_vector, salida) = tiempos["bucle"], tiempos["vectorizado"]
+            try:
+                pd.testing.assert_frame_equal(referencia, salida, check_dtype=False)
+            except AssertionError:
+                resultados["identicos"] = False
+            resultados[modo][", ".join(por) or "total"] = {"bucle": t_bucle, "vectorizado": t_vector}
+            print(f"{modo:<8}{', '.join(por) or 'total':<34}{len(salida):>8}{t_bucle:>12.3f}{t_vector:>17.3f}"
+                  f"{t_bucle / t_vector:>12.1f}x")
+    print(f"Celdas: {resultados['hll']['celdas']} | Resultados idénticos: {'sí' if resultados['identicos'] else 'NO'}")
+    return resultados
+
+# Benchmarks disponibles desde la línea de comandos (run_etl --benchmark NOMBRE)
+BENCHMARKS = {
+    "diccionario": benchmark_diccionario,
+    "transformacion": benchmark_transformacion,
+    "sketches": benchmark_rollup_sketches
+}
@@ -1,6 +1,15 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from ..utils.db_connections import get_dw_engine
+from ..utils.planner import get_batch_size
 from datetime import date, timedelta
+from ..utils.fingerprints import hash_parts
+
+TABLA_DESTINO = "Dim_Fecha"
+DEPENDENCIAS = []
+
+FECHA_INICIO = date(2023, 1, 1)
+FECHA_FIN = date(2025, 12, 31)
 
 def generar_dimension_fecha(fecha_inicio, fecha_fin):
     """
@@ -68,26 +77,34 @@ def cargar_datos_dw(df, nombre_tabla, engine_dw, pk_column):
             if_exists='replace', 
             index=True, 
             index_label=pk_column,
-            chunksize=1000
+            chunksize=get_batch_size(nombre_tabla)
         )
         print(f"Tabla '{nombre_tabla}' cargada exitosamente en el Data Warehouse.")
         print(f"Clave primaria '{pk_column}' establecida en '{nombre_tabla}'.")
 
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula la huella de la dimensión fecha. Al ser generada programáticamente,
+    depende únicamente del rango de fechas configurado.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al OLTP (no se utiliza)
+
+    Returns:
+        str: Huella de los parámetros de generación
+    """
+    return hash_parts([TABLA_DESTINO, FECHA_INICIO.isoformat(), FECHA_FIN.isoformat()])
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión fecha.
     Genera fechas desde 2023 hasta 2025 y las carga en el Data Warehouse.
     """
-    db_path_dw = "DW_FastAndSafe.db"
-    connection_string_dw = f"sqlite:///{db_path_dw}"
-    engine_dw = create_engine(connection_string_dw)
+    engine_dw = get_dw_engine()
 
-    fecha_inicio = date(2023, 1, 1)
-    fecha_fin = date(2025, 12, 31)
-    
     print("Generando dimensión de fecha...")
-    df_dim_fecha = generar_dimension_fecha(fecha_inicio, fecha_fin)
+    df_dim_fecha = generar_dimension_fecha(FECHA_INICIO, FECHA_FIN)
     
     df_dim_fecha.insert(0, 'Fecha_Key', range(1, 1 + len(df_dim_fecha)))
     
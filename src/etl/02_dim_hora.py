@@ -1,6 +1,12 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from ..utils.db_connections import get_dw_engine
+from ..utils.planner import get_batch_size
 from datetime import time
+from ..utils.fingerprints import hash_parts
+
+TABLA_DESTINO = "Dim_Hora"
+DEPENDENCIAS = []
 
 def get_franja_horaria(hora):
     """
@@ -62,19 +68,30 @@ def cargar_datos_dw(df, nombre_tabla, engine_dw, pk_column):
             if_exists='replace', 
             index=True, 
             index_label=pk_column,
-            chunksize=1000
+            chunksize=get_batch_size(nombre_tabla)
         )
         print(f"Tabla '{nombre_tabla}' cargada exitosamente en el Data Warehouse.")
         print(f"Clave primaria '{pk_column}' establecida en '{nombre_tabla}'.")
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula la huella de la dimensión hora. Al ser generada programáticamente
+    (1440 minutos fijos), la huella solo cambia si cambia la granularidad.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al OLTP (no se utiliza)
+
+    Returns:
+        str: Huella de los parámetros de generación
+    """
+    return hash_parts([TABLA_DESTINO, 24, 60])
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión hora.
     Genera todas las horas y minutos del día y las carga en el Data Warehouse.
     """
-    db_path_dw = "DW_FastAndSafe.db"
-    connection_string_dw = f"sqlite:///{db_path_dw}"
-    engine_dw = create_engine(connection_string_dw)
+    engine_dw = get_dw_engine()
 
     print("Generando dimensión de hora...")
     df_dim_hora = generar_dimension_hora()
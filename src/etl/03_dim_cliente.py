@@ -1,5 +1,10 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Cliente"
+DEPENDENCIAS = []
+FUENTES_FINGERPRINT = [("public.cliente", "cliente_id", ["nombre", "sector"])]
 
 def extract_clientes_oltp(engine_oltp):
     """
@@ -39,6 +44,19 @@ def transform_clientes(df):
     print("Transformación de clientes completada (generación de Key).")
     return df
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de clientes
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión cliente.
@@ -1,5 +1,13 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Geografia"
+DEPENDENCIAS = []
+FUENTES_FINGERPRINT = [
+    ("public.ciudad", "ciudad_id", ["nombre", "departamento_id"]),
+    ("public.departamento", "departamento_id", ["nombre"])
+]
 
 def extract_geografia_oltp(engine_oltp):
     """
@@ -44,6 +52,19 @@ def transform_geografia(df):
     print("Transformación de geografía completada.")
     return df
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de geografía
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión geografía.
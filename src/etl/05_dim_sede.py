@@ -1,5 +1,10 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Sede"
+DEPENDENCIAS = ["03_dim_cliente", "04_dim_geografia"]
+FUENTES_FINGERPRINT = [("public.sede", "sede_id", ["nombre", "direccion", "cliente_id", "ciudad_id"])]
 
 def extract_sedes_oltp(engine_oltp):
     """
@@ -79,6 +84,19 @@ def transform_sedes(df_sedes, engine_dw):
     print("Transformación de sedes completada.")
     return df_dim_sede
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de sedes
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión sede.
@@ -1,5 +1,15 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Mensajero"
+DEPENDENCIAS = []
+FUENTES_FINGERPRINT = [
+    ("public.clientes_mensajeroaquitoy", "id", ["user_id"]),
+    ("public.auth_user", "id", ["first_name", "last_name"]),
+    ("public.mensajeria_servicio", "id", ["mensajero_id", "tipo_vehiculo_id"]),
+    ("public.mensajeria_tipovehiculo", "id", ["nombre"])
+]
 
 def extract_mensajeros_oltp(engine_oltp):
     """
@@ -66,6 +76,19 @@ def transform_mensajeros(df):
     print("Transformación de mensajeros completada.")
     return df
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de mensajeros
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión mensajero.
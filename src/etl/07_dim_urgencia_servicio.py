@@ -1,5 +1,10 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Urgencia_Servicio"
+DEPENDENCIAS = []
+FUENTES_FINGERPRINT = [("public.mensajeria_tiposervicio", "id", ["nombre"])]
 
 def extract_tipos_servicio_oltp(engine_oltp):
     """
@@ -70,6 +75,19 @@ def transform_urgencia(df):
     print("Transformación de urgencia de servicio completada.")
     return df
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de tipos de servicio
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión urgencia de servicio.
@@ -1,5 +1,10 @@
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine, load_df_to_dw
+from ..utils.fingerprints import compute_oltp_fingerprint
+
+TABLA_DESTINO = "Dim_Novedad"
+DEPENDENCIAS = []
+FUENTES_FINGERPRINT = [("public.mensajeria_tiponovedad", "id", ["nombre"])]
 
 def extract_novedades_oltp(engine_oltp):
     """
@@ -53,6 +58,19 @@ def transform_novedades(df):
     print("Transformación de novedades completada.")
     return df
 
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de tipos de novedad
+    (filas, id máximo y hash agregado) para detectar si hubo cambios.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
 def main():
     """
     Función principal que ejecuta el proceso ETL completo para la dimensión novedad.
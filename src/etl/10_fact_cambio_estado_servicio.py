@@ -1,18 +1,86 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from ..utils.db_connections import get_oltp_engine, get_dw_engine
+from datetime import date
+from sqlalchemy import text
+from ..utils.fingerprints import (
+    hash_parts, get_stored_fingerprint, save_fingerprint, delete_fingerprints, table_exists
+)
+from ..utils.arrow_extract import extract_query
+from ..utils.partitions import (
+    CATALOG_TABLE, FACT_TABLE, write_partition, drop_partition, list_partitions, compact_partitions
+)
+from ..utils.dim_cache import read_dimension
+from ..utils.dictionaries import encode_values
+from ..utils.planner import get_step_plan
 
-def extract_cambios_estado_oltp(engine_oltp):
-    """
-    Extrae los eventos de cambio de estado desde el OLTP uniendo con información
-    del servicio para obtener el contexto completo necesario para la tabla de hechos.
-    
-    Args:
-        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
-    
-    Returns:
-        pd.DataFrame: DataFrame con eventos de cambio de estado y contexto del servicio
+TABLA_DESTINO = "Fact_Cambio_Estado_Servicio"
+PASO = __name__.rsplit(".", 1)[-1]
+# Periodo asignado a los eventos sin fecha
+PERIODO_SIN_FECHA = "sin-fecha"
+# El planificador reparte el volumen del paso entre los periodos mensuales
+PARTICIONADO_POR_MES = True
+DEPENDENCIAS = [
+    "01_dim_fecha", "02_dim_hora", "03_dim_cliente", "04_dim_geografia", "05_dim_sede",
+    "06_dim_mensajero", "07_dim_urgencia_servicio", "08_dim_estado_servicio", "09_dim_novedad"
+]
+# Tabla del OLTP usada por el planificador para estimar el volumen del paso
+TABLA_VOLUMEN = "public.mensajeria_estadosservicio"
+# Backend de extracción de esta consulta: 'arrow' evita crear tuplas Python por fila
+BACKEND_EXTRACCION = "arrow"
+# Versión del formato de los archivos de partición (forma parte de la huella de cada
+# periodo: al cambiar, todas las particiones se reconstruyen). 2 = dirección codificada
+FORMATO_PARTICION = 2
+# Huellas por periodo calculadas por get_fingerprint, pendientes de usar en main;
+# pasado este plazo (segundos) se vuelven a calcular
+VIGENCIA_HUELLAS = 300
+# Meses recientes (incluido el actual) cuya huella incluye además el hash de contenido;
+# los anteriores solo usan la señal barata (QUERY_SENAL_PERIODOS)
+VENTANA_HASH_MESES = 2
+_huellas_origen = {}
+# Backend de la transformación: 'pandas' (merges en memoria, uno por dimensión) o
+# 'polars' (un solo plan perezoso ejecutado en streaming). El valor por defecto se
+# cambia con la variable ETL_TRANSFORM_BACKEND (run_etl --backend-transformacion)
+BACKENDS_TRANSFORMACION = ("pandas", "polars")
+BACKEND_TRANSFORMACION = os.environ.get("ETL_TRANSFORM_BACKEND", "pandas")
+# Lookups del backend Polars: (dimensión, columna del OLTP, id operacional, clave, nombre en el hecho)
+LOOKUPS_POLARS = [
+    ("Dim_Fecha", "fecha", "Fecha_Completa", "Fecha_Key", "Fecha_Key"),
+    ("Dim_Hora", "hora", "Hora_Completa", "Hora_Key", "Hora_Key"),
+    ("Dim_Cliente", "cliente_id", "Cliente_ID_Operacional", "Cliente_Key", "Cliente_Key"),
+    ("Dim_Sede", "Sede_Origen_ID", "Sede_ID_Operacional", "Sede_Key", "Sede_Origen_Key"),
+    ("Dim_Geografia", "Geografia_Destino_ID", "Ciudad_ID_Operacional", "Geografia_Key", "Geografia_Destino_Key"),
+    ("Dim_Mensajero", "mensajero_id", "Mensajero_ID_Operacional", "Mensajero_Key", "Mensajero_Key"),
+    ("Dim_Estado_Servicio", "estado_id", "Orden_Estado", "Estado_Servicio_Key", "Estado_Servicio_Key"),
+    ("Dim_Urgencia_Servicio", "tipo_servicio_id", "Urgencia_ID_Operacional", "Urgencia_Servicio_Key", "Urgencia_Servicio_Key"),
+    ("Dim_Novedad", "Tipo_Novedad_ID", "Novedad_ID_Operacional", "Novedad_Key", "Novedad_Key")
+]
+
+# Origen de la extracción (compartido con la huella por periodo: ambas ven las mismas filas)
+FROM_CAMBIOS_ESTADO = """
+    FROM
+        public.mensajeria_estadosservicio es
+    JOIN
+        public.mensajeria_servicio s ON es.servicio_id = s.id
+    LEFT JOIN
+        public.clientes_usuarioaquitoy uaq ON s.usuario_id = uaq.id
+    LEFT JOIN
+        public.mensajeria_destinoservicio d ON d.id = s.destino_id
+    LEFT JOIN
+        (
+            -- Última novedad por servicio en una sola pasada (antes: subconsulta por fila).
+            -- El detalle completo de novedades está en Fact_Novedad_Servicio.
+            SELECT DISTINCT ON (servicio_id) servicio_id, tipo_novedad_id, xmin::text::bigint AS version
+            FROM public.mensajeria_novedadesservicio
+            ORDER BY servicio_id, fecha_novedad DESC, id DESC
+        ) AS nov ON nov.servicio_id = s.id
     """
-    query = """
+
+QUERY_CAMBIOS_ESTADO = """
     SELECT
         es.id AS "Servicio_Estado_ID",
         es.servicio_id AS "Servicio_ID_Operacional",
@@ -23,21 +91,196 @@ def extract_cambios_estado_oltp(engine_oltp):
         s.mensajero_id,
         s.tipo_servicio_id,
         uaq.sede_id AS "Sede_Origen_ID",
-        (SELECT d.ciudad_id FROM public.mensajeria_destinoservicio d WHERE d.id = s.destino_id) AS "Geografia_Destino_ID",
-        (SELECT d.direccion FROM public.mensajeria_destinoservicio d WHERE d.id = s.destino_id) AS "Direccion_Destino",
-        (SELECT mn.tipo_novedad_id FROM public.mensajeria_novedadesservicio mn WHERE mn.servicio_id = s.id ORDER BY mn.fecha_novedad DESC LIMIT 1) AS "Tipo_Novedad_ID"
-    FROM
-        public.mensajeria_estadosservicio es
-    JOIN
-        public.mensajeria_servicio s ON es.servicio_id = s.id
-    LEFT JOIN
-        public.clientes_usuarioaquitoy uaq ON s.usuario_id = uaq.id
+        d.ciudad_id AS "Geografia_Destino_ID",
+        d.direccion AS "Direccion_Destino",
+        nov.tipo_novedad_id AS "Tipo_Novedad_ID"
+    """ + FROM_CAMBIOS_ESTADO
+
+# Señal barata por periodo mensual, calculada en el OLTP sobre las mismas uniones que
+# la extracción: filas, id máximo y la versión de fila más reciente (xmin, el id de la
+# transacción que escribió la fila) de cada tabla unida. Un INSERT o UPDATE en el lugar
+# (un mensajero reasignado, un estado corregido, una dirección editada) escribe la fila
+# con un xmin mayor; un DELETE cambia el número de filas. GREATEST ignora los nulos
+QUERY_SENAL_PERIODOS = f"""
+    SELECT
+        COALESCE(to_char(es.fecha, 'YYYY-MM'), '{PERIODO_SIN_FECHA}') AS periodo,
+        COUNT(*) AS filas,
+        MAX(es.id) AS max_id,
+        MAX(GREATEST(
+            es.xmin::text::bigint, s.xmin::text::bigint, uaq.xmin::text::bigint,
+            d.xmin::text::bigint, nov.version
+        )) AS max_version
+    {FROM_CAMBIOS_ESTADO}
+    GROUP BY
+        1
+    """
+
+def query_hash_periodos(desde):
+    """
+    Consulta del hash de contenido de los periodos recientes: cubre lo que la señal
+    no ve (una novedad borrada, un xmin que dio la vuelta). ROW(...)::text conserva
+    la posición de los nulos (concat_ws los omite).
+
+    Args:
+        desde (date): Primer día del periodo más antiguo que se hashea
+
+    Returns:
+        str: Consulta con las columnas periodo y hash (incluye los eventos sin fecha)
+    """
+    return f"""
+    SELECT
+        COALESCE(to_char(es.fecha, 'YYYY-MM'), '{PERIODO_SIN_FECHA}') AS periodo,
+        md5(string_agg(
+            ROW(es.id, es.servicio_id, es.estado_id, es.fecha, es.hora, s.cliente_id, s.mensajero_id,
+                s.tipo_servicio_id, uaq.sede_id, d.ciudad_id, d.direccion, nov.tipo_novedad_id)::text,
+            ',' ORDER BY es.id
+        )) AS hash
+    {FROM_CAMBIOS_ESTADO}
+    WHERE
+        es.fecha >= DATE '{desde.isoformat()}' OR es.fecha IS NULL
+    GROUP BY
+        1
+    """
+
+def filtro_periodo(periodo, particion=None, particiones=1):
+    """
+    Construye el filtro SQL de la extracción para un periodo mensual y, si la
+    extracción se reparte en varias consultas, para una de sus particiones.
+    
+    Args:
+        periodo (str): Periodo en formato 'YYYY-MM' (o PERIODO_SIN_FECHA). None = todos
+        particion (int): Partición de la extracción (0..particiones-1)
+        particiones (int): Número de consultas en que se reparte la extracción
+    
+    Returns:
+        str: Cláusula WHERE sobre es.fecha / es.id (vacía si no hay filtro)
+    """
+    condiciones = []
+    if periodo == PERIODO_SIN_FECHA:
+        condiciones.append("es.fecha IS NULL")
+    elif periodo is not None:
+        ano, mes = (int(x) for x in periodo.split("-"))
+        inicio = date(ano, mes, 1)
+        fin = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+        condiciones.append(f"es.fecha >= DATE '{inicio.isoformat()}' AND es.fecha < DATE '{fin.isoformat()}'")
+    if particion is not None and particiones > 1:
+        condiciones.append(f"es.id % {int(particiones)} = {int(particion)}")
+    return f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+def extract_cambios_estado_oltp(engine_oltp, periodo=None, backend=BACKEND_EXTRACCION, particiones=1):
     """
-    df = pd.read_sql(query, engine_oltp)
-    print(f"Se extrajeron {len(df)} eventos de cambio de estado desde el OLTP.")
+    Extrae los eventos de cambio de estado desde el OLTP uniendo con información
+    del servicio para obtener el contexto completo necesario para la tabla de hechos.
+    Con particiones > 1 la extracción se reparte por es.id en varias consultas
+    simultáneas (una conexión del pool cada una).
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        periodo (str): Periodo mensual 'YYYY-MM' a extraer. Si es None se extrae todo
+        backend (str): Backend de extracción ('arrow' o 'pandas')
+        particiones (int): Número de consultas en que se reparte la extracción
+    
+    Returns:
+        pd.DataFrame: DataFrame con eventos de cambio de estado y contexto del servicio
+    """
+    if particiones <= 1:
+        df = extract_query(f"{QUERY_CAMBIOS_ESTADO}    {filtro_periodo(periodo)}\n", engine_oltp, backend=backend)
+    else:
+        consultas = [f"{QUERY_CAMBIOS_ESTADO}    {filtro_periodo(periodo, i, particiones)}\n" for i in range(particiones)]
+        with ThreadPoolExecutor(max_workers=particiones) as executor:
+            partes = list(executor.map(lambda q: extract_query(q, engine_oltp, backend=backend), consultas))
+        df = pd.concat(partes, ignore_index=True)
+    print(f"Se extrajeron {len(df)} eventos de cambio de estado desde el OLTP{'' if periodo is None else f' ({periodo})'}.")
     return df
 
-def transform_fact_table(df_oltp, engine_dw):
+def normalizar_fecha(serie):
+    """
+    Convierte una columna de fechas (objetos date, texto o date32 de Arrow) a datetime64.
+    
+    Args:
+        serie (pd.Series): Columna de fechas
+    
+    Returns:
+        pd.Series: Columna datetime64
+    """
+    return pd.to_datetime(serie)
+
+def normalizar_hora(serie):
+    """
+    Convierte una columna de horas a timedelta64 (tiempo transcurrido desde medianoche).
+    Las columnas time64 de Arrow se convierten sin pasar por objetos Python.
+    
+    Args:
+        serie (pd.Series): Columna de horas (objetos time, texto o time64 de Arrow)
+    
+    Returns:
+        pd.Series: Columna timedelta64
+    """
+    if isinstance(serie.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if pa.types.is_time(serie.dtype.pyarrow_dtype):
+            microsegundos = pc.cast(pc.cast(pa.array(serie), pa.time64('us')), pa.int64())
+            return pd.Series(
+                pd.to_timedelta(microsegundos.to_numpy(zero_copy_only=False), unit='us'),
+                index=serie.index
+            )
+    return pd.to_timedelta(serie.astype(str), errors='coerce')
+
+def polars_disponible():
+    """
+    Indica si la dependencia opcional del backend de transformación Polars está instalada.
+
+    Returns:
+        bool: True si polars puede importarse
+    """
+    try:
+        import polars  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def cargar_dimensiones_lookup(engine_dw):
+    """
+    Carga desde el DW las columnas de cada dimensión usadas en los lookups de la
+    tabla de hechos, con las fechas y horas ya convertidas a datetime64/timedelta64.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        dict: Nombre de la dimensión -> DataFrame de lookup
+    """
+    dimensiones = {
+        "Dim_Fecha": read_dimension(engine_dw, "Dim_Fecha", ['Fecha_Key', 'Fecha_Completa']),
+        "Dim_Hora": read_dimension(engine_dw, "Dim_Hora", ['Hora_Key', 'Hora_Completa']),
+        "Dim_Cliente": read_dimension(engine_dw, "Dim_Cliente", ['Cliente_Key', 'Cliente_ID_Operacional']),
+        "Dim_Sede": read_dimension(engine_dw, "Dim_Sede", ['Sede_Key', 'Sede_ID_Operacional']),
+        "Dim_Geografia": read_dimension(engine_dw, "Dim_Geografia", ['Geografia_Key', 'Ciudad_ID_Operacional']),
+        "Dim_Mensajero": read_dimension(engine_dw, "Dim_Mensajero", ['Mensajero_Key', 'Mensajero_ID_Operacional']),
+        "Dim_Estado_Servicio": read_dimension(engine_dw, "Dim_Estado_Servicio", ['Estado_Servicio_Key', 'Orden_Estado']),
+        "Dim_Urgencia_Servicio": read_dimension(engine_dw, "Dim_Urgencia_Servicio", ['Urgencia_Servicio_Key', 'Urgencia_ID_Operacional']),
+        "Dim_Novedad": read_dimension(engine_dw, "Dim_Novedad", ['Novedad_Key', 'Descripcion_Novedad', 'Novedad_ID_Operacional'])
+    }
+    dimensiones["Dim_Fecha"]['Fecha_Completa'] = normalizar_fecha(dimensiones["Dim_Fecha"]['Fecha_Completa'])
+    dimensiones["Dim_Hora"]['Hora_Completa'] = normalizar_hora(dimensiones["Dim_Hora"]['Hora_Completa'])
+    print("Dimensiones cargadas desde el DW para lookup.")
+    return dimensiones
+
+def novedad_sin_novedad(df_dim_novedad):
+    """
+    Retorna la clave de la novedad 'Sin Novedad' (asignada a los servicios sin novedades).
+    """
+    return df_dim_novedad[df_dim_novedad['Descripcion_Novedad'] == 'Sin Novedad']['Novedad_Key'].iloc[0]
+
+def es_arrow(serie, tipo):
+    """
+    Indica si una columna está respaldada por Arrow con el tipo indicado (p. ej. 'date32').
+    """
+    return isinstance(serie.dtype, pd.ArrowDtype) and str(serie.dtype.pyarrow_dtype).startswith(tipo)
+
+def transform_fact_table(df_oltp, engine_dw, backend=None, codificador=None):
     """
     Transforma los datos extraídos realizando lookups con todas las dimensiones
     para obtener las claves foráneas y construir la tabla de hechos final.
@@ -45,27 +288,32 @@ def transform_fact_table(df_oltp, engine_dw):
     Args:
         df_oltp (pd.DataFrame): DataFrame con datos extraídos del OLTP
         engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse para lookups
+        backend (str): 'pandas' o 'polars'. Si es None se usa BACKEND_TRANSFORMACION
+        codificador (callable): Función serie -> claves Int64 para la dirección
+            (None = encode_values sobre el diccionario del DW)
     
     Returns:
         pd.DataFrame: DataFrame de la tabla de hechos con todas las claves foráneas
     """
+    backend = backend or BACKEND_TRANSFORMACION
+    if backend not in BACKENDS_TRANSFORMACION:
+        raise ValueError(f"Backend de transformación desconocido: '{backend}'. Opciones: {BACKENDS_TRANSFORMACION}")
+    if backend == "polars":
+        if polars_disponible():
+            return transform_fact_table_polars(df_oltp, engine_dw, codificador)
+        print("Advertencia: polars no está instalado; la transformación usa pandas.")
+
     # Cargar todas las dimensiones del DW para lookup
-    df_dim_fecha = pd.read_sql('SELECT "Fecha_Key", "Fecha_Completa" FROM "Dim_Fecha"', engine_dw)
-    df_dim_hora = pd.read_sql('SELECT "Hora_Key", "Hora_Completa" FROM "Dim_Hora"', engine_dw)
-    df_dim_cliente = pd.read_sql('SELECT "Cliente_Key", "Cliente_ID_Operacional" FROM "Dim_Cliente"', engine_dw)
-    df_dim_sede = pd.read_sql('SELECT "Sede_Key", "Sede_ID_Operacional" FROM "Dim_Sede"', engine_dw)
-    df_dim_geografia = pd.read_sql('SELECT "Geografia_Key", "Ciudad_ID_Operacional" FROM "Dim_Geografia"', engine_dw)
-    df_dim_mensajero = pd.read_sql('SELECT "Mensajero_Key", "Mensajero_ID_Operacional" FROM "Dim_Mensajero"', engine_dw)
-    df_dim_estado = pd.read_sql('SELECT "Estado_Servicio_Key", "Orden_Estado" FROM "Dim_Estado_Servicio"', engine_dw)
-    df_dim_urgencia = pd.read_sql('SELECT "Urgencia_Servicio_Key", "Urgencia_ID_Operacional" FROM "Dim_Urgencia_Servicio"', engine_dw)
-    df_dim_novedad = pd.read_sql('SELECT "Novedad_Key", "Descripcion_Novedad", "Novedad_ID_Operacional" FROM "Dim_Novedad"', engine_dw)
-    print("Dimensiones cargadas desde el DW para lookup.")
+    dimensiones = cargar_dimensiones_lookup(engine_dw)
+    df_dim_fecha, df_dim_hora = dimensiones["Dim_Fecha"], dimensiones["Dim_Hora"]
+    df_dim_cliente, df_dim_sede = dimensiones["Dim_Cliente"], dimensiones["Dim_Sede"]
+    df_dim_geografia, df_dim_mensajero = dimensiones["Dim_Geografia"], dimensiones["Dim_Mensajero"]
+    df_dim_estado, df_dim_urgencia = dimensiones["Dim_Estado_Servicio"], dimensiones["Dim_Urgencia_Servicio"]
+    df_dim_novedad = dimensiones["Dim_Novedad"]
 
-    # Convertir columnas de fecha/hora a tipos compatibles para merge
-    df_oltp['fecha'] = pd.to_datetime(df_oltp['fecha']).dt.date
-    df_dim_fecha['Fecha_Completa'] = pd.to_datetime(df_dim_fecha['Fecha_Completa']).dt.date
-    df_oltp['hora'] = pd.to_datetime(df_oltp['hora'].astype(str), errors='coerce').dt.time
-    df_dim_hora['Hora_Completa'] = pd.to_datetime(df_dim_hora['Hora_Completa'].astype(str), errors='coerce').dt.time
+    # Convertir columnas de fecha/hora a tipos columnares nativos (datetime64/timedelta64) para merge
+    df_oltp['fecha'] = normalizar_fecha(df_oltp['fecha'])
+    df_oltp['hora'] = normalizar_hora(df_oltp['hora'])
     
     # Realizar lookups con todas las dimensiones
     df_merged = df_oltp
@@ -86,25 +334,27 @@ def transform_fact_table(df_oltp, engine_dw):
     
     # Lookup especial para Novedad (incluye manejo de "Sin Novedad")
     df_merged = pd.merge(df_merged, df_dim_novedad.add_prefix('novedad_'), left_on='Tipo_Novedad_ID', right_on='novedad_Novedad_ID_Operacional', how='left')
-    novedad_sin_key = df_dim_novedad[df_dim_novedad['Descripcion_Novedad'] == 'Sin Novedad']['Novedad_Key'].iloc[0]
+    novedad_sin_key = novedad_sin_novedad(df_dim_novedad)
     df_merged['Novedad_Key'] = df_merged['novedad_Novedad_Key'].fillna(novedad_sin_key)
 
     # Seleccionar columnas finales para la tabla de hechos
     df_fact = df_merged[[
         'Fecha_Key', 'Hora_Key', 'Cliente_Key', 'Sede_Origen_Key', 'Geografia_Destino_Key',
-        'Mensajero_Key', 'Estado_Servicio_Key', 'Urgencia_Servicio_Key', 'Novedad_Key',
-        'Servicio_ID_Operacional', 'Direccion_Destino'
+        'Mensajero_Key', 'Estado_Servicio_Key', 'Urgencia_Servicio_Key', 'Novedad_Key'
     ]]
+
+    # Dimensiones degeneradas en enteros: id del servicio (entero en el OLTP) y la
+    # dirección codificada con su diccionario (Dim_Direccion_Destino)
+    df_fact['Servicio_ID_Operacional'] = df_merged['Servicio_ID_Operacional'].astype('int64')
+    codificador = codificador or (lambda serie: encode_values(serie, engine_dw))
+    df_fact['Direccion_Destino_Key'] = codificador(df_merged['Direccion_Destino'])
     
     # Agregar métricas y campos calculados
-    df_fact['Timestamp_Estado'] = pd.to_datetime(
-        df_merged['fecha'].astype(str) + ' ' + df_merged['hora'].astype(str),
-        errors='coerce'
-    )
+    df_fact['Timestamp_Estado'] = df_merged['fecha'] + df_merged['hora']
     df_fact['Contador_Estados'] = 1
     
-    # Generar clave primaria surrogate
-    df_fact.insert(0, 'Servicio_Estado_Key', range(1, 1 + len(df_fact)))
+    # Clave primaria estable entre particiones: id del evento en el OLTP
+    df_fact.insert(0, 'Servicio_Estado_Key', df_merged['Servicio_Estado_ID'].astype('int64'))
 
     # Manejar valores nulos en claves foráneas opcionales
     for col in ['Mensajero_Key', 'Urgencia_Servicio_Key']:
@@ -113,37 +363,287 @@ def transform_fact_table(df_oltp, engine_dw):
     print("Transformación de la tabla de hechos completada.")
     return df_fact.astype({'Novedad_Key': 'int64', 'Mensajero_Key': 'int64', 'Urgencia_Servicio_Key': 'int64'})
     
-def load_fact_table_to_dw(df, engine_dw):
+def transform_fact_table_polars(df_oltp, engine_dw, codificador=None):
+    """
+    Variante de transform_fact_table sobre un LazyFrame de Polars: los nueve
+    lookups, las claves por defecto y los campos calculados forman un solo plan
+    que se optimiza (solo se leen las columnas usadas) y se ejecuta en streaming,
+    sin los DataFrames intermedios de cada merge. El resultado es idéntico al del
+    backend pandas (mismas columnas, tipos y orden de filas).
+
+    Args:
+        df_oltp (pd.DataFrame): DataFrame con datos extraídos del OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse para lookups
+        codificador (callable): Función serie -> claves Int64 para la dirección
+            (None = encode_values sobre el diccionario del DW)
+
+    Returns:
+        pd.DataFrame: DataFrame de la tabla de hechos con todas las claves foráneas
+    """
+    import polars as pl
+
+    dimensiones = cargar_dimensiones_lookup(engine_dw)
+    novedad_sin_key = novedad_sin_novedad(dimensiones["Dim_Novedad"])
+
+    # Las fechas date32 y horas time64 de Arrow se convierten dentro del plan; otros
+    # tipos pasan por los mismos normalizadores que el backend pandas
+    fecha, hora = df_oltp['fecha'], df_oltp['hora']
+    fecha_arrow, hora_arrow = es_arrow(fecha, "date32"), es_arrow(hora, "time64")
+    fecha = fecha if fecha_arrow else normalizar_fecha(fecha)
+    hora = hora if hora_arrow else normalizar_hora(hora)
+    # Tipo del timestamp en el backend pandas (depende de la versión de pandas y del origen)
+    tipo_timestamp = (
+        (normalizar_fecha(fecha.iloc[:0]) if fecha_arrow else fecha.iloc[:0]) +
+        (normalizar_hora(hora.iloc[:0]) if hora_arrow else hora.iloc[:0])
+    ).dtype
+    # Polars no tiene resolución de segundos: se suma en la unidad más fina disponible
+    unidad = np.datetime_data(tipo_timestamp)[0]
+    unidad = unidad if unidad in ("ms", "us", "ns") else "ms"
+
+    # La dirección entra al plan ya codificada (la codificación asigna claves en el DW):
+    # el texto no se copia a Polars ni de vuelta
+    columnas = ["Servicio_Estado_ID", "Servicio_ID_Operacional"] + [
+        columna for _, columna, _, _, _ in LOOKUPS_POLARS if columna not in ("fecha", "hora")
+    ]
+    codificador = codificador or (lambda serie: encode_values(serie, engine_dw))
+    df_entrada = df_oltp[columnas].assign(
+        fecha=fecha, hora=hora, Direccion_Destino_Key=codificador(df_oltp['Direccion_Destino'])
+    )
+    hora_plan = pl.col("hora").cast(pl.Int64).cast(pl.Duration("ns")) if hora_arrow else pl.col("hora")
+    lf = pl.from_pandas(df_entrada).lazy().with_columns(
+        pl.col("fecha").cast(pl.Datetime(unidad)), hora_plan.cast(pl.Duration(unidad))
+    )
+
+    # Un join por dimensión (left, conserva el orden de las filas; los nulos se
+    # emparejan entre sí como en pd.merge)
+    for tabla, columna, id_operacional, clave, nombre in LOOKUPS_POLARS:
+        df_dim = pl.from_pandas(dimensiones[tabla][[clave, id_operacional]])
+        lf = lf.join(
+            df_dim.lazy().rename({clave: nombre}),
+            left_on=pl.col(columna).cast(df_dim.schema[id_operacional], strict=False),
+            right_on=id_operacional, how="left", nulls_equal=True, maintain_order="left"
+        )
+
+    df_fact = lf.select(
+        pl.col("Servicio_Estado_ID").cast(pl.Int64).alias("Servicio_Estado_Key"),
+        "Fecha_Key", "Hora_Key", "Cliente_Key", "Sede_Origen_Key", "Geografia_Destino_Key",
+        pl.col("Mensajero_Key").fill_null(-1).cast(pl.Int64),
+        "Estado_Servicio_Key",
+        pl.col("Urgencia_Servicio_Key").fill_null(-1).cast(pl.Int64),
+        pl.col("Novedad_Key").fill_null(int(novedad_sin_key)).cast(pl.Int64),
+        pl.col("Servicio_ID_Operacional").cast(pl.Int64),
+        "Direccion_Destino_Key",
+        (pl.col("fecha") + pl.col("hora")).alias("Timestamp_Estado"),
+        pl.lit(1, dtype=pl.Int64).alias("Contador_Estados")
+    ).collect(engine="streaming").to_pandas()
+
+    # to_pandas convierte los enteros con nulos a float64 (como pd.merge); la clave
+    # de la dirección y el timestamp recuperan los tipos del backend pandas
+    df_fact = df_fact.astype({"Direccion_Destino_Key": "Int64", "Timestamp_Estado": tipo_timestamp})
+    print("Transformación de la tabla de hechos completada (backend polars).")
+    return df_fact
+
+def load_fact_table_to_dw(df, engine_dw, periodo, chunksize=None):
+    """
+    Carga la partición mensual de la tabla de hechos en su propio archivo SQLite.
+    
+    Args:
+        df (pd.DataFrame): DataFrame de la tabla de hechos del periodo
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodo (str): Periodo mensual 'YYYY-MM'
+        chunksize (int): Filas por lote (None = tamaño de lote del plan)
+    """
+    write_partition(df, periodo, engine_dw, chunksize=chunksize or get_step_plan(PASO)["lote"])
+
+def inicio_ventana_hash(hoy=None):
+    """
+    Primer día del periodo más antiguo de la ventana de hash de contenido.
+
+    Args:
+        hoy (date): Fecha de referencia (None = hoy)
+
+    Returns:
+        date: Primer día del mes VENTANA_HASH_MESES - 1 meses antes del actual
+    """
+    hoy = hoy or date.today()
+    meses = hoy.year * 12 + hoy.month - 1 - (VENTANA_HASH_MESES - 1)
+    return date(meses // 12, meses % 12 + 1, 1)
+
+def extract_huellas_origen(engine_oltp):
+    """
+    Calcula en el OLTP la huella de cada periodo mensual: la señal barata (filas,
+    id máximo y versión de fila más reciente) de todos los periodos, y el hash de
+    contenido solo de los periodos de la ventana reciente.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+
+    Returns:
+        pd.DataFrame: Columnas periodo, filas, max_id, max_version y hash (None fuera de la ventana)
+    """
+    df_senal = pd.read_sql(QUERY_SENAL_PERIODOS, engine_oltp)
+    df_hash = pd.read_sql(query_hash_periodos(inicio_ventana_hash()), engine_oltp)
+    df_periodos = df_senal.merge(df_hash, on="periodo", how="left")
+    df_periodos["hash"] = df_periodos["hash"].astype(object).where(df_periodos["hash"].notna(), None)
+    return df_periodos
+
+def _clave_oltp(engine_oltp):
+    return engine_oltp.url.render_as_string(hide_password=True)
+
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de las tablas origen de la tabla de hechos a
+    partir de la huella de cada periodo: un UPDATE en el lugar (un mensajero
+    reasignado, un estado corregido, una dirección editada) la cambia aunque no
+    cambien el número de filas ni el id máximo.
+    
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+    
+    Returns:
+        str: Huella de las tablas origen
+    """
+    df_periodos = extract_huellas_origen(engine_oltp)
+    # main reutiliza el resultado si se ejecuta enseguida (ver get_fingerprints_periodos)
+    _huellas_origen[_clave_oltp(engine_oltp)] = (time.monotonic(), df_periodos)
+    return hash_parts([
+        f"{f.periodo}:{f.filas}:{f.max_id}:{f.max_version}:{f.hash}"
+        for f in df_periodos.sort_values("periodo").itertuples(index=False)
+    ])
+
+def destino_existe(engine_dw):
+    """
+    Indica si la tabla de hechos particionada ya fue cargada (existe su catálogo).
+    
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+    
+    Returns:
+        bool: True si existe el catálogo de particiones
+    """
+    return table_exists(engine_dw, CATALOG_TABLE)
+
+def get_fingerprints_periodos(engine_oltp, engine_dw):
     """
-    Carga la tabla de hechos transformada en el Data Warehouse.
+    Calcula la huella de cada periodo mensual. Incluye las huellas guardadas de las
+    dimensiones y el formato de las particiones: si una dimensión se recarga o el
+    formato cambia, todas las particiones se reconstruyen. En los periodos de la
+    ventana reciente la huella lleva además el hash de contenido tras un '|'
+    (ver periodo_cambiado).
     
     Args:
-        df (pd.DataFrame): DataFrame de la tabla de hechos a cargar
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+    
+    Returns:
+        dict: Periodo -> huella
+    """
+    huellas_dimensiones = [get_stored_fingerprint(engine_dw, d) for d in DEPENDENCIAS]
+    # Si get_fingerprint acaba de calcular las huellas (decisión de ejecutar el paso) se reutilizan
+    calculadas, df_periodos = _huellas_origen.pop(_clave_oltp(engine_oltp), (None, None))
+    if df_periodos is None or time.monotonic() - calculadas > VIGENCIA_HUELLAS:
+        df_periodos = extract_huellas_origen(engine_oltp)
+    huellas = {}
+    for fila in df_periodos.itertuples(index=False):
+        senal = hash_parts([fila.periodo, fila.filas, fila.max_id, fila.max_version, FORMATO_PARTICION] + huellas_dimensiones)
+        huellas[fila.periodo] = senal if fila.hash is None else f"{senal}|{fila.hash}"
+    return huellas
+
+def periodo_cambiado(guardada, huella):
+    """
+    Indica si un periodo debe recargarse: cambió su señal, o está en la ventana
+    reciente y cambió su hash de contenido. Cuando el periodo sale de la ventana
+    su huella pierde el hash sin que eso cuente como cambio.
+
+    Args:
+        guardada (str): Huella guardada en la última carga del periodo (None si no hay)
+        huella (str): Huella actual (get_fingerprints_periodos)
+
+    Returns:
+        bool: True si el periodo cambió
+    """
+    if guardada is None:
+        return True
+    senal, _, contenido = huella.partition("|")
+    senal_guardada, _, contenido_guardado = guardada.partition("|")
+    return senal != senal_guardada or (contenido != "" and contenido != contenido_guardado)
+
+def transformar_periodo(engine_oltp, engine_dw, periodo, plan=None):
+    """
+    Extrae y transforma los eventos de un periodo mensual como en la carga serial
+    del paso (extracción según el plan, lookups y codificación de la dirección
+    en el diccionario del DW).
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
         engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodo (str): Periodo mensual 'YYYY-MM'
+        plan (dict): Plan del paso (None = get_step_plan)
+
+    Returns:
+        pd.DataFrame: Filas de la tabla de hechos del periodo
     """
-    df.to_sql("Fact_Cambio_Estado_Servicio", engine_dw, if_exists='replace', index=False, chunksize=10000)
-    print("Tabla de hechos cargada exitosamente en el DW.")
+    plan = plan or get_step_plan(PASO)
+    df_oltp = extract_cambios_estado_oltp(engine_oltp, periodo, particiones=plan["particiones_extraccion"])
+    return transform_fact_table(df_oltp, engine_dw)
 
 def main():
     """
     Función principal que orquesta el proceso ETL completo para la tabla de hechos.
-    Extrae eventos del OLTP, realiza transformaciones con lookups y carga al DW.
+    Detecta los periodos mensuales que cambiaron en el OLTP y solo para ellos
+    extrae eventos, realiza transformaciones con lookups y reescribe la partición.
     """
     print("\nIniciando ETL para Fact_Cambio_Estado_Servicio...")
     
     engine_oltp = get_oltp_engine()
     engine_dw = get_dw_engine()
 
-    # Extracción desde OLTP
-    df_oltp = extract_cambios_estado_oltp(engine_oltp)
-    
-    # Transformación con lookups dimensionales
-    df_fact = transform_fact_table(df_oltp, engine_dw)
-    
-    # Carga hacia DW
-    load_fact_table_to_dw(df_fact, engine_dw)
+    # La tabla monolítica anterior queda reemplazada por las particiones mensuales
+    with engine_dw.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS "{FACT_TABLE}"'))
+
+    # Detección de periodos modificados
+    huellas = get_fingerprints_periodos(engine_oltp, engine_dw)
+    particiones_existentes = set(list_partitions(engine_dw)['Periodo'])
+    periodos_cambiados = [
+        periodo for periodo, huella in sorted(huellas.items())
+        if periodo not in particiones_existentes
+        or periodo_cambiado(get_stored_fingerprint(engine_dw, f"{PASO}:{periodo}"), huella)
+    ]
+    plan = get_step_plan(PASO)
+    workers = max(1, min(plan["workers"], len(periodos_cambiados)))
+    print(f"Periodos en el OLTP: {len(huellas)} | Periodos a recargar: {len(periodos_cambiados)} | "
+          f"Workers: {workers} | Particiones de extracción: {plan['particiones_extraccion']} | Lote: {plan['lote']}")
+
+    # Las escrituras en el archivo principal del DW (catálogo y huellas) se serializan
+    lock_carga = threading.Lock()
+
+    def procesar_periodo(periodo):
+        # Extracción desde OLTP y transformación con lookups dimensionales
+        df_fact = transformar_periodo(engine_oltp, engine_dw, periodo, plan)
+        
+        # Carga hacia DW
+        with lock_carga:
+            load_fact_table_to_dw(df_fact, engine_dw, periodo, chunksize=plan["lote"])
+            save_fingerprint(engine_dw, f"{PASO}:{periodo}", huellas[periodo])
+
+    if workers == 1:
+        for periodo in periodos_cambiados:
+            procesar_periodo(periodo)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for futuro in [executor.submit(procesar_periodo, p) for p in periodos_cambiados]:
+                futuro.result()
+
+    # Periodos que ya no existen en el OLTP
+    for periodo in sorted(particiones_existentes - set(huellas)):
+        drop_partition(periodo, engine_dw)
+        delete_fingerprints(engine_dw, f"{PASO}:{periodo}")
+
+    # El catálogo no puede referenciar más archivos de los que SQLite puede adjuntar
+    compact_partitions(engine_dw)
     
     print("Proceso de Fact_Cambio_Estado_Servicio completado.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,341 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from ..utils.db_connections import get_dw_engine
+from ..utils.fingerprints import (
+    hash_parts, get_stored_fingerprint, save_fingerprint, list_fingerprints, delete_fingerprints, table_exists
+)
+from ..utils.partitions import connect_dw, list_partitions, query_fact
+from ..utils.dim_cache import read_dimension
+from ..utils.planner import get_step_plan
+from ..analysis.ocupacion import (
+    MINUTOS_POR_DIA, timestamps_a_minutos, calcular_segmentos, ocupacion_por_minuto, ocupacion_por_hora
+)
+
+TABLA_DESTINO = "Fact_Ocupacion_Mensajero"
+TABLA_MINUTO = "Fact_Ocupacion_Minuto"
+DEPENDENCIAS = ["10_fact_cambio_estado_servicio"]
+PASO = __name__.rsplit(".", 1)[-1]
+# Tabla del OLTP usada por el planificador para estimar el volumen del paso
+TABLA_VOLUMEN = "public.mensajeria_estadosservicio"
+# La huella se calcula sobre el DW (catálogo de particiones), no sobre el OLTP
+ORIGEN_HUELLA = "dw"
+
+# Un servicio ocupa al mensajero desde el estado "Con mensajero asignado" (Orden_Estado = 2)
+# hasta el primer estado terminal (el Orden_Estado máximo, "Terminado completo")
+ORDEN_ESTADO_ASIGNADO = 2
+# Un servicio sin estado terminal se considera activo como mucho este tiempo desde su
+# asignación; pasado ese plazo se da por abandonado y deja de ocupar al mensajero
+DURACION_MAXIMA_ABIERTO = pd.Timedelta(hours=24)
+# Servicios por consulta en la extracción incremental (SQLite admite hasta 32766 parámetros)
+LOTE_SERVICIOS = 10000
+
+QUERY_INTERVALOS = f"""
+SELECT
+    MAX(f.Mensajero_Key) AS Mensajero_Key,
+    MIN(CASE WHEN e.Orden_Estado >= {ORDEN_ESTADO_ASIGNADO} THEN f.Timestamp_Estado END) AS Inicio,
+    MIN(CASE WHEN e.Orden_Estado = t.Orden_Terminal THEN f.Timestamp_Estado END) AS Fin
+FROM
+    Fact_Cambio_Estado_Servicio f
+JOIN
+    Dim_Estado_Servicio e ON f.Estado_Servicio_Key = e.Estado_Servicio_Key
+CROSS JOIN
+    (SELECT MAX(Orden_Estado) AS Orden_Terminal FROM Dim_Estado_Servicio) t
+{{filtro}}
+GROUP BY
+    f.Servicio_ID_Operacional
+HAVING
+    Inicio IS NOT NULL AND MAX(f.Mensajero_Key) > 0
+"""
+
+def get_fingerprint(engine_dw):
+    """
+    Calcula la huella de la ocupación a partir del catálogo de particiones de la
+    tabla de hechos (se deriva del DW, no del OLTP; ver ORIGEN_HUELLA). Solo lee.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        str: Huella del estado de las particiones
+    """
+    df = list_partitions(engine_dw, solo_lectura=True)
+    return hash_parts(["|".join(map(str, fila)) for fila in df[['Periodo', 'Filas', 'Fecha_Actualizacion']].itertuples(index=False)])
+
+def destino_existe(engine_dw):
+    """
+    Indica si las tablas de ocupación ya existen en el DW.
+    """
+    return table_exists(engine_dw, TABLA_DESTINO) and table_exists(engine_dw, TABLA_MINUTO)
+
+def periodos_modificados(engine_dw, todos=False):
+    """
+    Determina las particiones de la tabla de hechos que cambiaron desde el último
+    refresco de la ocupación.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        todos (bool): Si es True, retorna todas las particiones con fecha
+
+    Returns:
+        dict: Periodo -> huella de la partición, solo para los periodos modificados
+    """
+    df = list_partitions(engine_dw)
+    huellas = {
+        fila.Periodo: hash_parts([fila.Periodo, fila.Filas, fila.Fecha_Actualizacion])
+        for fila in df.itertuples(index=False) if not pd.isna(fila.Fecha_Key_Min)
+    }
+    if todos:
+        return huellas
+    return {p: h for p, h in huellas.items() if get_stored_fingerprint(engine_dw, f"{PASO}:{p}") != h}
+
+def periodos_eliminados(engine_dw):
+    """
+    Periodos materializados en un refresco anterior cuya partición ya no existe
+    (el paso 10 la eliminó porque el periodo desapareció del OLTP).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        list: Periodos 'YYYY-MM' ordenados
+    """
+    existentes = set(list_partitions(engine_dw)['Periodo'])
+    prefijo = f"{PASO}:"
+    return sorted(
+        paso[len(prefijo):] for paso in list_fingerprints(engine_dw, prefijo)
+        if paso[len(prefijo):] not in existentes
+    )
+
+def servicios_recientes(desde):
+    """
+    Servicios con algún cambio de estado desde la fecha indicada. Solo se adjuntan
+    las particiones de ese rango de fechas.
+
+    Args:
+        desde (pd.Timestamp): Primer instante de interés
+
+    Returns:
+        list: Valores de Servicio_ID_Operacional
+    """
+    fecha_key_desde = pd.read_sql(
+        'SELECT MIN("Fecha_Key") AS k FROM "Dim_Fecha" WHERE "Fecha_Completa" >= :f',
+        get_dw_engine(), params={"f": desde.strftime('%Y-%m-%d')}
+    )['k'].iloc[0]
+    df = query_fact(
+        "SELECT DISTINCT Servicio_ID_Operacional FROM Fact_Cambio_Estado_Servicio WHERE Timestamp_Estado >= :desde",
+        None if pd.isna(fecha_key_desde) else int(fecha_key_desde),
+        params={"desde": desde.strftime('%Y-%m-%d %H:%M:%S')}
+    )
+    return df['Servicio_ID_Operacional'].tolist()
+
+def extract_intervalos_dw(fecha_refresco=None):
+    """
+    Extrae un intervalo de actividad por servicio desde la tabla de hechos: desde el
+    primer estado con mensajero asignado hasta el primer estado terminal. Los
+    servicios sin estado terminal siguen abiertos hasta el corte de la carga (el
+    último Timestamp_Estado cargado), pero nunca más de DURACION_MAXIMA_ABIERTO
+    desde su asignación.
+
+    En un refresco incremental solo pueden ocupar minutos posteriores a
+    fecha_refresco los servicios cerrados después de esa fecha (tienen su estado
+    terminal en el rango) o asignados menos de DURACION_MAXIMA_ABIERTO antes. Por
+    eso se buscan primero los servicios con estados desde fecha_refresco menos esa
+    duración (con poda de particiones) y solo se leen sus estados, por lotes y con
+    el índice (Servicio_ID_Operacional, Timestamp_Estado) de cada partición.
+
+    Args:
+        fecha_refresco (pd.Timestamp): Primer día a materializar (None = todos)
+
+    Returns:
+        pd.DataFrame: Columnas Mensajero_Key, Inicio y Fin
+    """
+    servicios = None
+    if fecha_refresco is not None:
+        servicios = servicios_recientes(fecha_refresco - DURACION_MAXIMA_ABIERTO)
+    connection = connect_dw(decodificar=False)
+    try:
+        corte = connection.execute("SELECT MAX(Timestamp_Estado) FROM Fact_Cambio_Estado_Servicio").fetchone()[0]
+        if servicios is None:
+            df = pd.read_sql_query(QUERY_INTERVALOS.format(filtro=""), connection)
+        else:
+            # SQLite lleva a cada rama de la vista UNION ALL una lista IN de valores, no una subconsulta
+            lotes = [
+                pd.read_sql_query(
+                    QUERY_INTERVALOS.format(
+                        filtro=f"WHERE f.Servicio_ID_Operacional IN ({', '.join('?' * len(lote))})"
+                    ),
+                    connection, params=lote
+                )
+                for lote in (servicios[i:i + LOTE_SERVICIOS] for i in range(0, len(servicios), LOTE_SERVICIOS))
+            ]
+            df = pd.concat(lotes, ignore_index=True) if lotes else pd.DataFrame(columns=['Mensajero_Key', 'Inicio', 'Fin'])
+    finally:
+        connection.close()
+
+    df['Inicio'] = pd.to_datetime(df['Inicio'], format="ISO8601")
+    df['Fin'] = pd.to_datetime(df['Fin'], format="ISO8601")
+    abiertos = df['Fin'].isna()
+    limite = (df.loc[abiertos, 'Inicio'] + DURACION_MAXIMA_ABIERTO).clip(upper=pd.Timestamp(corte) if corte else None)
+    df.loc[abiertos, 'Fin'] = limite
+    if fecha_refresco is not None:
+        df = df[df['Fin'] > fecha_refresco].reset_index(drop=True)
+    print(f"Se extrajeron {len(df)} intervalos de servicio desde la tabla de hechos "
+          f"({int(abiertos.sum())} abiertos, hasta el corte {corte} o {DURACION_MAXIMA_ABIERTO} tras la asignación).")
+    return df
+
+def transform_ocupacion(df_intervalos, engine_dw, fecha_refresco=None):
+    """
+    Calcula la concurrencia de servicios por mensajero con el barrido vectorizado y
+    la materializa a granularidad de minuto (agregada) y de hora (por mensajero).
+
+    Args:
+        df_intervalos (pd.DataFrame): Intervalos por servicio (Mensajero_Key, Inicio, Fin)
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse para lookups
+        fecha_refresco (pd.Timestamp): Primer día a materializar (None = todos)
+
+    Returns:
+        tuple: (df_minuto, df_hora) listos para cargar
+    """
+    # El intervalo termina (exclusivo) en el minuto del estado terminal o en el límite de los abiertos
+    inicio = timestamps_a_minutos(df_intervalos['Inicio'])
+    fin = timestamps_a_minutos(df_intervalos['Fin'])
+    minuto_minimo = None
+    if fecha_refresco is not None:
+        minuto_minimo = int(np.datetime64(fecha_refresco, 'm').astype(np.int64))
+
+    mensajero, desde, hasta, activos = calcular_segmentos(df_intervalos['Mensajero_Key'].to_numpy(), inicio, fin)
+    print(f"Barrido completado: {len(desde)} segmentos de ocupación.")
+
+    df_minuto = ocupacion_por_minuto(desde, hasta, activos, minuto_minimo)
+    df_hora = ocupacion_por_hora(mensajero, desde, hasta, activos, minuto_minimo)
+
+    # Lookups de Fecha_Key y Hora_Key
+    df_dim_fecha = read_dimension(engine_dw, "Dim_Fecha", ['Fecha_Key', 'Fecha_Completa'])
+    df_dim_hora = read_dimension(engine_dw, "Dim_Hora", ['Hora_Key', 'Hora_Del_Dia', 'Minuto_De_La_Hora'])
+    df_dim_fecha['Fecha_Completa'] = pd.to_datetime(df_dim_fecha['Fecha_Completa'])
+
+    minutos = df_minuto['Minuto'].to_numpy(dtype=np.int64)
+    df_minuto['Fecha_Completa'] = pd.to_datetime((minutos // MINUTOS_POR_DIA).astype('datetime64[D]'))
+    df_minuto['Hora_Del_Dia'] = (minutos % MINUTOS_POR_DIA) // 60
+    df_minuto['Minuto_De_La_Hora'] = minutos % 60
+    df_minuto = pd.merge(df_minuto, df_dim_fecha, on='Fecha_Completa', how='left')
+    df_minuto = pd.merge(df_minuto, df_dim_hora, on=['Hora_Del_Dia', 'Minuto_De_La_Hora'], how='left')
+    df_minuto = df_minuto[['Fecha_Key', 'Hora_Key', 'Servicios_Activos', 'Mensajeros_Ocupados']]
+
+    horas = df_hora['Hora'].to_numpy(dtype=np.int64)
+    df_hora['Fecha_Completa'] = pd.to_datetime((horas // 24).astype('datetime64[D]'))
+    df_hora['Hora_Del_Dia'] = horas % 24
+    df_hora['Minuto_De_La_Hora'] = 0
+    df_hora = pd.merge(df_hora, df_dim_fecha, on='Fecha_Completa', how='left')
+    df_hora = pd.merge(df_hora, df_dim_hora, on=['Hora_Del_Dia', 'Minuto_De_La_Hora'], how='left')
+    df_hora = df_hora[[
+        'Fecha_Key', 'Hora_Key', 'Hora_Del_Dia', 'Mensajero_Key',
+        'Minutos_Ocupado', 'Servicios_Activos_Promedio', 'Servicios_Activos_Max'
+    ]]
+
+    # Minutos fuera del rango de Dim_Fecha no tienen clave y no se materializan
+    df_minuto = df_minuto.dropna(subset=['Fecha_Key']).astype({'Fecha_Key': 'int64'})
+    df_hora = df_hora.dropna(subset=['Fecha_Key']).astype({'Fecha_Key': 'int64'})
+
+    print("Transformación de ocupación de mensajeros completada.")
+    return df_minuto, df_hora
+
+def load_ocupacion_to_dw(df_minuto, df_hora, engine_dw, fecha_key_desde=None):
+    """
+    Carga la ocupación en el DW reemplazando solo las fechas refrescadas.
+
+    Args:
+        df_minuto (pd.DataFrame): Ocupación agregada por minuto
+        df_hora (pd.DataFrame): Ocupación por mensajero y hora
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        fecha_key_desde (int): Primera Fecha_Key refrescada (None = recarga completa)
+    """
+    cargas = [
+        (df_minuto, TABLA_MINUTO, {"idx_ocupacion_minuto_fecha_hora": ("Fecha_Key", "Hora_Key")}),
+        (df_hora, TABLA_DESTINO, {
+            "idx_ocupacion_fecha_hora": ("Fecha_Key", "Hora_Del_Dia"),
+            "idx_ocupacion_mensajero": ("Mensajero_Key", "Fecha_Key")
+        })
+    ]
+    lote = get_step_plan(PASO)["lote"]
+    for df, tabla, indices in cargas:
+        if fecha_key_desde is None or not table_exists(engine_dw, tabla):
+            df.to_sql(tabla, engine_dw, if_exists='replace', index=False, chunksize=lote)
+        else:
+            with engine_dw.begin() as connection:
+                connection.execute(text(f'DELETE FROM "{tabla}" WHERE "Fecha_Key" >= :desde'), {"desde": fecha_key_desde})
+                df.to_sql(tabla, connection, if_exists='append', index=False, chunksize=lote)
+        with engine_dw.begin() as connection:
+            for nombre, columnas in indices.items():
+                lista = ", ".join(f'"{c}"' for c in columnas)
+                connection.execute(text(f'CREATE INDEX IF NOT EXISTS "{nombre}" ON "{tabla}" ({lista})'))
+        print(f"Tabla '{tabla}' cargada exitosamente en el DW ({len(df)} filas).")
+
+def fecha_inicio_refresco(engine_dw, periodos):
+    """
+    Primer día a recalcular: el inicio del primer periodo modificado o eliminado,
+    o antes si la ocupación materializada llega hasta una fecha anterior (los
+    servicios abiertos en el corte anterior se extienden hasta el nuevo corte).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodos (iterable): Periodos 'YYYY-MM' modificados o eliminados
+
+    Returns:
+        tuple: (fecha_refresco, fecha_key_desde); fecha_key_desde es None si la
+        fecha no está en Dim_Fecha (recarga completa)
+    """
+    fecha_refresco = pd.Timestamp(f"{min(periodos)}-01")
+    ultima = pd.read_sql(
+        f'SELECT MAX(d."Fecha_Completa") AS f FROM "{TABLA_MINUTO}" m '
+        f'JOIN "Dim_Fecha" d ON d."Fecha_Key" = m."Fecha_Key"',
+        engine_dw
+    )['f'].iloc[0]
+    if not pd.isna(ultima):
+        fecha_refresco = min(fecha_refresco, pd.Timestamp(ultima).normalize())
+    fecha_key_desde = pd.read_sql(
+        'SELECT MIN("Fecha_Key") AS k FROM "Dim_Fecha" WHERE "Fecha_Completa" >= :f',
+        engine_dw, params={"f": fecha_refresco.strftime('%Y-%m-%d')}
+    )['k'].iloc[0]
+    return fecha_refresco, None if pd.isna(fecha_key_desde) else int(fecha_key_desde)
+
+def main():
+    """
+    Función principal que materializa la ocupación de mensajeros. Solo recalcula
+    desde el primer periodo de la tabla de hechos modificado o eliminado desde el
+    último refresco.
+    """
+    print("\nIniciando ETL para Fact_Ocupacion_Mensajero...")
+
+    engine_dw = get_dw_engine()
+
+    existe = destino_existe(engine_dw)
+    cambiados = periodos_modificados(engine_dw, todos=not existe)
+    eliminados = periodos_eliminados(engine_dw)
+    if not cambiados and not eliminados:
+        print("No hay periodos nuevos, modificados o eliminados en la tabla de hechos.")
+        return
+
+    fecha_refresco, fecha_key_desde = None, None
+    if existe:
+        fecha_refresco, fecha_key_desde = fecha_inicio_refresco(engine_dw, [*cambiados, *eliminados])
+    print(f"Refrescando ocupación desde: {fecha_refresco.date() if fecha_refresco is not None else 'inicio (recarga completa)'}")
+
+    # Extracción desde la tabla de hechos (servicios abiertos o cerrados después del refresco)
+    df_intervalos = extract_intervalos_dw(fecha_refresco if fecha_key_desde else None)
+
+    # Transformación con barrido vectorizado
+    df_minuto, df_hora = transform_ocupacion(df_intervalos, engine_dw, fecha_refresco if fecha_key_desde else None)
+
+    # Carga hacia DW
+    load_ocupacion_to_dw(df_minuto, df_hora, engine_dw, fecha_key_desde)
+    for periodo, huella in cambiados.items():
+        save_fingerprint(engine_dw, f"{PASO}:{periodo}", huella)
+    for periodo in eliminados:
+        delete_fingerprints(engine_dw, f"{PASO}:{periodo}")
+
+    print("Proceso de Fact_Ocupacion_Mensajero completado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import pandas as pd
+from ..utils.db_connections import get_oltp_engine, get_dw_engine
+from sqlalchemy import text
+from ..utils.fingerprints import compute_oltp_fingerprint, hash_parts, get_stored_fingerprint, save_fingerprint, table_exists
+from ..utils.dim_cache import read_dimension
+from ..utils.planner import get_step_plan
+
+TABLA_DESTINO = "Fact_Novedad_Servicio"
+PASO = __name__.rsplit(".", 1)[-1]
+DEPENDENCIAS = [
+    "01_dim_fecha", "02_dim_hora", "03_dim_cliente", "05_dim_sede", "06_dim_mensajero", "09_dim_novedad"
+]
+# Solo filas e id máximo: la carga es incremental por id de novedad
+FUENTES_FINGERPRINT = [("public.mensajeria_novedadesservicio", "id", [])]
+
+INDICES = {
+    "idx_novedad_servicio_key": ("Novedad_Servicio_Key",),
+    "idx_novedad_servicio_novedad": ("Novedad_Key", "Fecha_Key"),
+    "idx_novedad_servicio_fecha": ("Fecha_Key", "Novedad_Key"),
+    "idx_novedad_servicio_mensajero": ("Mensajero_Key", "Novedad_Key"),
+    "idx_novedad_servicio_cliente": ("Cliente_Key", "Novedad_Key")
+}
+
+QUERY_NOVEDADES = """
+    SELECT
+        mn.id AS "Novedad_Servicio_ID",
+        mn.servicio_id AS "Servicio_ID_Operacional",
+        mn.tipo_novedad_id AS "Tipo_Novedad_ID",
+        mn.fecha_novedad::timestamp AS "Timestamp_Novedad",
+        s.cliente_id,
+        s.mensajero_id,
+        uaq.sede_id AS "Sede_Origen_ID"
+    FROM
+        public.mensajeria_novedadesservicio mn
+    JOIN
+        public.mensajeria_servicio s ON mn.servicio_id = s.id
+    LEFT JOIN
+        public.clientes_usuarioaquitoy uaq ON s.usuario_id = uaq.id
+    WHERE
+        mn.id > :desde_id
+    ORDER BY
+        mn.id
+    """
+
+def extract_novedades_servicio_oltp(engine_oltp, desde_id=0):
+    """
+    Extrae las novedades reportadas en el OLTP con id mayor al indicado, junto con
+    el contexto del servicio (cliente, mensajero y sede de origen).
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        desde_id (int): Último id de novedad ya cargado en el DW (0 = todas)
+
+    Returns:
+        pd.DataFrame: DataFrame con una fila por novedad reportada
+    """
+    df = pd.read_sql(text(QUERY_NOVEDADES), engine_oltp, params={"desde_id": int(desde_id)})
+    print(f"Se extrajeron {len(df)} novedades de servicio desde el OLTP (id > {desde_id}).")
+    return df
+
+def transform_novedades_servicio(df_oltp, engine_dw):
+    """
+    Transforma las novedades realizando lookups con las dimensiones para obtener
+    las claves foráneas de la tabla de hechos de novedades.
+
+    Args:
+        df_oltp (pd.DataFrame): DataFrame con novedades extraídas del OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse para lookups
+
+    Returns:
+        pd.DataFrame: DataFrame de Fact_Novedad_Servicio
+    """
+    # Cargar dimensiones del DW para lookup
+    df_dim_fecha = read_dimension(engine_dw, "Dim_Fecha", ['Fecha_Key', 'Fecha_Completa'])
+    df_dim_hora = read_dimension(engine_dw, "Dim_Hora", ['Hora_Key', 'Hora_Del_Dia', 'Minuto_De_La_Hora'])
+    df_dim_cliente = read_dimension(engine_dw, "Dim_Cliente", ['Cliente_Key', 'Cliente_ID_Operacional'])
+    df_dim_sede = read_dimension(engine_dw, "Dim_Sede", ['Sede_Key', 'Sede_ID_Operacional'])
+    df_dim_mensajero = read_dimension(engine_dw, "Dim_Mensajero", ['Mensajero_Key', 'Mensajero_ID_Operacional'])
+    df_dim_novedad = read_dimension(engine_dw, "Dim_Novedad", ['Novedad_Key', 'Novedad_ID_Operacional'])
+    print("Dimensiones cargadas desde el DW para lookup.")
+
+    # Fecha y hora (a granularidad de minuto) derivadas del timestamp de la novedad
+    df_oltp['Timestamp_Novedad'] = pd.to_datetime(df_oltp['Timestamp_Novedad'])
+    df_oltp['fecha'] = df_oltp['Timestamp_Novedad'].dt.normalize()
+    df_oltp['hora_del_dia'] = df_oltp['Timestamp_Novedad'].dt.hour
+    df_oltp['minuto'] = df_oltp['Timestamp_Novedad'].dt.minute
+    df_dim_fecha['Fecha_Completa'] = pd.to_datetime(df_dim_fecha['Fecha_Completa'])
+
+    # Realizar lookups con las dimensiones
+    df_merged = df_oltp
+    df_merged = pd.merge(df_merged, df_dim_fecha, left_on='fecha', right_on='Fecha_Completa', how='left')
+    df_merged = pd.merge(df_merged, df_dim_hora, left_on=['hora_del_dia', 'minuto'], right_on=['Hora_Del_Dia', 'Minuto_De_La_Hora'], how='left')
+    df_merged = pd.merge(df_merged, df_dim_cliente, left_on='cliente_id', right_on='Cliente_ID_Operacional', how='left')
+    df_merged = pd.merge(df_merged, df_dim_sede, left_on='Sede_Origen_ID', right_on='Sede_ID_Operacional', how='left')
+    df_merged = pd.merge(df_merged, df_dim_mensajero, left_on='mensajero_id', right_on='Mensajero_ID_Operacional', how='left')
+    df_merged = pd.merge(df_merged, df_dim_novedad, left_on='Tipo_Novedad_ID', right_on='Novedad_ID_Operacional', how='left')
+    df_merged = df_merged.rename(columns={'Sede_Key': 'Sede_Origen_Key'})
+
+    # Seleccionar columnas finales; la clave es el id de la novedad en el OLTP
+    df_fact = df_merged[[
+        'Fecha_Key', 'Hora_Key', 'Cliente_Key', 'Sede_Origen_Key', 'Mensajero_Key', 'Novedad_Key',
+        'Servicio_ID_Operacional', 'Timestamp_Novedad'
+    ]].copy()
+    df_fact.insert(0, 'Novedad_Servicio_Key', df_merged['Novedad_Servicio_ID'].astype('int64'))
+    df_fact['Contador_Novedades'] = 1
+
+    # Manejar valores nulos en claves foráneas opcionales
+    for col in ['Cliente_Key', 'Mensajero_Key', 'Sede_Origen_Key', 'Novedad_Key']:
+        df_fact[col] = df_fact[col].fillna(-1).astype('int64')
+
+    print("Transformación de Fact_Novedad_Servicio completada.")
+    return df_fact
+
+def load_novedades_servicio_to_dw(df, engine_dw, recarga_completa):
+    """
+    Carga las novedades en el DW: reemplaza la tabla en una recarga completa o
+    agrega solo las novedades nuevas, y asegura los índices de consulta.
+
+    Args:
+        df (pd.DataFrame): DataFrame de Fact_Novedad_Servicio
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        recarga_completa (bool): Si es True la tabla se reemplaza
+    """
+    with engine_dw.begin() as connection:
+        df.to_sql(TABLA_DESTINO, connection, if_exists='replace' if recarga_completa else 'append', index=False, chunksize=get_step_plan(PASO)["lote"])
+        for nombre, columnas in INDICES.items():
+            lista = ", ".join(f'"{c}"' for c in columnas)
+            unico = "UNIQUE " if nombre == "idx_novedad_servicio_key" else ""
+            connection.execute(text(f'CREATE {unico}INDEX IF NOT EXISTS "{nombre}" ON "{TABLA_DESTINO}" ({lista})'))
+    print(f"Tabla '{TABLA_DESTINO}' cargada exitosamente en el DW ({len(df)} filas nuevas).")
+
+def get_fingerprint(engine_oltp):
+    """
+    Calcula en el OLTP la huella de la tabla de novedades (filas e id máximo).
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+
+    Returns:
+        str: Huella de la tabla origen
+    """
+    return compute_oltp_fingerprint(engine_oltp, FUENTES_FINGERPRINT)
+
+def get_estado_carga(engine_oltp, engine_dw):
+    """
+    Determina desde qué id de novedad se puede cargar incrementalmente. La carga
+    vuelve a ser completa si no existe la tabla, si se recargó alguna dimensión
+    (las claves subrogadas pueden cambiar) o si en el OLTP desaparecieron novedades
+    ya cargadas.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        tuple: (desde_id, huella_dimensiones); desde_id = 0 indica recarga completa
+    """
+    huella_dimensiones = hash_parts([get_stored_fingerprint(engine_dw, d) for d in DEPENDENCIAS])
+    if not table_exists(engine_dw, TABLA_DESTINO):
+        return 0, huella_dimensiones
+    if get_stored_fingerprint(engine_dw, f"{PASO}:dimensiones") != huella_dimensiones:
+        print("Dimensiones recargadas desde la última carga: recarga completa.")
+        return 0, huella_dimensiones
+
+    with engine_dw.connect() as connection:
+        fila = connection.execute(text(
+            f'SELECT COUNT(*) AS filas, COALESCE(MAX("Novedad_Servicio_Key"), 0) AS max_id FROM "{TABLA_DESTINO}"'
+        )).one()
+    with engine_oltp.connect() as connection:
+        filas_oltp = connection.execute(
+            text("SELECT COUNT(*) FROM public.mensajeria_novedadesservicio WHERE id <= :max_id"),
+            {"max_id": int(fila.max_id)}
+        ).scalar()
+    if filas_oltp != fila.filas:
+        print("Novedades ya cargadas cambiaron en el OLTP: recarga completa.")
+        return 0, huella_dimensiones
+    return int(fila.max_id), huella_dimensiones
+
+def main():
+    """
+    Función principal que orquesta el ETL de Fact_Novedad_Servicio (una fila por
+    novedad reportada). Solo extrae las novedades con id mayor al último cargado.
+    """
+    print("\nIniciando ETL para Fact_Novedad_Servicio...")
+
+    engine_oltp = get_oltp_engine()
+    engine_dw = get_dw_engine()
+
+    desde_id, huella_dimensiones = get_estado_carga(engine_oltp, engine_dw)
+
+    # Extracción desde OLTP
+    df_oltp = extract_novedades_servicio_oltp(engine_oltp, desde_id)
+
+    if desde_id == 0 or not df_oltp.empty:
+        # Transformación con lookups dimensionales
+        df_fact = transform_novedades_servicio(df_oltp, engine_dw)
+
+        # Carga hacia DW
+        load_novedades_servicio_to_dw(df_fact, engine_dw, recarga_completa=desde_id == 0)
+    save_fingerprint(engine_dw, f"{PASO}:dimensiones", huella_dimensiones)
+
+    print("Proceso de Fact_Novedad_Servicio completado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import pandas as pd
+from sqlalchemy import text
+from ..utils.db_connections import get_dw_engine
+from ..utils.fingerprints import (
+    hash_parts, get_stored_fingerprint, save_fingerprint, list_fingerprints, delete_fingerprints, table_exists
+)
+from ..utils.partitions import query_fact, list_partitions
+from ..utils.planner import get_step_plan
+from ..analysis.sketches import PRECISION, TABLA_SKETCHES, COLUMNAS_CELDA, sketches_por_grupo
+
+TABLA_DESTINO = TABLA_SKETCHES
+PASO_HECHOS = "10_fact_cambio_estado_servicio"
+DEPENDENCIAS = [PASO_HECHOS]
+PASO = __name__.rsplit(".", 1)[-1]
+# Tabla del OLTP usada por el planificador para estimar el volumen del paso
+TABLA_VOLUMEN = "public.mensajeria_estadosservicio"
+# La huella se calcula sobre el DW (catálogo de particiones), no sobre el OLTP
+ORIGEN_HUELLA = "dw"
+# 'hll': ids exactos en celdas pequeñas y HyperLogLog en las grandes; 'exacto': siempre ids exactos
+MODO_SKETCH = "hll"
+
+INDICES = {
+    "idx_sketch_periodo": ("Periodo",),
+    "idx_sketch_fecha": ("Fecha_Key",),
+    "idx_sketch_cliente": ("Cliente_Key", "Fecha_Key"),
+    "idx_sketch_sede": ("Sede_Origen_Key", "Fecha_Key"),
+    "idx_sketch_mensajero": ("Mensajero_Key", "Fecha_Key")
+}
+
+def huellas_particiones(engine_dw):
+    """
+    Huella de cada partición con fecha de la tabla de hechos, a partir de la firma
+    de su contenido: filas y rango de Fecha_Key del catálogo y la huella con la que
+    el paso de la tabla de hechos cargó el periodo. No depende del archivo, así que
+    compactar (mover el periodo a un archivo anual) no obliga a reconstruir los
+    sketches. El modo y la precisión de los sketches también forman parte.
+
+    Returns:
+        dict: Periodo -> huella
+    """
+    df = list_partitions(engine_dw, solo_lectura=True)
+    huellas_hechos = list_fingerprints(engine_dw, f"{PASO_HECHOS}:")
+    return {
+        fila.Periodo: hash_parts([
+            fila.Periodo, fila.Filas, fila.Fecha_Key_Min, fila.Fecha_Key_Max,
+            huellas_hechos.get(f"{PASO_HECHOS}:{fila.Periodo}"), MODO_SKETCH, PRECISION
+        ])
+        for fila in df.itertuples(index=False) if not pd.isna(fila.Fecha_Key_Min)
+    }
+
+def get_fingerprint(engine_dw):
+    """
+    Calcula la huella de los sketches a partir del catálogo de particiones de la
+    tabla de hechos (se deriva del DW, no del OLTP; ver ORIGEN_HUELLA).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        str: Huella del estado de las particiones
+    """
+    return hash_parts(sorted(huellas_particiones(engine_dw).values()))
+
+def extract_servicios_periodo(periodo, fecha_key_min, fecha_key_max):
+    """
+    Extrae de una partición de la tabla de hechos las claves de la celda y el id
+    del servicio de cada evento.
+
+    Args:
+        periodo (str): Periodo 'YYYY-MM'
+        fecha_key_min (int): Fecha_Key mínima de la partición
+        fecha_key_max (int): Fecha_Key máxima de la partición
+
+    Returns:
+        pd.DataFrame: Columnas de la celda y Servicio_ID_Operacional
+    """
+    columnas = ", ".join(f'"{c}"' for c in COLUMNAS_CELDA)
+    df = query_fact(
+        f'SELECT {columnas}, "Servicio_ID_Operacional" FROM "Fact_Cambio_Estado_Servicio" '
+        f'WHERE "Fecha_Key" BETWEEN ? AND ?',
+        fecha_key_min, fecha_key_max, params=(fecha_key_min, fecha_key_max)
+    )
+    print(f"Se extrajeron {len(df)} eventos de la partición {periodo}.")
+    return df
+
+def transform_sketches(df, periodo):
+    """
+    Construye un sketch de servicios distintos por celda
+    (Fecha_Key, Cliente_Key, Sede_Origen_Key, Mensajero_Key).
+
+    Args:
+        df (pd.DataFrame): Eventos extraídos de la partición
+        periodo (str): Periodo 'YYYY-MM' de la partición
+
+    Returns:
+        pd.DataFrame: Una fila por celda con Servicios (conteo exacto) y Sketch (BLOB)
+    """
+    df_sketches = sketches_por_grupo(df, COLUMNAS_CELDA, "Servicio_ID_Operacional", modo=MODO_SKETCH)
+    df_sketches.insert(0, "Periodo", periodo)
+    return df_sketches
+
+def load_sketches_to_dw(df, engine_dw, periodos, recarga_completa):
+    """
+    Reemplaza en una sola transacción los sketches de los periodos indicados.
+
+    Args:
+        df (pd.DataFrame): Sketches de los periodos recalculados
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodos (list): Periodos cuyos sketches se reemplazan o eliminan
+        recarga_completa (bool): Si es True la tabla se reemplaza
+    """
+    with engine_dw.begin() as connection:
+        if recarga_completa:
+            connection.execute(text(f'DROP TABLE IF EXISTS "{TABLA_DESTINO}"'))
+            connection.execute(text(f"""
+                CREATE TABLE "{TABLA_DESTINO}" (
+                    "Periodo" TEXT NOT NULL,
+                    "Fecha_Key" INTEGER,
+                    "Cliente_Key" INTEGER,
+                    "Sede_Origen_Key" INTEGER,
+                    "Mensajero_Key" INTEGER,
+                    "Servicios" INTEGER NOT NULL,
+                    "Sketch" BLOB NOT NULL
+                )
+            """))
+        else:
+            for periodo in periodos:
+                connection.execute(text(f'DELETE FROM "{TABLA_DESTINO}" WHERE "Periodo" = :periodo'), {"periodo": periodo})
+        df.to_sql(TABLA_DESTINO, connection, if_exists='append', index=False, chunksize=get_step_plan(PASO)["lote"])
+        for nombre, columnas in INDICES.items():
+            lista = ", ".join(f'"{c}"' for c in columnas)
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS "{nombre}" ON "{TABLA_DESTINO}" ({lista})'))
+    print(f"Tabla '{TABLA_DESTINO}' cargada exitosamente en el DW ({len(df)} celdas).")
+
+def main():
+    """
+    Función principal que materializa los sketches de servicios distintos. Solo
+    recalcula los periodos cuya partición de la tabla de hechos cambió.
+    """
+    print("\nIniciando ETL para Fact_Sketch_Servicios...")
+
+    engine_dw = get_dw_engine()
+    recarga_completa = not table_exists(engine_dw, TABLA_DESTINO)
+
+    huellas = huellas_particiones(engine_dw)
+    cambiados = [
+        p for p, h in sorted(huellas.items())
+        if recarga_completa or get_stored_fingerprint(engine_dw, f"{PASO}:{p}") != h
+    ]
+    eliminados = []
+    if not recarga_completa:
+        with engine_dw.connect() as connection:
+            existentes = {fila[0] for fila in connection.execute(text(f'SELECT DISTINCT "Periodo" FROM "{TABLA_DESTINO}"'))}
+        eliminados = sorted(existentes - set(huellas))
+    print(f"Periodos a recalcular: {len(cambiados)} | Periodos eliminados: {len(eliminados)} | Modo: {MODO_SKETCH}")
+
+    catalogo = list_partitions(engine_dw).set_index('Periodo')
+    partes = []
+    for periodo in cambiados:
+        # Extracción desde la partición de la tabla de hechos
+        df = extract_servicios_periodo(
+            periodo, int(catalogo.loc[periodo, 'Fecha_Key_Min']), int(catalogo.loc[periodo, 'Fecha_Key_Max'])
+        )
+        # Transformación: un sketch por celda
+        partes.append(transform_sketches(df, periodo))
+
+    # Carga hacia DW
+    df_sketches = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(
+        columns=["Periodo"] + COLUMNAS_CELDA + ["Servicios", "Sketch"]
+    )
+    load_sketches_to_dw(df_sketches, engine_dw, cambiados + eliminados, recarga_completa)
+    for periodo in cambiados:
+        save_fingerprint(engine_dw, f"{PASO}:{periodo}", huellas[periodo])
+    for periodo in eliminados:
+        delete_fingerprints(engine_dw, f"{PASO}:{periodo}")
+
+    print("Proceso de Fact_Sketch_Servicios completado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import json
+import signal
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from sqlalchemy import text
+from .utils.db_connections import get_oltp_engine, get_dw_engine, dispose_engines
+from .utils.dim_cache import cached_dimensions
+from .utils.partitions import list_partitions, query_fact
+from .utils.etl_runs import get_engine_load_version
+from . import run_etl
+
+INTERVALO_DEFECTO = 300
+PUERTO_DEFECTO = 8765
+
+def medir_rezago(engine_oltp, engine_dw):
+    """
+    Mide cuánto va atrasado el DW respecto al OLTP: diferencia entre el último
+    evento de estado registrado en el OLTP (por id, usa la clave primaria) y el
+    último evento cargado en la partición más reciente de la tabla de hechos.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        dict: Último evento en el OLTP, último evento en el DW y rezago en segundos
+    """
+    with engine_oltp.connect() as connection:
+        ultimo_oltp = connection.execute(text(
+            "SELECT fecha + hora FROM public.mensajeria_estadosservicio ORDER BY id DESC LIMIT 1"
+        )).scalar()
+
+    ultimo_dw = None
+    df_particiones = list_partitions(engine_dw).dropna(subset=['Fecha_Key_Min'])
+    if not df_particiones.empty:
+        desde = int(df_particiones['Fecha_Key_Min'].max())
+        ultimo_dw = query_fact('SELECT MAX("Timestamp_Estado") AS t FROM "Fact_Cambio_Estado_Servicio"', desde)['t'].iloc[0]
+
+    ultimo_oltp = None if ultimo_oltp is None else pd.Timestamp(ultimo_oltp)
+    ultimo_dw = None if ultimo_dw is None else pd.Timestamp(ultimo_dw)
+    rezago = None
+    if ultimo_oltp is not None and ultimo_dw is not None:
+        rezago = max(0.0, (ultimo_oltp - ultimo_dw).total_seconds())
+    return {
+        "ultimo_evento_oltp": None if ultimo_oltp is None else ultimo_oltp.isoformat(),
+        "ultimo_evento_dw": None if ultimo_dw is None else ultimo_dw.isoformat(),
+        "rezago_segundos": rezago
+    }
+
+class ServicioETL:
+    """
+    Mantiene el ETL vivo como servicio: el intérprete, las librerías, los motores
+    (con sus pools de conexiones) y los lookups de dimensiones se cargan una sola
+    vez y se reutilizan en cada micro-lote. Cada lote ejecuta el grafo de pasos
+    completo; las huellas de origen hacen que solo se recargue lo que cambió.
+
+    El apagado (SIGINT/SIGTERM o detener()) es ordenado: el lote en curso termina
+    y el servicio se detiene antes de iniciar el siguiente.
+    """
+
+    def __init__(self, intervalo=INTERVALO_DEFECTO, puerto=PUERTO_DEFECTO, host="127.0.0.1"):
+        self.intervalo = intervalo
+        self.puerto = puerto
+        self.host = host
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.metricas = {
+            "estado": "iniciando",
+            "inicio_servicio": datetime.now().isoformat(timespec="seconds"),
+            "intervalo_segundos": intervalo,
+            "lotes": 0,
+            "lotes_fallidos": 0,
+            "ultima_ejecucion": None,
+            "ultima_ejecucion_exitosa": None,
+            "proxima_ejecucion": None,
+            "version_carga": None,
+            "rezago": None,
+            "pasos": {}
+        }
+
+    def snapshot(self):
+        """
+        Copia de las métricas actuales (para el endpoint HTTP).
+        """
+        with self._lock:
+            metricas = json.loads(json.dumps(self.metricas, default=str))
+        metricas["dimensiones_en_memoria"] = cached_dimensions()
+        return metricas
+
+    def _actualizar(self, **valores):
+        with self._lock:
+            self.metricas.update(valores)
+
+    def ejecutar_lote(self):
+        """
+        Ejecuta un micro-lote del ETL y actualiza las métricas.
+        """
+        self._actualizar(estado="ejecutando")
+        resultado = run_etl.main()
+
+        engine_dw = get_dw_engine()
+        version = get_engine_load_version(engine_dw)
+
+        rezago = None
+        try:
+            rezago = medir_rezago(get_oltp_engine(), engine_dw)
+        except Exception as e:
+            print(f"No se pudo medir el rezago respecto al OLTP: {e}")
+
+        with self._lock:
+            self.metricas["lotes"] += 1
+            if not resultado["exito"]:
+                self.metricas["lotes_fallidos"] += 1
+            self.metricas["ultima_ejecucion"] = {
+                "run_id": resultado["run_id"],
+                "inicio": resultado["inicio"].isoformat(timespec="seconds"),
+                "fin": resultado["fin"].isoformat(timespec="seconds"),
+                "duracion_segundos": round((resultado["fin"] - resultado["inicio"]).total_seconds(), 3),
+                "exito": resultado["exito"]
+            }
+            if resultado["exito"]:
+                self.metricas["ultima_ejecucion_exitosa"] = self.metricas["ultima_ejecucion"]["fin"]
+            self.metricas["pasos"] = resultado["pasos"]
+            self.metricas["rezago"] = rezago
+            self.metricas["version_carga"] = version
+        return resultado
+
+    def iniciar_servidor(self):
+        """
+        Inicia el endpoint local de salud y métricas en un hilo aparte.
+        GET /health -> estado resumido; GET /metrics -> métricas completas (JSON).
+        """
+        servicio = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                metricas = servicio.snapshot()
+                if self.path.rstrip("/") == "/health":
+                    cuerpo = {
+                        "estado": metricas["estado"],
+                        "ultima_ejecucion_exitosa": metricas["ultima_ejecucion_exitosa"],
+                        "rezago_segundos": (metricas["rezago"] or {}).get("rezago_segundos")
+                    }
+                    codigo = 200 if metricas["lotes"] == 0 or metricas["ultima_ejecucion"]["exito"] else 503
+                elif self.path.rstrip("/") == "/metrics":
+                    cuerpo, codigo = metricas, 200
+                else:
+                    cuerpo, codigo = {"error": "ruta no encontrada"}, 404
+                datos = json.dumps(cuerpo, indent=1, default=str).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), Handler)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        print(f"Endpoint de salud en http://{self.host}:{self.puerto}/health (métricas en /metrics)")
+
+    def detener(self, *args):
+        """
+        Solicita el apagado ordenado: el lote en curso termina antes de salir.
+        """
+        if not self._detener.is_set():
+            print("\nApagado solicitado: el servicio se detendrá al terminar el lote en curso.")
+        self._detener.set()
+        self._actualizar(estado="deteniendo")
+
+    def ejecutar(self, max_lotes=None):
+        """
+        Bucle principal del servicio: ejecuta un lote, espera el intervalo y repite
+        hasta recibir la señal de apagado.
+
+        Args:
+            max_lotes (int): Número máximo de lotes (None = sin límite)
+        """
+        signal.signal(signal.SIGINT, self.detener)
+        signal.signal(signal.SIGTERM, self.detener)
+        self.iniciar_servidor()
+        try:
+            while not self._detener.is_set():
+                self.ejecutar_lote()
+                if max_lotes is not None and self.metricas["lotes"] >= max_lotes:
+                    break
+                proxima = datetime.now().timestamp() + self.intervalo
+                self._actualizar(
+                    estado="en espera",
+                    proxima_ejecucion=datetime.fromtimestamp(proxima).isoformat(timespec="seconds")
+                )
+                self._detener.wait(self.intervalo)
+        finally:
+            self._actualizar(estado="detenido", proxima_ejecucion=None)
+            if self._servidor is not None:
+                self._servidor.shutdown()
+                self._servidor.server_close()
+            dispose_engines()
+            print("Servicio ETL detenido.")
+
+def main(intervalo=INTERVALO_DEFECTO, puerto=PUERTO_DEFECTO, max_lotes=None):
+    """
+    Inicia el ETL en modo servicio.
+
+    Args:
+        intervalo (int): Segundos entre micro-lotes
+        puerto (int): Puerto local del endpoint de salud y métricas
+        max_lotes (int): Número máximo de lotes (None = sin límite)
+    """
+    print(f"Iniciando servicio ETL (intervalo: {intervalo} s)...")
+    ServicioETL(intervalo=intervalo, puerto=puerto).ejecutar(max_lotes=max_lotes)
@@ -1,54 +1,303 @@
 # src/run_etl.py
+import argparse
 import importlib
+import os
+import time
+from datetime import datetime
+from .utils.db_connections import get_oltp_engine, get_dw_engine
+from .utils.dim_cache import invalidate_dimension, retag_dimensions
+from .utils.fingerprints import get_stored_fingerprint, save_fingerprint, delete_fingerprints, table_exists
+from .utils.etl_runs import new_run_id, record_run, get_run_dir, get_engine_load_version
+from .utils.planner import planificar_ejecucion, imprimir_plan, set_active_plan
+from .utils.snapshots import RETENCION_SNAPSHOTS, prepare_staging, promote_staging, discard_staging, rollback
+from .utils.profiling import perfilar_paso, escribir_resumen
 
-def run_etl_script(script_name):
+# Lista de scripts a ejecutar en orden
+ETL_SCRIPTS = [
+    "01_dim_fecha",
+    "02_dim_hora",
+    "03_dim_cliente",
+    "04_dim_geografia",
+    "05_dim_sede",
+    "06_dim_mensajero",
+    "07_dim_urgencia_servicio",
+    "08_dim_estado_servicio",
+    "09_dim_novedad",
+    "10_fact_cambio_estado_servicio",
+    "11_fact_ocupacion_mensajero",
+    "12_fact_novedad_servicio",
+    "13_fact_sketch_servicios"
+]
+
+def decidir_ejecucion(module, script_name, engine_oltp, engine_dw, pasos_ejecutados, forzar=False):
     """
-    Importa y ejecuta la función 'main' de un script de ETL dado.
+    Decide si un paso debe ejecutarse comparando la huella actual del origen con la
+    guardada en la última carga exitosa y revisando si alguna dependencia fue recargada.
+
+    Args:
+        module (module): Módulo del paso ETL
+        script_name (str): Nombre del script
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        pasos_ejecutados (set): Pasos ya ejecutados (no omitidos) en esta corrida
+        forzar (bool): Si es True, el paso se ejecuta siempre
+
+    Returns:
+        tuple: (ejecutar, motivo, fingerprint)
     """
+    if not hasattr(module, "get_fingerprint"):
+        return True, "el paso no define huella de origen", None
+
+    # Los pasos derivados del DW (ORIGEN_HUELLA = "dw") calculan la huella sobre el DW en carga
+    engine_origen = engine_dw if getattr(module, "ORIGEN_HUELLA", "oltp") == "dw" else engine_oltp
+    try:
+        fingerprint = module.get_fingerprint(engine_origen)
+    except Exception as e:
+        return True, f"no se pudo calcular la huella de origen ({e})", None
+
+    if forzar:
+        return True, "ejecución forzada", fingerprint
+
+    dependencias_recargadas = [d for d in getattr(module, "DEPENDENCIAS", []) if d in pasos_ejecutados]
+    if dependencias_recargadas:
+        return True, f"dependencias recargadas: {', '.join(dependencias_recargadas)}", fingerprint
+
+    if hasattr(module, "destino_existe"):
+        destino_existe = module.destino_existe(engine_dw)
+    else:
+        destino_existe = table_exists(engine_dw, module.TABLA_DESTINO)
+    if not destino_existe:
+        return True, f"la tabla '{module.TABLA_DESTINO}' no existe en el DW", fingerprint
+
+    fingerprint_guardado = get_stored_fingerprint(engine_dw, script_name)
+    if fingerprint_guardado is None:
+        return True, "no hay huella de una carga anterior", fingerprint
+    if fingerprint_guardado != fingerprint:
+        return True, "la huella de origen cambió", fingerprint
+
+    return False, "huella de origen sin cambios y dependencias sin recargar", fingerprint
+
+def run_etl_script(script_name, engine_oltp=None, engine_dw=None, pasos_ejecutados=None, forzar=False, perfiles=None, directorio_perfil=None):
+    """
+    Importa y ejecuta la función 'main' de un script de ETL dado, omitiéndolo si
+    su origen no cambió desde la última carga exitosa.
+
+    Si se indica 'perfiles', el paso se ejecuta perfilado: los archivos del perfil
+    se escriben en 'directorio_perfil' y el resumen se agrega a 'perfiles'.
+
+    Returns:
+        tuple: (ejecutado, motivo, duracion) con la duración del paso en segundos
+    """
+    inicio = time.perf_counter()
     try:
-        print(f"--- Ejecutando: {script_name} ---")
         module = importlib.import_module(f".etl.{script_name}", package="src")
-        module.main()
-        print(f"--- {script_name} completado. ---\n")
+
+        ejecutar, motivo, fingerprint = True, "sin control de huellas", None
+        if engine_dw is not None:
+            ejecutar, motivo, fingerprint = decidir_ejecucion(
+                module, script_name, engine_oltp, engine_dw, pasos_ejecutados or set(), forzar
+            )
+
+        if not ejecutar:
+            print(f"--- Omitido: {script_name} ({motivo}) ---\n")
+            return False, motivo, time.perf_counter() - inicio
+
+        print(f"--- Ejecutando: {script_name} ({motivo}) ---")
+        if forzar and engine_dw is not None:
+            # Invalida también las huellas por periodo de los pasos particionados
+            delete_fingerprints(engine_dw, f"{script_name}:")
+        if perfiles is None:
+            module.main()
+        else:
+            with perfilar_paso(module, script_name, directorio_perfil) as resumen:
+                perfiles[script_name] = resumen
+                module.main()
+        # Los lookups en memoria de una dimensión recargada dejan de ser válidos
+        invalidate_dimension(module.TABLA_DESTINO)
+        if fingerprint is not None:
+            save_fingerprint(engine_dw, script_name, fingerprint)
+        duracion = time.perf_counter() - inicio
+        print(f"--- {script_name} completado en {duracion:.1f} s. ---\n")
+        return True, motivo, duracion
     except Exception as e:
         print(f"¡ERROR en {script_name}!: {e}")
+        # Un paso interrumpido puede dejar dimensiones a medio cargar
+        invalidate_dimension()
         # Detener la ejecución si un script falla
         raise
 
-def main():
+def main(forzar=False, ajustes=None, staging=True, retencion=RETENCION_SNAPSHOTS, perfilar=False):
     """
-    Orquesta la ejecución de todos los scripts ETL en el orden correcto.
+    Orquesta la ejecución de todos los scripts ETL en el orden correcto. Antes de
+    ejecutar, planifica tamaños de lote y paralelismo según el volumen del OLTP
+    y los recursos de la máquina.
+
+    La carga se construye en un archivo de staging; si termina y pasa la
+    validación, se publica con un rename atómico. Si falla, el DW publicado
+    queda intacto.
+
+    Args:
+        forzar (bool): Si es True, se ignoran las huellas y se recargan todos los pasos
+        ajustes (list): Ajustes manuales del plan ('parametro=valor' o 'paso:parametro=valor')
+        staging (bool): Si es False se escribe directamente en el DW publicado
+        retencion (int): Versiones anteriores del DW a conservar para rollback
+        perfilar (bool): Si es True, cada paso ejecutado se perfila (tiempo por fase,
+            cProfile, pilas colapsadas y asignaciones) en el directorio de la ejecución
+
+    Returns:
+        dict: Resumen de la ejecución (run_id, inicio, fin, exito y, por paso,
+        si se ejecutó, el motivo y la duración en segundos)
     """
     print("=========================================")
     print("=   INICIANDO PROCESO ETL COMPLETO      =")
     print("=========================================\n")
-    
-    # Lista de scripts a ejecutar en orden
-    etl_scripts = [
-        "01_dim_fecha",
-        "02_dim_hora",
-        "03_dim_cliente",
-        "04_dim_geografia",
-        "05_dim_sede",
-        "06_dim_mensajero",
-        "07_dim_urgencia_servicio",
-        "08_dim_estado_servicio",
-        "09_dim_novedad",
-        "10_fact_cambio_estado_servicio"
-    ]
-    
+
+    run_id = new_run_id()
+    inicio = datetime.now()
+    print(f"Run ID: {run_id}\n")
+
+    pasos_ejecutados = set()
+    pasos_omitidos = {}
+    resultado = {"run_id": run_id, "inicio": inicio, "fin": None, "exito": False, "pasos": {}}
+    ruta_staging = None
+    perfiles = {} if perfilar else None
+    directorio_perfil = get_run_dir(run_id) if perfilar else None
+
     try:
-        for script in etl_scripts:
-            run_etl_script(script)
-        
+        if staging:
+            ruta_staging = prepare_staging()
+
+        engine_oltp = get_oltp_engine()
+        engine_dw = get_dw_engine()
+
+        # Fase de planificación
+        modulos = {script: importlib.import_module(f".etl.{script}", package="src") for script in ETL_SCRIPTS}
+        plan, recursos, estadisticas = planificar_ejecucion(engine_oltp, modulos, ajustes)
+        imprimir_plan(plan, recursos, estadisticas)
+        set_active_plan(plan)
+        resultado["plan"] = plan
+
+        for script in ETL_SCRIPTS:
+            ejecutado, motivo, duracion = run_etl_script(
+                script, engine_oltp, engine_dw, pasos_ejecutados, forzar, perfiles, directorio_perfil
+            )
+            resultado["pasos"][script] = {"ejecutado": ejecutado, "motivo": motivo, "duracion": round(duracion, 3)}
+            if ejecutado:
+                pasos_ejecutados.add(script)
+            else:
+                pasos_omitidos[script] = motivo
+
+        # La versión de carga del DW (usada por la caché de consultas y la de lookups) es el Run ID
+        version_anterior = get_engine_load_version(engine_dw)
+        record_run(engine_dw, run_id, inicio, pasos_ejecutados, pasos_omitidos)
+        retag_dimensions(engine_dw, version_anterior, get_engine_load_version(engine_dw))
+
+        # Publicación atómica del staging (los lectores pasan a la nueva versión)
+        if ruta_staging is not None:
+            promote_staging(ruta_staging, retencion)
+            ruta_staging = None
+        resultado["exito"] = True
+
         print("\n=========================================")
         print("=    PROCESO ETL COMPLETADO CON ÉXITO   =")
         print("=========================================")
-        
-    except Exception:
+        print(f"Pasos ejecutados: {len(pasos_ejecutados)} | Pasos omitidos: {len(pasos_omitidos)}")
+        for script, motivo in pasos_omitidos.items():
+            print(f"  - {script} omitido: {motivo}")
+
+    except Exception as e:
         print("\n=========================================")
         print("=     PROCESO ETL DETENIDO POR ERROR    =")
         print("=========================================")
+        print(f"Detalle: {e}")
+    finally:
+        set_active_plan(None)
+        if perfiles:
+            escribir_resumen(directorio_perfil, perfiles)
+            resultado["perfiles"] = directorio_perfil
+            print(f"Perfiles de la ejecución en '{directorio_perfil}'.")
+        if ruta_staging is not None:
+            # El DW publicado no se modificó; los lookups pueden venir del staging descartado
+            discard_staging()
+            invalidate_dimension()
+            print("Staging descartado: el DW publicado conserva la versión anterior.")
+
+    resultado["fin"] = datetime.now()
+    return resultado
+
+def parse_args():
+    """
+    Interpreta los argumentos de línea de comandos del orquestador.
+    """
+    parser = argparse.ArgumentParser(description="Proceso ETL del Data Warehouse Fast and Safe.")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Recarga todos los pasos aunque la huella de origen no haya cambiado "
+                             "(con --reporte: vuelve a dibujar los gráficos).")
+    parser.add_argument("--ajuste", action="append", default=[], metavar="[PASO:]PARAMETRO=VALOR",
+                        help="Ajuste manual del plan (lote, particiones_extraccion, workers). "
+                             "Ej: --ajuste workers=2 --ajuste 10_fact_cambio_estado_servicio:lote=50000")
+    parser.add_argument("--sin-staging", action="store_true",
+                        help="Escribe directamente en el DW publicado, sin staging ni publicación atómica.")
+    parser.add_argument("--retener", type=int, default=RETENCION_SNAPSHOTS,
+                        help=f"Versiones anteriores del DW a conservar para rollback (por defecto {RETENCION_SNAPSHOTS}).")
+    parser.add_argument("--rollback", nargs="?", const="", metavar="INSTANTANEA",
+                        help="Vuelve a publicar una versión anterior del DW (por defecto la más reciente).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila cada paso ejecutado (cProfile, pilas colapsadas para flame graph y "
+                             "tracemalloc) y escribe los archivos en el directorio de la ejecución.")
+    parser.add_argument("--backfill", nargs=2, metavar=("DESDE", "HASTA"),
+                        help="Reconstruye la tabla de hechos para los meses DESDE..HASTA (YYYY-MM) en ventanas "
+                             "mensuales procesadas en paralelo.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del backfill o del pool de gráficos del reporte (por defecto los núcleos disponibles).")
+    parser.add_argument("--reintentos", type=int, default=2,
+                        help="Reintentos por ventana fallida en el backfill (por defecto 2).")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Compara cada ventana del backfill con una carga serial.")
+    parser.add_argument("--servicio", action="store_true",
+                        help="Mantiene el proceso vivo y ejecuta micro-lotes periódicos (modo servicio).")
+    parser.add_argument("--intervalo", type=int, default=300,
+                        help="Segundos entre micro-lotes en modo servicio (por defecto 300).")
+    parser.add_argument("--puerto", type=int, default=8765,
+                        help="Puerto local del endpoint de salud y métricas en modo servicio (por defecto 8765).")
+    parser.add_argument("--reporte", action="store_true",
+                        help="Genera el reporte HTML/PNG de las nueve preguntas de negocio para la versión de carga "
+                             "actual del DW (consultas en paralelo, gráficos en un pool de procesos).")
+    parser.add_argument("--compactar", action="store_true",
+                        help="Compacta los archivos de partición de la tabla de hechos del DW publicado hasta el "
+                             "límite de ATTACH de SQLite (la carga lo hace sola; útil para un DW existente).")
+    parser.add_argument("--backend-transformacion", choices=["pandas", "polars"],
+                        help="Backend de la transformación de la tabla de hechos: merges de pandas o plan perezoso "
+                             "de Polars en streaming (por defecto la variable ETL_TRANSFORM_BACKEND o 'pandas').")
+    parser.add_argument("--benchmark", choices=["diccionario", "transformacion", "sketches"],
+                        help="Ejecuta un benchmark sobre datos sintéticos en directorios temporales (no toca el DW).")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    if args.backend_transformacion:
+        # Antes de importar los pasos; los procesos del backfill heredan la variable
+        os.environ["ETL_TRANSFORM_BACKEND"] = args.backend_transformacion
+    if args.rollback is not None:
+        rollback(args.rollback or None)
+    elif args.backfill:
+        from .backfill import main as main_backfill
+        main_backfill(*args.backfill, workers=args.workers, reintentos=args.reintentos, verificar=args.verificar)
+    elif args.compactar:
+        from .utils.partitions import compact_partitions
+        inicio_compactacion = datetime.now()
+        if compact_partitions(get_dw_engine()):
+            # Cambia la versión de carga del DW (invalida la caché de consultas)
+            record_run(get_dw_engine(), new_run_id(), inicio_compactacion, ["compactar"], [])
+    elif args.reporte:
+        from .analysis.reporte import generar_reporte
+        generar_reporte(procesos=args.workers, forzar=args.forzar)
+    elif args.benchmark:
+        from .benchmarks import BENCHMARKS
+        BENCHMARKS[args.benchmark]()
+    elif args.servicio:
+        from .etl_service import main as main_servicio
+        main_servicio(intervalo=args.intervalo, puerto=args.puerto)
+    else:
+        main(forzar=args.forzar, ajustes=args.ajuste, staging=not args.sin_staging, retencion=args.retener,
+             perfilar=args.profile)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from .planner import MAX_CONEXIONES_OLTP
+
+try:
+    import resource
+except ImportError:  # Windows no dispone del módulo 'resource'
+    resource = None
+
+# Backend de extracción por defecto: 'pandas' (pd.read_sql) o 'arrow' (COPY binario -> Arrow)
+DEFAULT_BACKEND = os.environ.get("ETL_EXTRACTION_BACKEND", "pandas")
+BACKENDS = ("pandas", "arrow")
+
+def arrow_available():
+    """
+    Indica si las dependencias opcionales del backend Arrow están instaladas.
+
+    Returns:
+        bool: True si pyarrow y adbc_driver_postgresql pueden importarse
+    """
+    try:
+        import pyarrow  # noqa: F401
+        import adbc_driver_postgresql.dbapi  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _engine_uri(engine_oltp):
+    """
+    Convierte la URL de un motor SQLAlchemy en una URI libpq utilizable por ADBC.
+    """
+    return engine_oltp.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+class _PoolADBC:
+    """
+    Conexiones ADBC reutilizables por URI. Una extracción toma una conexión libre
+    o abre una nueva; el total de conexiones abiertas del proceso no supera
+    MAX_CONEXIONES_OLTP, el mismo tope con el que el planificador reparte
+    workers y particiones de extracción (si se alcanza, la extracción espera).
+    """
+
+    def __init__(self, maximo=MAX_CONEXIONES_OLTP):
+        self.maximo = maximo
+        self.abiertas = 0
+        self.libres = {}
+        self.condicion = threading.Condition()
+
+    @contextmanager
+    def conexion(self, uri):
+        import adbc_driver_postgresql.dbapi as pg_dbapi
+
+        with self.condicion:
+            while not self.libres.get(uri) and self.abiertas >= self.maximo:
+                self.condicion.wait()
+            connection = self.libres[uri].pop() if self.libres.get(uri) else None
+            if connection is None:
+                self.abiertas += 1
+        try:
+            if connection is None:
+                # autocommit: una conexión libre no deja transacciones abiertas en el OLTP
+                connection = pg_dbapi.connect(uri, autocommit=True)
+            yield connection
+        except Exception:
+            # Conexión en estado desconocido (p. ej. servidor reiniciado): se descarta
+            self._descartar(connection)
+            raise
+        with self.condicion:
+            self.libres.setdefault(uri, []).append(connection)
+            self.condicion.notify()
+
+    def _descartar(self, connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self.condicion:
+            self.abiertas -= 1
+            self.condicion.notify()
+
+    def cerrar(self, cerrar_conexiones=True):
+        """
+        Cierra las conexiones libres. Con cerrar_conexiones=False solo las olvida
+        (proceso hijo de un fork: los sockets pertenecen al proceso padre).
+        """
+        with self.condicion:
+            libres, self.libres = self.libres, {}
+            for conexiones in libres.values():
+                for connection in conexiones:
+                    if cerrar_conexiones:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+                    self.abiertas -= 1
+
+_pool = _PoolADBC()
+
+def close_arrow_connections(cerrar_conexiones=True):
+    """
+    Cierra (o, en un proceso hijo, descarta) las conexiones ADBC reutilizables.
+    Se llama desde db_connections.dispose_engines / reset_engines.
+    """
+    global _pool
+    if cerrar_conexiones:
+        _pool.cerrar()
+    else:
+        _pool = _PoolADBC()
+
+def read_sql_arrow(query, engine_oltp):
+    """
+    Ejecuta una consulta con el backend Arrow y retorna un DataFrame respaldado
+    por Arrow: fechas (date32), horas (time64) y enteros se mantienen en formato
+    columnar nativo, incluidos los nulos. El driver ADBC usa COPY ... TO STDOUT
+    en formato binario y decodifica directamente a buffers columnares, sin crear
+    tuplas Python por fila. La conexión se toma del pool de conexiones ADBC.
+
+    Args:
+        query (str): Consulta SQL a ejecutar
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+
+    Returns:
+        pd.DataFrame: DataFrame con columnas de tipo pd.ArrowDtype
+    """
+    with _pool.conexion(_engine_uri(engine_oltp)) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            table = cursor.fetch_record_batch().read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def extract_query(query, engine_oltp, backend=None):
+    """
+    Ejecuta una consulta de extracción con el backend indicado. Permite elegir
+    el backend por consulta; si el backend Arrow no está disponible se usa
+    pd.read_sql como respaldo.
+
+    Args:
+        query (str): Consulta SQL a ejecutar
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        backend (str): 'pandas' o 'arrow'. Si es None se usa DEFAULT_BACKEND
+
+    Returns:
+        pd.DataFrame: Resultado de la consulta
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de extracción desconocido: '{backend}'. Opciones: {BACKENDS}")
+
+    if backend == "arrow":
+        if arrow_available():
+            return read_sql_arrow(query, engine_oltp)
+        print("Advertencia: pyarrow/adbc_driver_postgresql no están instalados; se usa pd.read_sql.")
+
+    return pd.read_sql(query, engine_oltp)
+
+def _peak_rss_mb():
+    """
+    Retorna el pico de memoria residente del proceso actual en MB (None si no se puede medir).
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS reporta bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def _run_single_benchmark(backend, query):
+    """
+    Mide una extracción con un único backend dentro del proceso actual.
+    """
+    from .db_connections import get_oltp_engine
+
+    engine_oltp = get_oltp_engine()
+    inicio = time.perf_counter()
+    df = extract_query(query, engine_oltp, backend=backend)
+    duracion = time.perf_counter() - inicio
+    return {
+        "backend": backend,
+        "filas": len(df),
+        "segundos": round(duracion, 3),
+        "filas_por_segundo": round(len(df) / duracion, 1) if duracion > 0 else None,
+        "pico_memoria_mb": _peak_rss_mb()
+    }
+
+def benchmark_extraction(query=None, backends=BACKENDS):
+    """
+    Compara filas/segundo y pico de memoria de cada backend de extracción. Cada
+    backend se ejecuta en un subproceso independiente para que el pico de memoria
+    de uno no contamine la medición del otro.
+
+    Args:
+        query (str): Consulta a medir. Por defecto, la extracción de la tabla de hechos
+        backends (tuple): Backends a comparar
+
+    Returns:
+        list: Un diccionario de resultados por backend
+    """
+    resultados = []
+    for backend in backends:
+        comando = [sys.executable, "-m", "src.utils.arrow_extract", "--backend", backend]
+        if query is not None:
+            comando += ["--query", query]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True)
+        resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    print(f"{'Backend':<10}{'Filas':>12}{'Segundos':>12}{'Filas/s':>14}{'Pico MB':>12}")
+    for r in resultados:
+        print(f"{r['backend']:<10}{r['filas']:>12}{r['segundos']:>12}{str(r['filas_por_segundo']):>14}{str(r['pico_memoria_mb']):>12}")
+    return resultados
+
+def _default_benchmark_query():
+    """
+    Consulta de extracción de la tabla de hechos, usada por defecto en el benchmark.
+    """
+    import importlib
+    module = importlib.import_module(".etl.10_fact_cambio_estado_servicio", package="src")
+    return module.QUERY_CAMBIOS_ESTADO
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de backends de extracción (read_sql vs Arrow).")
+    parser.add_argument("--backend", choices=BACKENDS, help="Ejecuta la medición de un único backend (uso interno).")
+    parser.add_argument("--query", help="Consulta a medir. Por defecto, la extracción de la tabla de hechos.")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(_run_single_benchmark(args.backend, args.query or _default_benchmark_query())))
+    else:
+        benchmark_extraction(args.query)
@@ -1,17 +1,82 @@
+import threading
 from sqlalchemy import create_engine
+from .planner import get_batch_size
+
+# Ruta del archivo principal del Data Warehouse (dimensiones, catálogos y control ETL)
+DW_PATH = "DW_FastAndSafe.db"
+
+# Archivo de staging donde escribe la ejecución en curso (None = se escribe en DW_PATH)
+_staging_path = None
+
+# Motores compartidos por cadena de conexión: cada motor mantiene su propio pool,
+# así los pasos del ETL (y el modo servicio) reutilizan conexiones abiertas
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _get_engine(connection_string, **kwargs):
+    """
+    Retorna el motor compartido para una cadena de conexión, creándolo en el primer uso.
+    """
+    with _engines_lock:
+        engine = _engines.get(connection_string)
+        if engine is None:
+            engine = create_engine(connection_string, **kwargs)
+            _engines[connection_string] = engine
+        return engine
+
+def dispose_engines(connection_string=None):
+    """
+    Cierra las conexiones de los motores compartidos y las conexiones ADBC (fin
+    del proceso o apagado del modo servicio). Si se indica una cadena de conexión
+    solo se cierra ese motor.
+    """
+    with _engines_lock:
+        for clave in [c for c in _engines if connection_string is None or c == connection_string]:
+            _engines.pop(clave).dispose()
+    if connection_string is None:
+        from .arrow_extract import close_arrow_connections
+        close_arrow_connections()
+
+def reset_engines():
+    """
+    Descarta los motores (y las conexiones ADBC) heredados en un proceso hijo
+    (fork) sin cerrar las conexiones, que siguen perteneciendo al proceso padre.
+    Cada hijo crea después sus propios motores y pools.
+    """
+    global _engines_lock
+    _engines_lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+    from .arrow_extract import close_arrow_connections
+    close_arrow_connections(cerrar_conexiones=False)
+
+def get_dw_path():
+    """
+    Ruta del archivo del DW en el que trabaja el proceso: el archivo de staging
+    durante una ejecución del ETL, o DW_PATH en otro caso.
+    """
+    return _staging_path or DW_PATH
+
+def set_staging_path(path):
+    """
+    Redirige las escrituras del DW al archivo de staging (None = volver a DW_PATH).
+    """
+    global _staging_path
+    _staging_path = path
 
 def get_dw_engine():
     """
-    Crea y devuelve un motor de SQLAlchemy para el Data Warehouse (SQLite).
+    Devuelve el motor de SQLAlchemy para el Data Warehouse (SQLite).
     """
-    db_path_dw = "DW_FastAndSafe.db"
-    connection_string = f"sqlite:///{db_path_dw}"
-    engine = create_engine(connection_string)
-    return engine
+    connection_string = f"sqlite:///{get_dw_path()}"
+    return _get_engine(connection_string)
 
 def get_oltp_engine():
     """
-    Crea y devuelve un motor de SQLAlchemy para la base de datos OLTP (PostgreSQL).
+    Devuelve el motor de SQLAlchemy para la base de datos OLTP (PostgreSQL).
+    Las conexiones del pool se validan antes de usarse (pool_pre_ping) para
+    sobrevivir a reinicios del servidor en procesos de larga duración.
     ¡IMPORTANTE! Debes reemplazar con tus credenciales reales.
     """
     db_user_oltp = "postgres"
@@ -21,12 +86,12 @@ def get_oltp_engine():
     db_name_oltp = "DW_FastAndSafe"
 
     connection_string = f"postgresql://{db_user_oltp}:{db_password_oltp}@{db_host_oltp}:{db_port_oltp}/{db_name_oltp}"
-    engine = create_engine(connection_string)
-    return engine
+    return _get_engine(connection_string, pool_pre_ping=True)
 
-def load_df_to_dw(df, table_name, engine, pk_column):
+def load_df_to_dw(df, table_name, engine, pk_column, chunksize=None):
     """
     Carga un DataFrame en una tabla del Data Warehouse (SQLite), estableciendo la PK.
+    Si no se indica chunksize se usa el tamaño de lote del plan de ejecución.
     """
     df_with_pk = df.set_index(pk_column, drop=True)
     
@@ -37,7 +102,7 @@ def load_df_to_dw(df, table_name, engine, pk_column):
             if_exists='replace', 
             index=True, 
             index_label=pk_column,
-            chunksize=1000
+            chunksize=chunksize or get_batch_size(table_name)
         )
     print(f"Tabla '{table_name}' cargada exitosamente en el DW.")
     print(f"Clave primaria '{pk_column}' establecida en '{table_name}'.") 
\ No newline at end of file
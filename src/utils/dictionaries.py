@@ -0,0 +1,84 @@
+import threading
+import pandas as pd
+from sqlalchemy import text, bindparam
+from .dim_cache import read_dimension, extend_dimension
+from .fingerprints import table_exists
+
+# Diccionario de las direcciones de destino de la tabla de hechos
+TABLA_DIRECCIONES = "Dim_Direccion_Destino"
+CLAVE_DIRECCION = "Direccion_Destino_Key"
+VALOR_DIRECCION = "Direccion_Destino"
+
+# Valores por consulta al leer las claves recién asignadas (límite de parámetros de SQLite)
+LOTE_PARAMETROS = 500
+
+# Serializa las inserciones de las hebras de un mismo proceso; entre procesos
+# (backfill) las serializa el bloqueo de escritura de SQLite
+_lock = threading.Lock()
+
+def ensure_dictionary(engine_dw, tabla=TABLA_DIRECCIONES, clave=CLAVE_DIRECCION, valor=VALOR_DIRECCION):
+    """
+    Crea, si no existe, una tabla diccionario (clave entera -> valor de texto).
+    AUTOINCREMENT garantiza que una clave nunca se reutiliza.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        tabla (str): Nombre de la tabla diccionario
+        clave (str): Columna de la clave entera
+        valor (str): Columna del valor codificado
+    """
+    with engine_dw.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS "{tabla}" (
+                "{clave}" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "{valor}" TEXT NOT NULL UNIQUE
+            )
+        """))
+
+def encode_values(serie, engine_dw, tabla=TABLA_DIRECCIONES, clave=CLAVE_DIRECCION, valor=VALOR_DIRECCION):
+    """
+    Codifica una columna de texto con las claves enteras de su diccionario en el
+    DW. Los valores nuevos reciben la siguiente clave libre; los ya codificados
+    conservan la suya, así las claves son estables entre ejecuciones y entre
+    particiones (el diccionario nunca se reemplaza ni se reordena).
+
+    Args:
+        serie (pd.Series): Valores a codificar (los nulos quedan nulos)
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        tabla (str): Nombre de la tabla diccionario
+        clave (str): Columna de la clave entera
+        valor (str): Columna del valor codificado
+
+    Returns:
+        pd.Series: Claves (Int64) alineadas con la serie de entrada
+    """
+    if not table_exists(engine_dw, tabla):
+        ensure_dictionary(engine_dw, tabla, clave, valor)
+
+    textos = serie.astype(object).where(serie.notna(), None)
+    valores = pd.unique(textos.dropna().astype(str))
+    df_dic = read_dimension(engine_dw, tabla, [clave, valor])
+    faltantes = pd.Index(valores).difference(df_dic[valor])
+
+    if len(faltantes):
+        with _lock, engine_dw.begin() as connection:
+            connection.execute(
+                text(f'INSERT OR IGNORE INTO "{tabla}" ("{valor}") VALUES (:valor)'),
+                [{"valor": v} for v in faltantes]
+            )
+            # Otra hebra u otro proceso pudo asignar alguno antes: se leen las claves vigentes
+            consulta = text(f'SELECT "{clave}", "{valor}" FROM "{tabla}" WHERE "{valor}" IN :valores') \
+                .bindparams(bindparam("valores", expanding=True))
+            nuevas = pd.concat([
+                pd.DataFrame(
+                    connection.execute(consulta, {"valores": list(faltantes[i:i + LOTE_PARAMETROS])}).fetchall(),
+                    columns=[clave, valor]
+                )
+                for i in range(0, len(faltantes), LOTE_PARAMETROS)
+            ], ignore_index=True)
+        extend_dimension(engine_dw, tabla, [clave, valor], nuevas)
+        df_dic = pd.concat([df_dic, nuevas], ignore_index=True).drop_duplicates(subset=[valor])
+        print(f"Diccionario '{tabla}': {len(nuevas)} valores nuevos ({len(df_dic)} en total).")
+
+    mapa = pd.Series(df_dic[clave].to_numpy(), index=df_dic[valor].to_numpy())
+    return textos.map(mapa).astype('Int64')
@@ -0,0 +1,91 @@
+import threading
+import pandas as pd
+from .etl_runs import get_engine_load_version
+
+# Lookups de dimensiones en memoria: (url del DW, tabla, columnas) -> (versión de carga, DataFrame)
+_lookups = {}
+_lock = threading.Lock()
+
+def read_dimension(engine_dw, tabla, columnas):
+    """
+    Retorna las columnas de una dimensión del DW para usarlas como lookup. La
+    primera lectura va a SQLite; las siguientes se sirven desde memoria mientras
+    la versión de carga del DW (get_load_version) sea la misma con la que se leyó
+    y la dimensión no se invalide (porque su paso se volvió a ejecutar). Así una
+    carga, un backfill o un rollback de otro proceso obligan a releerla.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        tabla (str): Nombre de la dimensión
+        columnas (list): Columnas a leer
+
+    Returns:
+        pd.DataFrame: Copia del lookup (el llamador puede modificarla)
+    """
+    clave = (str(engine_dw.url), tabla, tuple(columnas))
+    version = get_engine_load_version(engine_dw)
+    with _lock:
+        entrada = _lookups.get(clave)
+    if entrada is None or entrada[0] != version:
+        lista = ", ".join(f'"{c}"' for c in columnas)
+        entrada = (version, pd.read_sql(f'SELECT {lista} FROM "{tabla}"', engine_dw))
+        with _lock:
+            _lookups[clave] = entrada
+    return entrada[1].copy()
+
+def invalidate_dimension(tabla=None):
+    """
+    Descarta los lookups en memoria de una dimensión (o de todas si tabla es None).
+
+    Args:
+        tabla (str): Nombre de la dimensión recargada
+    """
+    with _lock:
+        for clave in [c for c in _lookups if tabla is None or c[1] == tabla]:
+            del _lookups[clave]
+
+def cached_dimensions():
+    """
+    Lista las dimensiones con lookups en memoria y su número de filas.
+
+    Returns:
+        dict: Tabla -> filas
+    """
+    with _lock:
+        return {clave[1]: len(df) for clave, (_, df) in _lookups.items()}
+
+def extend_dimension(engine_dw, tabla, columnas, df_nuevas):
+    """
+    Agrega filas nuevas al lookup en memoria de una dimensión que solo crece (ej:
+    un diccionario de valores), sin volver a leerla completa. Si el lookup no está
+    en memoria no se hace nada: la siguiente lectura ya incluye las filas nuevas.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        tabla (str): Nombre de la dimensión
+        columnas (list): Columnas del lookup
+        df_nuevas (pd.DataFrame): Filas insertadas en la dimensión
+    """
+    clave = (str(engine_dw.url), tabla, tuple(columnas))
+    with _lock:
+        entrada = _lookups.get(clave)
+        if entrada is not None:
+            version, df = entrada
+            _lookups[clave] = (version, pd.concat([df, df_nuevas[list(columnas)]], ignore_index=True).drop_duplicates())
+
+def retag_dimensions(engine_dw, version_anterior, version_nueva):
+    """
+    Pasa a la nueva versión de carga los lookups leídos con la anterior. Lo usa
+    el proceso que registra la ejecución: sus lookups siguen vigentes (los de las
+    dimensiones que recargó ya se invalidaron), así no se releen en el siguiente lote.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        version_anterior (str): Versión de carga antes de record_run
+        version_nueva (str): Versión de carga después de record_run
+    """
+    url = str(engine_dw.url)
+    with _lock:
+        for clave, (version, df) in list(_lookups.items()):
+            if clave[0] == url and version == version_anterior:
+                _lookups[clave] = (version_nueva, df)
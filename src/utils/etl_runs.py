@@ -0,0 +1,104 @@
+import os
+import uuid
+from datetime import datetime
+from sqlalchemy import text
+from . import db_connections
+
+RUNS_TABLE = "ETL_Ejecuciones"
+
+def new_run_id():
+    """
+    Genera el identificador de una ejecución del ETL (fecha-hora + sufijo aleatorio).
+
+    Returns:
+        str: Identificador de la ejecución, ej: '20250131_235959_1a2b3c'
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def record_run(engine_dw, run_id, inicio, pasos_ejecutados, pasos_omitidos):
+    """
+    Registra en el DW una ejecución exitosa del ETL. El Run_ID de la última
+    ejecución que cargó datos es la versión de carga del DW.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        run_id (str): Identificador de la ejecución
+        inicio (datetime): Momento de inicio de la ejecución
+        pasos_ejecutados (iterable): Pasos ejecutados
+        pasos_omitidos (iterable): Pasos omitidos
+    """
+    with engine_dw.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS "{RUNS_TABLE}" (
+                "Run_ID" TEXT PRIMARY KEY,
+                "Inicio" TEXT NOT NULL,
+                "Fin" TEXT NOT NULL,
+                "Pasos_Ejecutados" INTEGER NOT NULL,
+                "Pasos_Omitidos" INTEGER NOT NULL,
+                "Detalle_Pasos" TEXT
+            )
+        """))
+        connection.execute(
+            text(f"""
+                INSERT INTO "{RUNS_TABLE}"
+                    ("Run_ID", "Inicio", "Fin", "Pasos_Ejecutados", "Pasos_Omitidos", "Detalle_Pasos")
+                VALUES (:run_id, :inicio, :fin, :ejecutados, :omitidos, :detalle)
+            """),
+            {
+                "run_id": run_id,
+                "inicio": inicio.isoformat(sep=" ", timespec="seconds"),
+                "fin": datetime.now().isoformat(sep=" ", timespec="seconds"),
+                "ejecutados": len(list(pasos_ejecutados)),
+                "omitidos": len(list(pasos_omitidos)),
+                "detalle": ",".join(sorted(pasos_ejecutados))
+            }
+        )
+
+def get_load_version(conn):
+    """
+    Obtiene la versión de carga del DW: el Run_ID de la última ejecución que
+    ejecutó al menos un paso. Las ejecuciones que omitieron todo no cambian la versión.
+
+    Args:
+        conn (sqlite3.Connection): Conexión al DW
+
+    Returns:
+        str: Versión de carga, o None si el DW no registra ejecuciones
+    """
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RUNS_TABLE,)
+    ).fetchone()
+    if not existe:
+        return None
+    fila = conn.execute(
+        f'SELECT "Run_ID" FROM "{RUNS_TABLE}" WHERE "Pasos_Ejecutados" > 0 ORDER BY "Fin" DESC, rowid DESC LIMIT 1'
+    ).fetchone()
+    return fila[0] if fila else None
+
+def get_engine_load_version(engine_dw):
+    """
+    Versión de carga del DW al que apunta un motor (ver get_load_version).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+
+    Returns:
+        str: Versión de carga, o None si el DW no registra ejecuciones
+    """
+    connection = engine_dw.raw_connection()
+    try:
+        return get_load_version(connection.dbapi_connection)
+    finally:
+        connection.close()
+
+def get_run_dir(run_id):
+    """
+    Directorio de artefactos de una ejecución (perfiles, reportes), junto al DW.
+
+    Args:
+        run_id (str): Identificador de la ejecución
+
+    Returns:
+        str: Ruta del directorio (no se crea)
+    """
+    return os.path.join(f"{os.path.splitext(db_connections.DW_PATH)[0]}_ejecuciones", run_id)
@@ -0,0 +1,36 @@
+try:
+    import fcntl
+except ImportError:  # Windows no dispone del módulo 'fcntl'
+    fcntl = None
+    import msvcrt
+
+def lock_file(f, esperar=True):
+    """
+    Toma un bloqueo exclusivo sobre un archivo abierto (fcntl en POSIX, msvcrt en
+    Windows). El bloqueo se libera con unlock_file o al cerrar el archivo.
+
+    Args:
+        f (file): Archivo abierto en modo binario con escritura (ej: 'a+b')
+        esperar (bool): Si es False no espera a que otro proceso lo libere
+
+    Raises:
+        OSError: Si esperar es False y otro proceso tiene el bloqueo
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK, 1)
+
+def unlock_file(f):
+    """
+    Libera el bloqueo tomado con lock_file.
+
+    Args:
+        f (file): Archivo bloqueado
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,169 @@
+import hashlib
+from sqlalchemy import inspect, text
+
+FINGERPRINT_TABLE = "ETL_Control_Fingerprint"
+
+def build_fingerprint_query(tabla, columna_id, columnas=None):
+    """
+    Construye la consulta que calcula, del lado del OLTP, la huella de una tabla:
+    número de filas, id máximo y un hash agregado de las columnas indicadas.
+
+    Args:
+        tabla (str): Nombre calificado de la tabla en el OLTP (ej: 'public.cliente')
+        columna_id (str): Columna identificadora usada para ordenar y calcular el máximo
+        columnas (list): Columnas incluidas en el hash. Si es vacía, solo se usan filas e id máximo
+
+    Returns:
+        str: Consulta SQL que retorna las columnas 'filas', 'max_id' y 'hash'
+    """
+    if columnas:
+        concatenacion = ", ".join([columna_id] + list(columnas))
+        expresion_hash = f"md5(COALESCE(string_agg(concat_ws('|', {concatenacion}), ',' ORDER BY {columna_id}), ''))"
+    else:
+        expresion_hash = "NULL"
+
+    return f"""
+    SELECT
+        COUNT(*) AS filas,
+        MAX({columna_id})::text AS max_id,
+        {expresion_hash} AS hash
+    FROM
+        {tabla}
+    """
+
+def compute_oltp_fingerprint(engine_oltp, fuentes):
+    """
+    Calcula la huella combinada de un conjunto de tablas del OLTP. Todo el trabajo
+    de agregación se hace en PostgreSQL; solo viaja una fila por tabla.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        fuentes (list): Tuplas (tabla, columna_id, columnas) según build_fingerprint_query
+
+    Returns:
+        str: Huella SHA-256 en hexadecimal
+    """
+    partes = []
+    with engine_oltp.connect() as connection:
+        for tabla, columna_id, columnas in fuentes:
+            fila = connection.execute(text(build_fingerprint_query(tabla, columna_id, columnas))).one()
+            partes.append(f"{tabla}:{fila.filas}:{fila.max_id}:{fila.hash}")
+    return hash_parts(partes)
+
+def hash_parts(partes):
+    """
+    Combina una lista de valores en una huella SHA-256 estable.
+
+    Args:
+        partes (list): Valores a combinar (se convierten a texto)
+
+    Returns:
+        str: Huella SHA-256 en hexadecimal
+    """
+    return hashlib.sha256(";".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+def get_stored_fingerprint(engine_dw, paso):
+    """
+    Obtiene la huella guardada para un paso en la última carga exitosa.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        paso (str): Nombre del paso ETL
+
+    Returns:
+        str: Huella almacenada, o None si no existe
+    """
+    if not inspect(engine_dw).has_table(FINGERPRINT_TABLE):
+        return None
+    with engine_dw.connect() as connection:
+        return connection.execute(
+            text(f'SELECT "Fingerprint" FROM "{FINGERPRINT_TABLE}" WHERE "Paso" = :paso'),
+            {"paso": paso}
+        ).scalar()
+
+def save_fingerprint(engine_dw, paso, fingerprint):
+    """
+    Guarda (o reemplaza) la huella de un paso tras una carga exitosa.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        paso (str): Nombre del paso ETL
+        fingerprint (str): Huella calculada sobre el origen
+    """
+    with engine_dw.begin() as connection:
+        upsert_fingerprint(connection, paso, fingerprint)
+
+def upsert_fingerprint(connection, paso, fingerprint):
+    """
+    Guarda (o reemplaza) la huella de un paso dentro de la transacción de la
+    conexión dada (para registrarla junto con los datos que respalda).
+
+    Args:
+        connection (sqlalchemy.Connection): Conexión al DW con una transacción abierta
+        paso (str): Nombre del paso ETL
+        fingerprint (str): Huella calculada sobre el origen
+    """
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS "{FINGERPRINT_TABLE}" (
+            "Paso" TEXT PRIMARY KEY,
+            "Fingerprint" TEXT NOT NULL,
+            "Fecha_Actualizacion" TEXT NOT NULL
+        )
+    """))
+    connection.execute(
+        text(f"""
+            INSERT OR REPLACE INTO "{FINGERPRINT_TABLE}" ("Paso", "Fingerprint", "Fecha_Actualizacion")
+            VALUES (:paso, :fingerprint, datetime('now'))
+        """),
+        {"paso": paso, "fingerprint": fingerprint}
+    )
+
+def list_fingerprints(engine_dw, prefijo):
+    """
+    Lista las huellas guardadas cuyo paso comienza con el prefijo dado (por
+    ejemplo, las huellas por periodo de un paso particionado).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        prefijo (str): Prefijo del nombre del paso
+
+    Returns:
+        dict: Paso -> huella
+    """
+    if not inspect(engine_dw).has_table(FINGERPRINT_TABLE):
+        return {}
+    with engine_dw.connect() as connection:
+        return dict(connection.execute(
+            text(f'SELECT "Paso", "Fingerprint" FROM "{FINGERPRINT_TABLE}" WHERE substr("Paso", 1, length(:prefijo)) = :prefijo'),
+            {"prefijo": prefijo}
+        ).fetchall())
+
+def delete_fingerprints(engine_dw, prefijo):
+    """
+    Elimina las huellas cuyo paso comienza con el prefijo dado (por ejemplo, las
+    huellas por periodo de un paso particionado) para forzar su recarga.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        prefijo (str): Prefijo del nombre del paso
+    """
+    if not inspect(engine_dw).has_table(FINGERPRINT_TABLE):
+        return
+    with engine_dw.begin() as connection:
+        connection.execute(
+            text(f'DELETE FROM "{FINGERPRINT_TABLE}" WHERE substr("Paso", 1, length(:prefijo)) = :prefijo'),
+            {"prefijo": prefijo}
+        )
+
+def table_exists(engine_dw, tabla):
+    """
+    Indica si una tabla existe en el Data Warehouse.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        tabla (str): Nombre de la tabla
+
+    Returns:
+        bool: True si la tabla existe
+    """
+    return inspect(engine_dw).has_table(tabla)
@@ -0,0 +1,755 @@
+import os
+import re
+import sqlite3
+import time
+import uuid
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+from . import db_connections
+from .dictionaries import TABLA_DIRECCIONES, CLAVE_DIRECCION, VALOR_DIRECCION
+
+FACT_TABLE = "Fact_Cambio_Estado_Servicio"
+CATALOG_TABLE = "Fact_Particiones"
+
+FACT_COLUMNS = [
+    "Servicio_Estado_Key", "Fecha_Key", "Hora_Key", "Cliente_Key", "Sede_Origen_Key",
+    "Geografia_Destino_Key", "Mensajero_Key", "Estado_Servicio_Key", "Urgencia_Servicio_Key",
+    "Novedad_Key", "Servicio_ID_Operacional", "Direccion_Destino_Key", "Timestamp_Estado", "Contador_Estados"
+]
+
+# Columnas de la vista de compatibilidad: las almacenadas más la dirección decodificada
+VIEW_COLUMNS = FACT_COLUMNS[:FACT_COLUMNS.index(CLAVE_DIRECCION) + 1] + [VALOR_DIRECCION] + \
+    FACT_COLUMNS[FACT_COLUMNS.index(CLAVE_DIRECCION) + 1:]
+
+# Columna de los archivos compactados (varios periodos en un archivo, ver compact_partitions)
+COLUMNA_PERIODO = "Periodo"
+# En un archivo compactado, la columna Periodo guarda la etiqueta de la versión del
+# periodo: el periodo solo ('YYYY-MM') o, si se recargó o se incorporó después de
+# compactar, 'YYYY-MM@<segundos>_<id>'. Cada versión del DW filtra por la etiqueta de
+# su catálogo, así el archivo se modifica sin cambiar lo que ven las versiones anteriores
+SEPARADOR_ETIQUETA = "@"
+# Segundos de espera por el bloqueo de escritura de un archivo compactado con lectores
+ESPERA_ESCRITURA = 60
+
+# Índices creados en cada archivo de partición
+FACT_INDEXES = {
+    "idx_servicio_estado_key": ("Servicio_Estado_Key",),
+    "idx_servicio_timestamp": ("Servicio_ID_Operacional", "Timestamp_Estado"),
+    "idx_fecha_cliente": ("Fecha_Key", "Cliente_Key"),
+    "idx_mensajero_estado": ("Mensajero_Key", "Estado_Servicio_Key"),
+    "idx_estado": ("Estado_Servicio_Key",)
+}
+
+def get_partitions_dir():
+    """
+    Retorna el directorio donde se guardan los archivos de partición mensual,
+    ubicado junto al archivo principal del DW (compartido por el DW publicado,
+    el staging y las instantáneas).
+
+    Returns:
+        str: Ruta del directorio de particiones
+    """
+    return f"{os.path.splitext(db_connections.DW_PATH)[0]}_particiones"
+
+def partition_file(periodo):
+    """
+    Retorna la ruta de un archivo nuevo para una partición mensual. Cada escritura
+    usa un nombre distinto: los archivos son inmutables y el catálogo de cada
+    versión del DW apunta a los suyos, así una instantánea anterior sigue siendo
+    consistente aunque el periodo se haya recargado.
+
+    Args:
+        periodo (str): Periodo en formato 'YYYY-MM'
+
+    Returns:
+        str: Ruta del archivo de la partición
+    """
+    return os.path.join(get_partitions_dir(), f"{FACT_TABLE}_{periodo.replace('-', '_')}_{uuid.uuid4().hex[:8]}.db")
+
+def ensure_catalog(engine_dw):
+    """
+    Crea, si no existe, la tabla catálogo de particiones en el archivo principal del DW.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+    """
+    with engine_dw.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS "{CATALOG_TABLE}" (
+                "Periodo" TEXT PRIMARY KEY,
+                "Archivo" TEXT NOT NULL,
+                "Filas" INTEGER NOT NULL,
+                "Fecha_Key_Min" INTEGER,
+                "Fecha_Key_Max" INTEGER,
+                "Fecha_Actualizacion" TEXT NOT NULL,
+                "Etiqueta" TEXT
+            )
+        """))
+        # Catálogos creados antes de la recarga en el lugar de los archivos compactados
+        columnas = {fila[1] for fila in connection.execute(text(f'PRAGMA table_info("{CATALOG_TABLE}")'))}
+        if "Etiqueta" not in columnas:
+            connection.execute(text(f'ALTER TABLE "{CATALOG_TABLE}" ADD COLUMN "Etiqueta" TEXT'))
+
+CATALOG_COLUMNS = ["Periodo", "Archivo", "Filas", "Fecha_Key_Min", "Fecha_Key_Max", "Fecha_Actualizacion", "Etiqueta"]
+
+def catalog_label_sql(connection):
+    """
+    Expresión SQL de la etiqueta de cada entrada del catálogo (el periodo si no
+    tiene una propia). Los catálogos de instantáneas anteriores no tienen la columna.
+
+    Args:
+        connection (sqlite3.Connection): Conexión a una versión del DW con catálogo
+
+    Returns:
+        str: Expresión sobre las columnas del catálogo
+    """
+    columnas = {fila[1] for fila in connection.execute(f'PRAGMA table_info("{CATALOG_TABLE}")')}
+    return 'COALESCE("Etiqueta", "Periodo")' if "Etiqueta" in columnas else '"Periodo"'
+
+def list_partitions(engine_dw, solo_lectura=False):
+    """
+    Lista las particiones registradas en el catálogo. La columna Etiqueta trae
+    el periodo cuando la entrada no tiene una propia.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        solo_lectura (bool): Si es True no crea el catálogo (sin catálogo retorna
+            un DataFrame vacío); para huellas y consultas que no deben escribir
+
+    Returns:
+        pd.DataFrame: Catálogo de particiones ordenado por periodo
+    """
+    if solo_lectura:
+        if not inspect(engine_dw).has_table(CATALOG_TABLE):
+            return pd.DataFrame(columns=CATALOG_COLUMNS)
+    else:
+        ensure_catalog(engine_dw)
+    df = pd.read_sql(f'SELECT * FROM "{CATALOG_TABLE}" ORDER BY "Periodo"', engine_dw)
+    if "Etiqueta" not in df:
+        df["Etiqueta"] = None
+    df["Etiqueta"] = df["Etiqueta"].astype(object).where(df["Etiqueta"].notna(), df["Periodo"])
+    return df
+
+def build_partition_file(df, periodo, chunksize=10000):
+    """
+    Construye el archivo SQLite de una partición mensual, con sus índices, sin
+    registrarlo en el catálogo. El archivo se escribe aparte y se publica con un
+    rename atómico; mientras no se registre, ninguna versión del DW lo referencia.
+
+    Args:
+        df (pd.DataFrame): Filas de la tabla de hechos del periodo
+        periodo (str): Periodo en formato 'YYYY-MM'
+        chunksize (int): Tamaño de lote para to_sql
+
+    Returns:
+        dict: Archivo (nombre), filas y rango de Fecha_Key de la partición
+    """
+    os.makedirs(get_partitions_dir(), exist_ok=True)
+    archivo = partition_file(periodo)
+    archivo_tmp = f"{archivo}.tmp"
+    if os.path.exists(archivo_tmp):
+        os.remove(archivo_tmp)
+
+    engine_particion = create_engine(f"sqlite:///{archivo_tmp}")
+    try:
+        df[FACT_COLUMNS].to_sql(FACT_TABLE, engine_particion, if_exists='replace', index=False, chunksize=chunksize)
+        with engine_particion.begin() as connection:
+            for nombre, columnas in FACT_INDEXES.items():
+                lista = ", ".join(f'"{c}"' for c in columnas)
+                connection.execute(text(f'CREATE INDEX "{nombre}" ON "{FACT_TABLE}" ({lista})'))
+    finally:
+        engine_particion.dispose()
+    os.replace(archivo_tmp, archivo)
+
+    fecha_key_min = df['Fecha_Key'].min() if len(df) else None
+    fecha_key_max = df['Fecha_Key'].max() if len(df) else None
+    return {
+        "archivo": os.path.basename(archivo),
+        "filas": len(df),
+        "fecha_key_min": None if pd.isna(fecha_key_min) else int(fecha_key_min),
+        "fecha_key_max": None if pd.isna(fecha_key_max) else int(fecha_key_max)
+    }
+
+def recode_partition(archivo, columna, claves):
+    """
+    Reemplaza en un archivo de partición aún no registrado los códigos locales
+    1..n de una columna por sus claves definitivas (claves[i - 1] para el código i).
+    Los nulos se conservan.
+
+    Args:
+        archivo (str): Nombre del archivo de partición
+        columna (str): Columna con códigos locales
+        claves (pd.Series): Claves definitivas, en el orden de los códigos
+    """
+    connection = sqlite3.connect(os.path.join(get_partitions_dir(), archivo))
+    try:
+        with connection:
+            connection.execute("CREATE TEMP TABLE mapa (codigo INTEGER PRIMARY KEY, clave INTEGER)")
+            connection.executemany(
+                "INSERT INTO temp.mapa VALUES (?, ?)",
+                [(i, None if pd.isna(clave) else int(clave)) for i, clave in enumerate(claves, start=1)]
+            )
+            connection.execute(f"""
+                UPDATE "{FACT_TABLE}" SET "{columna}" = (SELECT clave FROM temp.mapa WHERE codigo = "{columna}")
+                WHERE "{columna}" IS NOT NULL
+            """)
+    finally:
+        connection.close()
+
+def register_partition(connection, periodo, particion):
+    """
+    Registra (o reemplaza) una partición en el catálogo dentro de la transacción
+    de la conexión dada. El catálogo debe existir (ver ensure_catalog).
+
+    Args:
+        connection (sqlalchemy.Connection): Conexión al DW con una transacción abierta
+        periodo (str): Periodo en formato 'YYYY-MM'
+        particion (dict): Resultado de build_partition_file o de merge_into_compacted
+    """
+    connection.execute(
+        text(f"""
+            INSERT OR REPLACE INTO "{CATALOG_TABLE}"
+                ("Periodo", "Archivo", "Filas", "Fecha_Key_Min", "Fecha_Key_Max", "Fecha_Actualizacion", "Etiqueta")
+            VALUES (:periodo, :archivo, :filas, :fecha_key_min, :fecha_key_max, datetime('now'), :etiqueta)
+        """),
+        {"periodo": periodo, "etiqueta": None, **particion}
+    )
+
+def write_partition(df, periodo, engine_dw, chunksize=10000):
+    """
+    Escribe la partición mensual de la tabla de hechos en su propio archivo SQLite,
+    con sus índices, y la registra en el catálogo. Si el periodo ya vive en un
+    archivo compactado, sus filas se reemplazan dentro de ese archivo (ver
+    merge_into_compacted). Las demás particiones no se tocan. La versión anterior
+    del periodo se conserva hasta que ninguna versión retenida del DW la
+    referencie (ver snapshots.collect_partitions).
+
+    Args:
+        df (pd.DataFrame): Filas de la tabla de hechos del periodo
+        periodo (str): Periodo en formato 'YYYY-MM'
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        chunksize (int): Tamaño de lote para to_sql
+    """
+    particion = build_partition_file(df, periodo, chunksize)
+    ensure_catalog(engine_dw)
+    particion = merge_into_compacted(engine_dw, periodo, particion)
+    with engine_dw.begin() as connection:
+        register_partition(connection, periodo, particion)
+    print(f"Partición {periodo} de '{FACT_TABLE}' cargada ({len(df)} filas).")
+
+def drop_partition(periodo, engine_dw):
+    """
+    Elimina una partición mensual del catálogo. El archivo se borra cuando ninguna
+    versión retenida del DW lo referencie (ver snapshots.collect_partitions).
+
+    Args:
+        periodo (str): Periodo en formato 'YYYY-MM'
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+    """
+    ensure_catalog(engine_dw)
+    with engine_dw.begin() as connection:
+        connection.execute(text(f'DELETE FROM "{CATALOG_TABLE}" WHERE "Periodo" = :periodo'), {"periodo": periodo})
+    print(f"Partición {periodo} de '{FACT_TABLE}' eliminada.")
+
+def max_partition_files():
+    """
+    Número máximo de archivos de partición que una conexión puede adjuntar
+    (SQLITE_LIMIT_ATTACHED; 10 por defecto y no se puede subir en tiempo de
+    ejecución). compact_partitions mantiene el catálogo por debajo de este límite.
+
+    Returns:
+        int: Archivos que se pueden adjuntar a la vez
+    """
+    connection = sqlite3.connect(":memory:")
+    try:
+        if hasattr(connection, "getlimit"):
+            return connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        return 10  # Valor por defecto de SQLite (SQLITE_MAX_ATTACHED)
+    finally:
+        connection.close()
+
+def _columnas_archivo(connection, alias):
+    """
+    Columnas (nombre -> tipo declarado) de la tabla de hechos de un archivo adjunto.
+    """
+    return {fila[1]: fila[2] for fila in connection.execute(f'PRAGMA {alias}.table_info("{FACT_TABLE}")')}
+
+def _filtro_periodos(columnas, periodos, prefijo="p."):
+    """
+    Filtro de un archivo compactado a las etiquetas que el catálogo le asigna
+    (ver SEPARADOR_ETIQUETA). Los archivos mensuales no tienen columna de periodo
+    y se leen completos.
+    """
+    if COLUMNA_PERIODO not in columnas:
+        return ""
+    lista = ", ".join("'" + p.replace("'", "''") + "'" for p in periodos)
+    return f' WHERE {prefijo}"{COLUMNA_PERIODO}" IN ({lista})'
+
+def count_partition_rows(archivo, etiqueta):
+    """
+    Cuenta las filas de un periodo en su archivo de partición (mensual o compactado).
+
+    Args:
+        archivo (str): Nombre del archivo (columna Archivo del catálogo)
+        etiqueta (str): Etiqueta del periodo en el catálogo (ver list_partitions)
+
+    Returns:
+        int: Filas del periodo
+    """
+    connection = sqlite3.connect(f"file:{os.path.join(get_partitions_dir(), archivo)}?mode=ro", uri=True)
+    try:
+        columnas = _columnas_archivo(connection, "main")
+        return connection.execute(
+            f'SELECT COUNT(*) FROM "{FACT_TABLE}"{_filtro_periodos(columnas, [etiqueta], prefijo="")}'
+        ).fetchone()[0]
+    finally:
+        connection.close()
+
+def read_partition(archivo, etiqueta):
+    """
+    Lee las filas de un periodo desde su archivo de partición, ordenadas por clave.
+
+    Args:
+        archivo (str): Nombre del archivo (columna Archivo del catálogo)
+        etiqueta (str): Etiqueta del periodo en el catálogo (ver list_partitions)
+
+    Returns:
+        pd.DataFrame: Filas del periodo con las columnas almacenadas de la tabla de hechos
+    """
+    connection = sqlite3.connect(f"file:{os.path.join(get_partitions_dir(), archivo)}?mode=ro", uri=True)
+    try:
+        columnas = _columnas_archivo(connection, "main")
+        lista = ", ".join(f'"{c}"' for c in columnas if c != COLUMNA_PERIODO)
+        return pd.read_sql(
+            f'SELECT {lista} FROM "{FACT_TABLE}"{_filtro_periodos(columnas, [etiqueta], prefijo="")} '
+            f'ORDER BY "Servicio_Estado_Key"', connection
+        )
+    finally:
+        connection.close()
+
+def _es_compactado(archivo):
+    """
+    Indica si un archivo de partición es compactado (tiene la columna Periodo).
+    """
+    connection = sqlite3.connect(f"file:{os.path.join(get_partitions_dir(), archivo)}?mode=ro", uri=True)
+    try:
+        return COLUMNA_PERIODO in _columnas_archivo(connection, "main")
+    finally:
+        connection.close()
+
+def _nueva_etiqueta(periodo):
+    """
+    Etiqueta de una versión nueva de un periodo dentro de un archivo compactado.
+    """
+    return f"{periodo}{SEPARADOR_ETIQUETA}{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+def _segundos_etiqueta(etiqueta):
+    """
+    Momento (epoch) en que se creó una etiqueta; 0 si no tiene marca (filas de la compactación).
+    """
+    marca = etiqueta.partition(SEPARADOR_ETIQUETA)[2]
+    return int(marca.split("_")[0]) if marca else 0
+
+def _copiar_filas(connection, origen, pares):
+    """
+    Copia al archivo de la conexión las filas de un archivo de partición adjunto
+    como 'origen': por cada par (etiqueta en el origen, etiqueta en el destino).
+    Un archivo mensual no tiene columna Periodo y se copia completo.
+    """
+    columnas = _columnas_archivo(connection, "origen")
+    lista = ", ".join(f'"{c}"' for c in FACT_COLUMNS)
+    for etiqueta_origen, etiqueta_destino in pares:
+        connection.execute(
+            f'INSERT INTO main."{FACT_TABLE}" ({lista}, "{COLUMNA_PERIODO}") '
+            f'SELECT {lista}, ? FROM origen."{FACT_TABLE}"{_filtro_periodos(columnas, [etiqueta_origen], prefijo="")}',
+            (etiqueta_destino,)
+        )
+
+def _agrupar_por_archivo(grupo, etiquetas):
+    """
+    Agrupa las entradas (periodo, etiqueta, archivo) por archivo de origen, con el
+    par (etiqueta en el origen, etiqueta en el destino) de cada periodo.
+    """
+    origenes = {}
+    for periodo, etiqueta, archivo in grupo:
+        origenes.setdefault(archivo, []).append((etiqueta, etiquetas[periodo]))
+    return origenes
+
+def build_compacted_file(grupo, nombre):
+    """
+    Construye un archivo con las filas de varios periodos (tomadas de sus archivos
+    actuales, uno adjunto a la vez) y la columna Periodo para distinguirlos. Como
+    build_partition_file, se escribe aparte y se publica con un rename atómico.
+
+    Args:
+        grupo (list): Tuplas (periodo, etiqueta, archivo) según el catálogo
+        nombre (str): Etiqueta del archivo (p. ej. el año)
+
+    Returns:
+        str: Nombre del archivo compactado
+    """
+    os.makedirs(get_partitions_dir(), exist_ok=True)
+    archivo = partition_file(nombre)
+    archivo_tmp = f"{archivo}.tmp"
+    if os.path.exists(archivo_tmp):
+        os.remove(archivo_tmp)
+
+    connection = sqlite3.connect(archivo_tmp)
+    try:
+        creada = False
+        # En el archivo nuevo cada periodo se etiqueta solo con el periodo
+        for origen, pares in _agrupar_por_archivo(grupo, {periodo: periodo for periodo, _, _ in grupo}).items():
+            connection.execute("ATTACH DATABASE ? AS origen", (f"file:{os.path.join(get_partitions_dir(), origen)}?mode=ro",))
+            if not creada:
+                columnas = _columnas_archivo(connection, "origen")
+                definicion = ", ".join(f'"{c}" {columnas[c]}' for c in FACT_COLUMNS)
+                connection.execute(f'CREATE TABLE main."{FACT_TABLE}" ({definicion}, "{COLUMNA_PERIODO}" TEXT NOT NULL)')
+                creada = True
+            _copiar_filas(connection, "origen", pares)
+            connection.commit()
+            connection.execute("DETACH DATABASE origen")
+        for nombre_indice, columnas_indice in {**FACT_INDEXES, "idx_periodo": (COLUMNA_PERIODO,)}.items():
+            lista_indice = ", ".join(f'"{c}"' for c in columnas_indice)
+            connection.execute(f'CREATE INDEX "{nombre_indice}" ON "{FACT_TABLE}" ({lista_indice})')
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(archivo_tmp, archivo)
+    return os.path.basename(archivo)
+
+def _borrar_versiones(connection, en_uso, gracia, periodos=None):
+    """
+    Borra de un archivo compactado las versiones (etiquetas) que no referencia
+    ninguna versión retenida del DW, salvo las creadas dentro del periodo de
+    gracia (una carga en curso escribe sus filas antes de registrarlas).
+
+    Returns:
+        int: Filas borradas
+    """
+    limite = time.time() - gracia
+    etiquetas = [
+        etiqueta for (etiqueta,) in connection.execute(f'SELECT DISTINCT "{COLUMNA_PERIODO}" FROM main."{FACT_TABLE}"')
+        if etiqueta not in en_uso and _segundos_etiqueta(etiqueta) < limite
+        and (periodos is None or etiqueta.partition(SEPARADOR_ETIQUETA)[0] in periodos)
+    ]
+    if not etiquetas:
+        return 0
+    return connection.execute(
+        f'DELETE FROM main."{FACT_TABLE}" WHERE "{COLUMNA_PERIODO}" IN ({", ".join("?" * len(etiquetas))})', etiquetas
+    ).rowcount
+
+def _incorporar(destino, grupo, purgar=()):
+    """
+    Copia a un archivo compactado existente las filas de cada entrada (periodo,
+    etiqueta, archivo) del grupo con una etiqueta nueva. Las filas nuevas no las
+    ve ninguna versión del DW hasta que el catálogo registre su etiqueta, así que
+    el archivo se modifica sin afectar al DW publicado ni a las instantáneas. En
+    la transacción de la última copia se borran las versiones de los periodos
+    'purgar' que ya no referencia ninguna versión retenida.
+
+    Returns:
+        dict: Periodo -> etiqueta nueva
+    """
+    from .snapshots import GRACIA_PARTICIONES, etiquetas_en_uso
+
+    etiquetas = {periodo: _nueva_etiqueta(periodo) for periodo, _, _ in grupo}
+    origenes = _agrupar_por_archivo(grupo, etiquetas)
+    en_uso = etiquetas_en_uso().get(destino, set())
+    connection = sqlite3.connect(os.path.join(get_partitions_dir(), destino), timeout=ESPERA_ESCRITURA)
+    try:
+        for i, (origen, pares) in enumerate(origenes.items()):
+            connection.execute("ATTACH DATABASE ? AS origen", (f"file:{os.path.join(get_partitions_dir(), origen)}?mode=ro",))
+            with connection:
+                _copiar_filas(connection, "origen", pares)
+                if purgar and i == len(origenes) - 1:
+                    _borrar_versiones(connection, en_uso, GRACIA_PARTICIONES, set(purgar))
+            connection.execute("DETACH DATABASE origen")
+    finally:
+        connection.close()
+    return etiquetas
+
+def merge_into_compacted(engine_dw, periodo, particion):
+    """
+    Si el periodo vive en un archivo compactado, reemplaza sus filas dentro de
+    ese archivo en lugar de registrar un archivo mensual: copia las filas del
+    archivo recién construido con una etiqueta nueva (y borra las versiones del
+    periodo que ya nadie referencia) y elimina el archivo mensual. Así recargar
+    un mes no agrega archivos al catálogo ni obliga a recompactar su año.
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        periodo (str): Periodo 'YYYY-MM'
+        particion (dict): Resultado de build_partition_file (aún sin registrar)
+
+    Returns:
+        dict: Partición a registrar (el archivo compactado y su etiqueta, o la original)
+    """
+    with engine_dw.connect() as connection:
+        actual = connection.execute(
+            text(f'SELECT "Archivo" FROM "{CATALOG_TABLE}" WHERE "Periodo" = :periodo'), {"periodo": periodo}
+        ).scalar()
+    if actual is None or not os.path.exists(os.path.join(get_partitions_dir(), actual)) or not _es_compactado(actual):
+        return particion
+    etiqueta = _incorporar(actual, [(periodo, periodo, particion["archivo"])], purgar=[periodo])[periodo]
+    os.remove(os.path.join(get_partitions_dir(), particion["archivo"]))
+    return {**particion, "archivo": actual, "etiqueta": etiqueta}
+
+def purge_compacted(archivo, en_uso, gracia):
+    """
+    Borra de un archivo compactado las versiones de periodos que no referencia
+    ninguna versión retenida del DW (ver snapshots.collect_partitions). Los
+    archivos mensuales no se modifican.
+
+    Args:
+        archivo (str): Nombre del archivo compactado
+        en_uso (set): Etiquetas del archivo referenciadas por alguna versión retenida
+        gracia (int): Antigüedad mínima en segundos de una versión para borrarla
+
+    Returns:
+        int: Filas borradas
+    """
+    if not _es_compactado(archivo):
+        return 0
+    connection = sqlite3.connect(os.path.join(get_partitions_dir(), archivo), timeout=ESPERA_ESCRITURA)
+    try:
+        with connection:
+            return _borrar_versiones(connection, en_uso, gracia)
+    finally:
+        connection.close()
+
+def _grupo_a_compactar(catalogo):
+    """
+    Elige los archivos a fusionar: todos los del año más antiguo que ocupa más de
+    un archivo o, si cada año ya está en un solo archivo, los dos archivos más
+    antiguos. El periodo sin fecha y las particiones anteriores a la codificación
+    de la dirección no se compactan.
+    """
+    archivos = {}
+    for fila in catalogo.itertuples(index=False):
+        if re.fullmatch(r"\d{4}-\d{2}", fila.Periodo):
+            archivos.setdefault(fila.Archivo, []).append(fila.Periodo)
+    compactables = {}
+    for archivo, periodos in archivos.items():
+        connection = sqlite3.connect(f"file:{os.path.join(get_partitions_dir(), archivo)}?mode=ro", uri=True)
+        try:
+            if CLAVE_DIRECCION in _columnas_archivo(connection, "main"):
+                compactables[archivo] = sorted(periodos)
+        finally:
+            connection.close()
+    por_anio = {}
+    for archivo, periodos in compactables.items():
+        por_anio.setdefault(periodos[0][:4], []).append(archivo)
+    for anio in sorted(por_anio):
+        if len(por_anio[anio]) > 1:
+            return anio, por_anio[anio]
+    antiguos = sorted(compactables, key=lambda a: compactables[a][0])[:2]
+    if len(antiguos) < 2:
+        return None, []
+    return f"{compactables[antiguos[0]][0][:4]}-{compactables[antiguos[1]][-1][:4]}", antiguos
+
+def compact_partitions(engine_dw, limite=None):
+    """
+    Mantiene el número de archivos referenciados por el catálogo dentro del límite
+    de ATTACH de SQLite, para que connect_dw pueda exponer cualquier rango como
+    una vista sobre los archivos (sin copiar filas). Fusiona primero los meses del
+    año más antiguo. Si el grupo ya tiene un archivo compactado, los demás se
+    incorporan a él (solo se escriben las filas incorporadas); si no, se construye
+    uno nuevo. Los archivos reemplazados se eliminan cuando ninguna versión
+    retenida del DW los referencie (ver snapshots.collect_partitions).
+
+    Args:
+        engine_dw (sqlalchemy.Engine): Motor de conexión al Data Warehouse
+        limite (int): Archivos permitidos (None = max_partition_files())
+
+    Returns:
+        int: Grupos de archivos compactados
+
+    Raises:
+        RuntimeError: Si el catálogo supera el límite y no queda nada compactable
+    """
+    limite = limite or max_partition_files()
+    creados = 0
+    while True:
+        catalogo = list_partitions(engine_dw)
+        if catalogo['Archivo'].nunique() <= limite:
+            return creados
+        nombre, archivos = _grupo_a_compactar(catalogo)
+        if not archivos:
+            raise RuntimeError(
+                f"El catálogo referencia {catalogo['Archivo'].nunique()} archivos (límite {limite}) "
+                f"y no quedan particiones compactables."
+            )
+        grupo = [
+            (fila.Periodo, fila.Etiqueta, fila.Archivo) for fila in catalogo.itertuples(index=False)
+            if fila.Archivo in archivos and re.fullmatch(r"\d{4}-\d{2}", fila.Periodo)
+        ]
+        compactados = [archivo for archivo in archivos if _es_compactado(archivo)]
+        if compactados:
+            # El compactado con más periodos recibe a los demás
+            destino = max(compactados, key=lambda a: sum(1 for _, _, archivo in grupo if archivo == a))
+            incorporados = [entrada for entrada in grupo if entrada[2] != destino]
+            etiquetas = _incorporar(destino, incorporados)
+            accion = f"incorporados al archivo compactado ({len(incorporados)} periodos)"
+        else:
+            destino = build_compacted_file(grupo, nombre)
+            etiquetas = {periodo: None for periodo, _, _ in grupo}
+            accion = f"fusionados en uno ({len(grupo)} periodos)"
+        with engine_dw.begin() as connection:
+            for periodo, etiqueta in etiquetas.items():
+                connection.execute(
+                    text(f'UPDATE "{CATALOG_TABLE}" SET "Archivo" = :archivo, "Etiqueta" = :etiqueta WHERE "Periodo" = :periodo'),
+                    {"archivo": destino, "etiqueta": etiqueta, "periodo": periodo}
+                )
+        creados += 1
+        print(f"Compactación de '{FACT_TABLE}': {len(archivos)} archivos de {nombre} {accion}.")
+
+def needs_decoding(sql):
+    """
+    Indica si una consulta usa la dirección de destino en texto (y por lo tanto
+    necesita la vista que decodifica el diccionario).
+
+    Args:
+        sql (str): Consulta SQL sobre el modelo estrella
+
+    Returns:
+        bool: True si la consulta menciona la columna Direccion_Destino
+    """
+    return re.search(rf"\b{VALOR_DIRECCION}\b", sql) is not None
+
+def _select_particion(connection, alias, decodificar, etiquetas):
+    """
+    SELECT de un archivo de partición adjunto con las columnas de la vista,
+    limitado a las etiquetas indicadas si el archivo está compactado. Si se
+    decodifica, la dirección se obtiene del diccionario del archivo principal.
+    Las particiones escritas antes de la codificación (referenciadas por
+    instantáneas anteriores) guardan la dirección como texto y no tienen clave.
+    """
+    columnas = _columnas_archivo(connection, alias)
+    codificada = CLAVE_DIRECCION in columnas
+    expresiones = []
+    for c in (VIEW_COLUMNS if decodificar else FACT_COLUMNS):
+        if c == CLAVE_DIRECCION and not codificada:
+            expresiones.append(f'NULL AS "{c}"')
+        elif c == VALOR_DIRECCION and codificada:
+            expresiones.append(f'd."{c}"')
+        else:
+            expresiones.append(f'p."{c}"')
+    sql = f'SELECT {", ".join(expresiones)} FROM {alias}."{FACT_TABLE}" p'
+    if decodificar and codificada:
+        sql += f' LEFT JOIN main."{TABLA_DIRECCIONES}" d ON d."{CLAVE_DIRECCION}" = p."{CLAVE_DIRECCION}"'
+    return sql + _filtro_periodos(columnas, etiquetas)
+
+class ConexionDW(sqlite3.Connection):
+    """
+    Conexión devuelta por connect_dw. 'contexto' describe lo que expone su vista
+    de hechos (rango de Fecha_Key, decodificación y archivos/periodos adjuntos),
+    para que la caché de consultas distinga conexiones podadas o sin decodificar.
+    """
+    contexto = None
+
+def connect_dw(fecha_key_desde=None, fecha_key_hasta=None, read_only=True, decodificar=True, archivos=None):
+    """
+    Abre una conexión al DW y expone la tabla de hechos particionada como la vista
+    temporal 'Fact_Cambio_Estado_Servicio' (UNION ALL de los archivos de partición
+    adjuntos). Solo se adjuntan los archivos con periodos cuyo rango de Fecha_Key
+    se cruza con el rango pedido. La vista mantiene las columnas originales:
+    Direccion_Destino se decodifica desde Dim_Direccion_Destino, así las consultas
+    existentes no cambian. SQLite no descarta ese LEFT JOIN en consultas agregadas
+    aunque la columna no se use, así que las consultas que no necesitan la
+    dirección pueden pedir la vista sin decodificar (decodificar=False; ver needs_decoding).
+    Varias conexiones que deben ver la misma versión del DW reciben los archivos
+    que leyó la primera (contexto["archivos"]) en lugar de volver a leer el catálogo.
+
+    Args:
+        fecha_key_desde (int): Fecha_Key mínima de interés (None = sin límite)
+        fecha_key_hasta (int): Fecha_Key máxima de interés (None = sin límite)
+        read_only (bool): Abre el DW y las particiones en modo solo lectura
+        decodificar (bool): Incluye Direccion_Destino en texto (si es False solo su clave)
+        archivos (dict): Archivos de partición -> etiquetas ya resueltas (None = se leen del catálogo)
+
+    Returns:
+        ConexionDW: Conexión lista para consultar el modelo estrella
+
+    Raises:
+        RuntimeError: Si el rango necesita más archivos de los que SQLite puede
+            adjuntar (el catálogo no está compactado; ver compact_partitions)
+    """
+    modo = "?mode=ro" if read_only else ""
+    connection = sqlite3.connect(f"file:{db_connections.get_dw_path()}{modo}", uri=True,
+                                 check_same_thread=False, factory=ConexionDW)
+    try:
+        if archivos is None:
+            archivos = _archivos_rango(connection, fecha_key_desde, fecha_key_hasta)
+        connection.contexto = {
+            "fecha_key_desde": fecha_key_desde,
+            "fecha_key_hasta": fecha_key_hasta,
+            "decodificar": decodificar,
+            "archivos": archivos
+        }
+        columnas = ", ".join(f'"{c}"' for c in (VIEW_COLUMNS if decodificar else FACT_COLUMNS))
+        if not archivos:
+            connection.execute(f'CREATE TEMP TABLE "{FACT_TABLE}" ({columnas})')
+            return connection
+
+        limite = max_partition_files()
+        if len(archivos) > limite:
+            raise RuntimeError(
+                f"La consulta necesita {len(archivos)} archivos de partición y SQLite solo puede adjuntar {limite}. "
+                f"Compacte el catálogo con: python -m src.run_etl --compactar"
+            )
+        selects = []
+        for i, (archivo, etiquetas) in enumerate(archivos.items()):
+            alias = f"p{i}"
+            ruta = os.path.join(get_partitions_dir(), archivo)
+            connection.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{ruta}{modo}",))
+            selects.append(_select_particion(connection, alias, decodificar, etiquetas))
+        connection.execute(f'CREATE TEMP VIEW "{FACT_TABLE}" AS ' + " UNION ALL ".join(selects))
+        return connection
+    except Exception:
+        connection.close()
+        raise
+
+def _archivos_rango(connection, fecha_key_desde, fecha_key_hasta):
+    """
+    Archivos de partición (con las etiquetas de sus periodos) que cubren un rango de Fecha_Key.
+    """
+    tiene_catalogo = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CATALOG_TABLE,)
+    ).fetchone()
+    if not tiene_catalogo:
+        return {}
+    condiciones, parametros = [], []
+    if fecha_key_desde is not None:
+        condiciones.append('"Fecha_Key_Max" >= ?')
+        parametros.append(fecha_key_desde)
+    if fecha_key_hasta is not None:
+        condiciones.append('"Fecha_Key_Min" <= ?')
+        parametros.append(fecha_key_hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    archivos = {}
+    for etiqueta, archivo in connection.execute(
+        f'SELECT {catalog_label_sql(connection)}, "Archivo" FROM "{CATALOG_TABLE}" {where} ORDER BY "Periodo"', parametros
+    ):
+        archivos.setdefault(archivo, []).append(etiqueta)
+    return archivos
+
+def query_fact(sql, fecha_key_desde=None, fecha_key_hasta=None, params=None):
+    """
+    Ejecuta una consulta sobre el DW adjuntando solo las particiones del rango
+    de Fecha_Key indicado (poda de particiones). El diccionario de direcciones
+    solo se une si la consulta usa Direccion_Destino.
+
+    Args:
+        sql (str): Consulta SQL sobre el modelo estrella
+        fecha_key_desde (int): Fecha_Key mínima de interés
+        fecha_key_hasta (int): Fecha_Key máxima de interés
+        params (tuple|dict): Parámetros de la consulta
+
+    Returns:
+        pd.DataFrame: Resultado de la consulta
+    """
+    connection = connect_dw(fecha_key_desde, fecha_key_hasta, decodificar=needs_decoding(sql))
+    try:
+        return pd.read_sql_query(sql, connection, params=params)
+    finally:
+        connection.close()
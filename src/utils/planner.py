@@ -0,0 +1,300 @@
+import math
+import os
+from sqlalchemy import text
+
+# Valores usados cuando no hay plan (o no se pudieron leer estadísticas)
+LOTE_DIMENSIONES = 1000
+LOTE_HECHOS = 10000
+LOTE_MINIMO = 1000
+LOTE_MAXIMO = 100000
+
+# Bytes aproximados por fila en memoria durante la transformación (incluye las
+# copias intermedias de los merges con las dimensiones)
+BYTES_POR_FILA = 1500
+# Fracción de la memoria libre que el ETL se permite usar
+FRACCION_MEMORIA = 0.5
+# Filas por consulta de extracción antes de repartir un periodo en varias
+FILAS_POR_PARTICION_EXTRACCION = 250000
+# Límite de conexiones simultáneas al OLTP (tamaño del pool de SQLAlchemy + overflow)
+MAX_CONEXIONES_OLTP = 15
+
+PARAMETROS = ("lote", "particiones_extraccion", "workers")
+
+# Plan activo de la ejecución en curso: paso -> parámetros
+_plan_activo = {}
+
+def leer_estadisticas_oltp(engine_oltp, tablas):
+    """
+    Lee estadísticas baratas del OLTP: filas estimadas por el planificador de
+    PostgreSQL (pg_class.reltuples, sin recorrer las tablas) y, para la tabla de
+    eventos de estado, ids y fechas mínimas y máximas usando la clave primaria.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        tablas (list): Tablas calificadas (ej: 'public.cliente')
+
+    Returns:
+        dict: {'filas': {tabla: filas}, 'min_id', 'max_id', 'fecha_min', 'fecha_max'}
+    """
+    estadisticas = {"filas": {}}
+    with engine_oltp.connect() as connection:
+        for tabla in tablas:
+            filas = connection.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:tabla)"), {"tabla": tabla}
+            ).scalar()
+            # reltuples es -1 en tablas nunca analizadas
+            estadisticas["filas"][tabla] = max(int(filas or 0), 0)
+
+        extremos = connection.execute(text("""
+            SELECT
+                (SELECT id FROM public.mensajeria_estadosservicio ORDER BY id ASC LIMIT 1) AS min_id,
+                (SELECT id FROM public.mensajeria_estadosservicio ORDER BY id DESC LIMIT 1) AS max_id,
+                (SELECT fecha FROM public.mensajeria_estadosservicio ORDER BY id ASC LIMIT 1) AS fecha_min,
+                (SELECT fecha FROM public.mensajeria_estadosservicio ORDER BY id DESC LIMIT 1) AS fecha_max
+        """)).one()
+    estadisticas.update(extremos._asdict())
+    return estadisticas
+
+def leer_recursos():
+    """
+    Lee los recursos de la máquina: núcleos disponibles y memoria libre.
+
+    Returns:
+        dict: {'nucleos': int, 'memoria_libre': bytes o None si no se puede leer}
+    """
+    try:
+        nucleos = len(os.sched_getaffinity(0))
+    except AttributeError:
+        nucleos = os.cpu_count() or 1
+
+    memoria_libre = None
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for linea in f:
+                if linea.startswith("MemAvailable:"):
+                    memoria_libre = int(linea.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    if memoria_libre is None:
+        try:
+            memoria_libre = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            pass
+    return {"nucleos": nucleos, "memoria_libre": memoria_libre}
+
+def _meses_entre(fecha_min, fecha_max):
+    """
+    Número de periodos mensuales entre dos fechas (al menos 1).
+    """
+    if fecha_min is None or fecha_max is None:
+        return 1
+    return max(1, (fecha_max.year - fecha_min.year) * 12 + fecha_max.month - fecha_min.month + 1)
+
+def _acotar(valor, minimo, maximo):
+    """
+    Limita un valor al rango [minimo, maximo].
+    """
+    return max(minimo, min(maximo, valor))
+
+def planificar_paso(filas, periodos, recursos):
+    """
+    Calcula el plan de un paso a partir de su volumen y de los recursos.
+
+    - workers: periodos procesados en paralelo, limitados por núcleos, número de
+      periodos y memoria (cada worker mantiene un periodo completo en memoria).
+    - particiones_extraccion: consultas paralelas en que se reparte la extracción
+      de un periodo grande, sin superar los núcleos libres ni el pool del OLTP.
+    - lote: filas por lote de escritura en SQLite, según la memoria por worker.
+
+    Args:
+        filas (int): Filas estimadas del origen del paso
+        periodos (int): Periodos mensuales en que se procesa el paso (1 si no es particionado)
+        recursos (dict): Resultado de leer_recursos()
+
+    Returns:
+        dict: {'lote', 'particiones_extraccion', 'workers', 'excede_memoria'}
+    """
+    nucleos = recursos["nucleos"]
+    presupuesto = (recursos["memoria_libre"] or 2 * 1024 ** 3) * FRACCION_MEMORIA
+    filas_periodo = max(1, math.ceil(filas / periodos))
+    memoria_periodo = filas_periodo * BYTES_POR_FILA
+
+    workers = _acotar(int(presupuesto // memoria_periodo), 1, min(nucleos, periodos))
+    particiones = _acotar(
+        math.ceil(filas_periodo / FILAS_POR_PARTICION_EXTRACCION),
+        1, max(1, min(nucleos // workers, MAX_CONEXIONES_OLTP // workers))
+    )
+    lote = _acotar(int(presupuesto / workers / (BYTES_POR_FILA * 10)), LOTE_MINIMO, LOTE_MAXIMO)
+    lote = _acotar(min(lote, filas_periodo), LOTE_MINIMO, LOTE_MAXIMO)
+    return {
+        "lote": lote,
+        "particiones_extraccion": particiones,
+        "workers": workers,
+        "excede_memoria": memoria_periodo > presupuesto
+    }
+
+def plan_por_defecto(modulos):
+    """
+    Plan equivalente al comportamiento sin planificación (valores fijos, en serie).
+
+    Args:
+        modulos (dict): Paso -> módulo del paso
+
+    Returns:
+        dict: Paso -> parámetros
+    """
+    return {
+        paso: {
+            "tabla": getattr(modulo, "TABLA_DESTINO", None),
+            "filas": None,
+            "lote": LOTE_HECHOS if paso_es_hecho(paso) else LOTE_DIMENSIONES,
+            "particiones_extraccion": 1,
+            "workers": 1
+        }
+        for paso, modulo in modulos.items()
+    }
+
+def paso_es_hecho(paso):
+    """
+    Indica si un paso carga una tabla de hechos (por convención de nombre).
+    """
+    return "_fact_" in paso
+
+def tabla_volumen(modulo):
+    """
+    Tabla del OLTP que determina el volumen de un paso: TABLA_VOLUMEN si el paso
+    la define, o la primera tabla de su huella de origen.
+    """
+    if hasattr(modulo, "TABLA_VOLUMEN"):
+        return modulo.TABLA_VOLUMEN
+    fuentes = getattr(modulo, "FUENTES_FINGERPRINT", None)
+    return fuentes[0][0] if fuentes else None
+
+def parse_ajustes(ajustes):
+    """
+    Interpreta los ajustes manuales del plan.
+
+    Formatos: 'parametro=valor' (todos los pasos) o 'paso:parametro=valor'.
+
+    Args:
+        ajustes (list): Ajustes en texto
+
+    Returns:
+        list: Tuplas (paso o None, parametro, valor)
+    """
+    resultado = []
+    for ajuste in ajustes or []:
+        destino, _, valor = ajuste.partition("=")
+        paso, _, parametro = destino.rpartition(":")
+        if parametro not in PARAMETROS or not valor.isdigit() or int(valor) < 1:
+            raise ValueError(f"Ajuste de plan inválido: '{ajuste}' (parámetros: {', '.join(PARAMETROS)}; valor entero >= 1)")
+        resultado.append((paso or None, parametro, int(valor)))
+    return resultado
+
+def planificar_ejecucion(engine_oltp, modulos, ajustes=None):
+    """
+    Fase de planificación al inicio de una ejecución: combina las estadísticas del
+    OLTP y los recursos de la máquina en un plan por paso y aplica los ajustes
+    manuales. Si no se pueden leer las estadísticas se usa el plan por defecto.
+
+    Args:
+        engine_oltp (sqlalchemy.Engine): Motor de conexión al sistema OLTP
+        modulos (dict): Paso -> módulo del paso (en orden de ejecución)
+        ajustes (list): Ajustes manuales (ver parse_ajustes)
+
+    Returns:
+        tuple: (plan, recursos, estadisticas)
+    """
+    recursos = leer_recursos()
+    plan = plan_por_defecto(modulos)
+    estadisticas = None
+
+    tablas = sorted({t for t in (tabla_volumen(m) for m in modulos.values()) if t})
+    try:
+        estadisticas = leer_estadisticas_oltp(engine_oltp, tablas)
+    except Exception as e:
+        print(f"Advertencia: no se pudieron leer estadísticas del OLTP ({e}); se usa el plan por defecto.")
+
+    if estadisticas is not None:
+        meses = _meses_entre(estadisticas["fecha_min"], estadisticas["fecha_max"])
+        for paso, modulo in modulos.items():
+            tabla = tabla_volumen(modulo)
+            if tabla is None:
+                continue
+            filas = estadisticas["filas"].get(tabla, 0)
+            periodos = meses if getattr(modulo, "PARTICIONADO_POR_MES", False) else 1
+            plan[paso].update(planificar_paso(filas, periodos, recursos), filas=filas)
+            if not paso_es_hecho(paso):
+                # Dimensiones: carga en una sola escritura, sin paralelismo
+                plan[paso].update(particiones_extraccion=1, workers=1)
+
+    for paso, parametro, valor in parse_ajustes(ajustes):
+        for nombre in ([paso] if paso else plan):
+            if nombre not in plan:
+                raise ValueError(f"Ajuste de plan para un paso desconocido: '{nombre}'")
+            plan[nombre][parametro] = valor
+            plan[nombre]["ajustado"] = True
+    return plan, recursos, estadisticas
+
+def imprimir_plan(plan, recursos, estadisticas):
+    """
+    Imprime el plan de ejecución.
+    """
+    memoria = recursos["memoria_libre"]
+    print("Plan de ejecución:")
+    print(f"  Núcleos: {recursos['nucleos']} | Memoria libre: {'desconocida' if memoria is None else f'{memoria / 1024 ** 3:.1f} GB'}")
+    if estadisticas is not None:
+        print(f"  Eventos de estado: ids {estadisticas['min_id']}..{estadisticas['max_id']} | "
+              f"fechas {estadisticas['fecha_min']}..{estadisticas['fecha_max']}")
+    print(f"  {'Paso':<34}{'Filas est.':>12}{'Lote':>9}{'Part.':>7}{'Workers':>9}")
+    for paso, p in plan.items():
+        filas = "-" if p["filas"] is None else f"{p['filas']:,}"
+        marca = " (ajustado)" if p.get("ajustado") else ""
+        print(f"  {paso:<34}{filas:>12}{p['lote']:>9}{p['particiones_extraccion']:>7}{p['workers']:>9}{marca}")
+    for paso, p in plan.items():
+        if p.get("excede_memoria"):
+            print(f"  Advertencia: un periodo de {paso} podría no caber en la memoria disponible.")
+    print()
+
+def set_active_plan(plan):
+    """
+    Fija el plan de la ejecución en curso (lo consultan los pasos).
+    """
+    global _plan_activo
+    _plan_activo = plan or {}
+
+def get_step_plan(paso):
+    """
+    Parámetros del plan activo para un paso. Sin plan (por ejemplo al ejecutar
+    un paso suelto) retorna los valores por defecto.
+
+    Args:
+        paso (str): Nombre del paso (ej: '10_fact_cambio_estado_servicio')
+
+    Returns:
+        dict: {'lote', 'particiones_extraccion', 'workers', ...}
+    """
+    if paso in _plan_activo:
+        return _plan_activo[paso]
+    return {
+        "lote": LOTE_HECHOS if paso_es_hecho(paso) else LOTE_DIMENSIONES,
+        "particiones_extraccion": 1,
+        "workers": 1
+    }
+
+def get_batch_size(tabla, defecto=LOTE_DIMENSIONES):
+    """
+    Tamaño de lote del plan activo para el paso que carga una tabla.
+
+    Args:
+        tabla (str): Tabla destino
+        defecto (int): Valor si ningún paso del plan carga la tabla
+
+    Returns:
+        int: Filas por lote
+    """
+    for parametros in _plan_activo.values():
+        if parametros.get("tabla") == tabla:
+            return parametros["lote"]
+    return defecto
@@ -0,0 +1,246 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Prefijos de las funciones de cada fase en los módulos de los pasos
+FASES = {
+    "extract_": "extract",
+    "transform_": "transform",
+    "generar_": "transform",
+    "load_": "load",
+    "cargar_": "load"
+}
+
+# Segundos entre muestras de pilas (todas las hebras, incluidos los workers de los pasos)
+INTERVALO_MUESTREO = 0.005
+# Líneas que más memoria asignan incluidas en el reporte
+TOP_ASIGNACIONES = 15
+# Funciones por tiempo acumulado incluidas en el reporte
+TOP_FUNCIONES = 30
+
+# Raíz del repositorio: las pilas sin ningún marco propio (hebras inactivas) se descartan
+_RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_local = threading.local()
+
+def _ruta_corta(archivo):
+    """
+    Ruta legible de un archivo fuente para las etiquetas de la pila.
+    """
+    if archivo.startswith(_RAIZ):
+        return os.path.relpath(archivo, _RAIZ)
+    if "site-packages" + os.sep in archivo:
+        return archivo.split("site-packages" + os.sep, 1)[1]
+    parte = archivo.split(os.sep + "lib" + os.sep + "python", 1)
+    return parte[1].split(os.sep, 1)[-1] if len(parte) == 2 else os.path.basename(archivo)
+
+class MuestreadorPilas:
+    """
+    Profiler de muestreo: una hebra aparte toma cada 'intervalo' segundos la pila
+    de todas las hebras del proceso y cuenta las pilas colapsadas
+    ('hebra;marco;marco;... N'), el formato de entrada de flamegraph.pl y speedscope.
+    A diferencia de cProfile, ve también el trabajo de los workers de los pasos.
+    """
+
+    def __init__(self, intervalo=INTERVALO_MUESTREO):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, marco in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila, propia = [], False
+                while marco is not None:
+                    codigo = marco.f_code
+                    propia = propia or codigo.co_filename.startswith(_RAIZ)
+                    pila.append(f"{codigo.co_name} ({_ruta_corta(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    marco = marco.f_back
+                if propia:
+                    pila.append(nombres.get(ident, f"hebra-{ident}"))
+                    self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._muestrear, name="muestreador-perfil", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def escribir(self, ruta):
+        """
+        Escribe las pilas colapsadas (una por línea, con su número de muestras).
+        """
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, muestras in self.pilas.most_common():
+                f.write(f"{pila} {muestras}\n")
+
+class PerfilPaso:
+    """
+    Perfil de un paso: tiempo por fase (extract/transform/load), perfil
+    determinista de la hebra principal (cProfile), muestreo de pilas de todas las
+    hebras y asignaciones de memoria (tracemalloc, solo las líneas principales).
+    """
+
+    def __init__(self, paso, directorio):
+        self.paso = paso
+        self.directorio = directorio
+        self.fases = {}
+        self._lock = threading.Lock()
+        self._instantanea = None
+        self._memoria_instantanea = 0
+        self._profiler = cProfile.Profile()
+        self._muestreador = MuestreadorPilas()
+
+    def _registrar(self, funcion, fase, segundos):
+        with self._lock:
+            datos = self.fases.setdefault(funcion, {"fase": fase, "llamadas": 0, "segundos": 0.0})
+            datos["llamadas"] += 1
+            datos["segundos"] += segundos
+            # Instantánea al final de la fase con más memoria viva (su resultado aún existe)
+            actual = tracemalloc.get_traced_memory()[0]
+            if actual > self._memoria_instantanea:
+                self._memoria_instantanea = actual
+                self._instantanea = tracemalloc.take_snapshot()
+
+    def envolver(self, nombre, fase, funcion):
+        """
+        Envuelve una función de fase para medir su duración. Las llamadas anidadas
+        a otras funciones de fase (ej: extract_query dentro de un extract_) se
+        cuentan solo en la externa.
+        """
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if getattr(_local, "en_fase", False):
+                return funcion(*args, **kwargs)
+            _local.en_fase = True
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                _local.en_fase = False
+                self._registrar(nombre, fase, time.perf_counter() - inicio)
+        return envoltura
+
+    def iniciar(self):
+        tracemalloc.start()
+        self._muestreador.iniciar()
+        self._profiler.enable()
+
+    def detener(self):
+        self._profiler.disable()
+        self._muestreador.detener()
+        if self._instantanea is None:
+            self._instantanea = tracemalloc.take_snapshot()
+        self.memoria_pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def escribir(self, duracion):
+        """
+        Escribe los archivos del perfil en el directorio de la ejecución:
+        <paso>.prof (pstats, para snakeviz), <paso>.folded (pilas colapsadas, para
+        flamegraph.pl o speedscope) y <paso>.txt (resumen legible).
+
+        Returns:
+            dict: Resumen del perfil (duración, fases, memoria pico y archivos)
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        base = os.path.join(self.directorio, self.paso)
+        self._profiler.dump_stats(f"{base}.prof")
+        self._muestreador.escribir(f"{base}.folded")
+
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        asignaciones = self._instantanea.filter_traces(filtros).statistics("lineno")[:TOP_ASIGNACIONES]
+
+        salida = io.StringIO()
+        pstats.Stats(self._profiler, stream=salida).sort_stats("cumulative").print_stats(TOP_FUNCIONES)
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"Paso: {self.paso}\nDuración: {duracion:.3f} s\n")
+            f.write(f"Memoria pico (tracemalloc): {self.memoria_pico / 1024 ** 2:.1f} MB\n")
+            f.write(f"Muestras de pilas: {self._muestreador.muestras} (cada {INTERVALO_MUESTREO * 1000:.0f} ms)\n\n")
+            f.write("Fases (suma sobre hebras):\n")
+            for funcion, datos in sorted(self.fases.items(), key=lambda x: -x[1]["segundos"]):
+                f.write(f"  {datos['fase']:<10}{funcion:<40}{datos['llamadas']:>6} llamadas {datos['segundos']:>10.3f} s\n")
+            f.write(f"\nLíneas que más memoria asignan (instantánea de {self._memoria_instantanea / 1024 ** 2:.1f} MB):\n")
+            for estadistica in asignaciones:
+                marco = estadistica.traceback[0]
+                f.write(f"  {estadistica.size / 1024 ** 2:>9.2f} MB {estadistica.count:>9} bloques  "
+                        f"{_ruta_corta(marco.filename)}:{marco.lineno}\n")
+            f.write("\ncProfile (hebra principal, por tiempo acumulado):\n")
+            f.write(salida.getvalue())
+
+        return {
+            "duracion": round(duracion, 3),
+            "memoria_pico": self.memoria_pico,
+            "fases": {
+                fase: round(sum(d["segundos"] for d in self.fases.values() if d["fase"] == fase), 3)
+                for fase in sorted(set(FASES.values()))
+            },
+            "archivos": [f"{self.paso}.prof", f"{self.paso}.folded", f"{self.paso}.txt"]
+        }
+
+@contextmanager
+def perfilar_paso(module, paso, directorio):
+    """
+    Perfila la ejecución de un paso. Mientras dura, las funciones de fase del
+    módulo (extract_*, transform_*/generar_*, load_*/cargar_*) se reemplazan por
+    versiones medidas y se restauran al salir. Los archivos se escriben aunque el
+    paso falle. Sin este contexto no hay ninguna instrumentación.
+
+    Args:
+        module (module): Módulo del paso ETL
+        paso (str): Nombre del paso
+        directorio (str): Directorio de la ejecución donde se escriben los perfiles
+
+    Yields:
+        dict: Se completa al salir con el resumen del perfil
+    """
+    perfil = PerfilPaso(paso, directorio)
+    originales = {}
+    for nombre, funcion in list(vars(module).items()):
+        fase = next((f for prefijo, f in FASES.items() if nombre.startswith(prefijo)), None)
+        if fase is not None and inspect.isfunction(funcion):
+            originales[nombre] = funcion
+            setattr(module, nombre, perfil.envolver(nombre, fase, funcion))
+
+    resumen = {}
+    inicio = time.perf_counter()
+    perfil.iniciar()
+    try:
+        yield resumen
+    finally:
+        perfil.detener()
+        for nombre, funcion in originales.items():
+            setattr(module, nombre, funcion)
+        resumen.update(perfil.escribir(time.perf_counter() - inicio))
+        print(f"Perfil de {paso} escrito en '{directorio}'.")
+
+def escribir_resumen(directorio, perfiles):
+    """
+    Escribe el resumen de los perfiles de la ejecución (perfiles.json).
+
+    Args:
+        directorio (str): Directorio de la ejecución
+        perfiles (dict): Paso -> resumen del perfil
+    """
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, "perfiles.json"), "w", encoding="utf-8") as f:
+        json.dump(perfiles, f, indent=1)
@@ -0,0 +1,371 @@
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from . import db_connections
+from .file_locks import lock_file, unlock_file
+from .partitions import CATALOG_TABLE, get_partitions_dir, count_partition_rows, catalog_label_sql, purge_compacted
+
+# Número de versiones anteriores del DW que se conservan para rollback
+RETENCION_SNAPSHOTS = 3
+
+# Antigüedad mínima (segundos) de un archivo de partición sin referencias para
+# eliminarlo: una carga o backfill en curso escribe el archivo antes de registrarlo
+GRACIA_PARTICIONES = 24 * 3600
+
+# Archivo de bloqueo del staging abierto mientras este proceso lo usa (ver prepare_staging)
+_bloqueo_staging = None
+
+# Tablas que deben existir y tener filas para publicar una carga
+TABLAS_REQUERIDAS = [
+    "Dim_Fecha", "Dim_Hora", "Dim_Cliente", "Dim_Geografia", "Dim_Sede",
+    "Dim_Mensajero", "Dim_Urgencia_Servicio", "Dim_Estado_Servicio", "Dim_Novedad"
+]
+
+def get_staging_path():
+    """
+    Ruta del archivo de staging: junto al DW publicado (mismo sistema de archivos,
+    requisito para que el rename sea atómico).
+    """
+    base, extension = os.path.splitext(db_connections.DW_PATH)
+    return f"{base}_staging{extension}"
+
+def get_staging_lock_path():
+    """
+    Archivo de bloqueo del staging: lo tiene el proceso que va de prepare_staging
+    a promote_staging (o discard_staging).
+    """
+    return f"{get_staging_path()}.lock"
+
+def get_snapshots_dir():
+    """
+    Directorio donde se guardan las versiones anteriores del DW.
+    """
+    return f"{os.path.splitext(db_connections.DW_PATH)[0]}_snapshots"
+
+def list_snapshots():
+    """
+    Lista las instantáneas retenidas, de la más reciente a la más antigua.
+
+    Returns:
+        list: Rutas de las instantáneas
+    """
+    directorio = get_snapshots_dir()
+    if not os.path.isdir(directorio):
+        return []
+    archivos = [os.path.join(directorio, f) for f in os.listdir(directorio) if f.endswith(".db")]
+    return sorted(archivos, reverse=True)
+
+def _copiar_db(origen, destino):
+    """
+    Copia consistente de una base SQLite con la API de backup (los lectores y
+    escritores de la base de origen no se bloquean durante la copia).
+    """
+    fuente = sqlite3.connect(f"file:{origen}?mode=ro", uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
+
+def _limpiar_archivo(ruta):
+    """
+    Borra un archivo SQLite junto con sus archivos de WAL y journal.
+    """
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+def _tomar_bloqueo_staging():
+    """
+    Toma el bloqueo exclusivo del staging sin esperar. Si este proceso ya lo
+    tiene (un staging anterior sin promover ni descartar) lo conserva.
+    """
+    global _bloqueo_staging
+    if _bloqueo_staging is not None:
+        return
+    f = open(get_staging_lock_path(), "a+b")
+    try:
+        lock_file(f, esperar=False)
+    except OSError:
+        f.close()
+        raise RuntimeError(
+            f"Otro proceso está cargando el DW (staging bloqueado en '{get_staging_lock_path()}'). "
+            f"Reintente cuando termine."
+        )
+    _bloqueo_staging = f
+
+def _liberar_bloqueo_staging():
+    global _bloqueo_staging
+    if _bloqueo_staging is not None:
+        unlock_file(_bloqueo_staging)
+        _bloqueo_staging.close()
+        _bloqueo_staging = None
+
+def _limpiar_staging():
+    staging = get_staging_path()
+    db_connections.dispose_engines(f"sqlite:///{staging}")
+    db_connections.set_staging_path(None)
+    _limpiar_archivo(staging)
+
+def prepare_staging():
+    """
+    Crea el archivo de staging a partir del DW publicado (API de backup), lo pone
+    en modo WAL y redirige las escrituras del proceso hacia él. Los lectores siguen
+    usando el DW publicado sin ver cargas parciales ni bloqueos de escritura. El
+    staging es uno solo por DW: el proceso toma su bloqueo exclusivo hasta
+    promoverlo o descartarlo, y falla de inmediato si otro proceso lo tiene.
+
+    Returns:
+        str: Ruta del archivo de staging
+
+    Raises:
+        RuntimeError: Si otro proceso tiene el staging
+    """
+    staging = get_staging_path()
+    _tomar_bloqueo_staging()
+    try:
+        _limpiar_staging()
+        if os.path.exists(db_connections.DW_PATH):
+            _copiar_db(db_connections.DW_PATH, staging)
+        connection = sqlite3.connect(staging)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+        finally:
+            connection.close()
+    except Exception:
+        discard_staging()
+        raise
+    db_connections.set_staging_path(staging)
+    print(f"Staging preparado en '{staging}' (el DW publicado no se modifica hasta la promoción).")
+    return staging
+
+def discard_staging():
+    """
+    Descarta el staging de este proceso (ejecución fallida) y libera su bloqueo;
+    el proceso vuelve a apuntar al DW publicado. Las particiones escritas solo
+    para el staging se eliminan en la siguiente recolección. Si el proceso no
+    tiene el bloqueo, el staging es de otra carga y no se toca.
+    """
+    if _bloqueo_staging is None:
+        db_connections.set_staging_path(None)
+        return
+    _limpiar_staging()
+    _liberar_bloqueo_staging()
+
+def validate_staging(staging):
+    """
+    Valida el staging antes de publicarlo: integridad de SQLite, tablas requeridas
+    con filas y, para cada partición del catálogo, que su archivo exista y tenga
+    el número de filas registrado.
+
+    Args:
+        staging (str): Ruta del archivo de staging
+
+    Returns:
+        list: Problemas encontrados (vacía si el staging es válido)
+    """
+    problemas = []
+    connection = sqlite3.connect(f"file:{staging}?mode=ro", uri=True)
+    try:
+        resultado = connection.execute("PRAGMA quick_check").fetchone()[0]
+        if resultado != "ok":
+            problemas.append(f"quick_check: {resultado}")
+
+        tablas = {fila[0] for fila in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for tabla in TABLAS_REQUERIDAS:
+            if tabla not in tablas:
+                problemas.append(f"falta la tabla {tabla}")
+            elif connection.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0] == 0:
+                problemas.append(f"la tabla {tabla} está vacía")
+
+        if CATALOG_TABLE in tablas:
+            for periodo, archivo, filas, etiqueta in connection.execute(
+                f'SELECT "Periodo", "Archivo", "Filas", {catalog_label_sql(connection)} FROM "{CATALOG_TABLE}"'
+            ).fetchall():
+                ruta = os.path.join(get_partitions_dir(), archivo)
+                if not os.path.exists(ruta):
+                    problemas.append(f"falta el archivo de la partición {periodo}")
+                    continue
+                filas_archivo = count_partition_rows(archivo, etiqueta)
+                if filas_archivo != filas:
+                    problemas.append(f"la partición {periodo} tiene {filas_archivo} filas y el catálogo registra {filas}")
+    finally:
+        connection.close()
+    return problemas
+
+def _publicar(origen, mover):
+    """
+    Publica un archivo como DW: la versión publicada actual se conserva como
+    instantánea (enlace duro, o copia si no es posible) y el nuevo archivo la
+    reemplaza con un rename atómico. Los lectores con conexiones abiertas siguen
+    leyendo la versión anterior hasta que se reconecten.
+    """
+    dw = db_connections.DW_PATH
+    if os.path.exists(dw):
+        os.makedirs(get_snapshots_dir(), exist_ok=True)
+        base = os.path.splitext(os.path.basename(dw))[0]
+        snapshot = os.path.join(get_snapshots_dir(), f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db")
+        try:
+            os.link(dw, snapshot)
+        except OSError:
+            shutil.copy2(dw, snapshot)
+
+    if mover:
+        os.replace(origen, dw)
+    else:
+        temporal = f"{dw}.promocion"
+        shutil.copy2(origen, temporal)
+        os.replace(temporal, dw)
+
+def promote_staging(staging, retencion=RETENCION_SNAPSHOTS):
+    """
+    Valida y publica el staging. Antes del rename se cierran las conexiones del
+    proceso al staging y se consolida el WAL para que el archivo sea autocontenido.
+
+    Args:
+        staging (str): Ruta del archivo de staging
+        retencion (int): Instantáneas anteriores a conservar
+
+    Raises:
+        RuntimeError: Si la validación falla (el DW publicado no se modifica)
+    """
+    db_connections.dispose_engines(f"sqlite:///{staging}")
+    connection = sqlite3.connect(staging)
+    try:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        connection.close()
+
+    problemas = validate_staging(staging)
+    if problemas:
+        raise RuntimeError("Validación del staging fallida: " + "; ".join(problemas))
+
+    _publicar(staging, mover=True)
+    db_connections.set_staging_path(None)
+    _liberar_bloqueo_staging()
+    print(f"DW publicado en '{db_connections.DW_PATH}' (rename atómico).")
+    prune_snapshots(retencion)
+
+def prune_snapshots(retencion=RETENCION_SNAPSHOTS):
+    """
+    Conserva solo las 'retencion' instantáneas más recientes y elimina los archivos
+    de partición que ya no referencia ninguna versión retenida.
+
+    Args:
+        retencion (int): Instantáneas a conservar
+    """
+    liberados = set()
+    for snapshot in list_snapshots()[retencion:]:
+        liberados |= _archivos_referenciados(snapshot)
+        os.remove(snapshot)
+    collect_partitions(liberados)
+
+def _referencias(ruta):
+    """
+    Archivos de partición referenciados por el catálogo de una versión del DW,
+    con las etiquetas de periodo que esa versión lee de cada uno.
+    """
+    connection = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    try:
+        existe = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CATALOG_TABLE,)
+        ).fetchone()
+        if not existe:
+            return {}
+        referencias = {}
+        for archivo, etiqueta in connection.execute(f'SELECT "Archivo", {catalog_label_sql(connection)} FROM "{CATALOG_TABLE}"'):
+            referencias.setdefault(archivo, set()).add(etiqueta)
+        return referencias
+    finally:
+        connection.close()
+
+def _archivos_referenciados(ruta):
+    """
+    Archivos de partición referenciados por el catálogo de una versión del DW.
+    """
+    return set(_referencias(ruta))
+
+def etiquetas_en_uso():
+    """
+    Etiquetas de periodo que el DW publicado, el staging en curso o alguna
+    instantánea retenida leen de cada archivo de partición.
+
+    Returns:
+        dict: Archivo -> etiquetas referenciadas
+    """
+    en_uso = {}
+    for ruta in [db_connections.DW_PATH, get_staging_path()] + list_snapshots():
+        if os.path.exists(ruta):
+            for archivo, etiquetas in _referencias(ruta).items():
+                en_uso.setdefault(archivo, set()).update(etiquetas)
+    return en_uso
+
+def collect_partitions(liberados=(), gracia=GRACIA_PARTICIONES):
+    """
+    Elimina los archivos de partición que no referencia el DW publicado, el
+    staging en curso ni ninguna instantánea retenida, siempre que los
+    referenciara una instantánea descartada o que sean más antiguos que el
+    periodo de gracia (un archivo reciente sin referencias puede ser de una carga
+    en curso). Nunca elimina temporales (.tmp) ni archivos auxiliares de SQLite.
+    En los archivos compactados que siguen referenciados borra las versiones de
+    periodos (etiquetas) que ya nadie lee, con el mismo periodo de gracia.
+
+    Args:
+        liberados (set): Archivos referenciados por las instantáneas descartadas
+        gracia (int): Antigüedad mínima en segundos de los demás archivos sin referencias
+
+    Returns:
+        int: Archivos eliminados
+    """
+    directorio = get_partitions_dir()
+    if not os.path.isdir(directorio):
+        return 0
+    en_uso = etiquetas_en_uso()
+    referenciados = set(en_uso)
+
+    eliminados = 0
+    limite = time.time() - gracia
+    for archivo in os.listdir(directorio):
+        if not archivo.endswith(".db") or archivo in referenciados:
+            continue
+        ruta = os.path.join(directorio, archivo)
+        if archivo in liberados or os.path.getmtime(ruta) < limite:
+            os.remove(ruta)
+            eliminados += 1
+    if eliminados:
+        print(f"Se eliminaron {eliminados} archivos de partición sin referencias.")
+
+    filas = 0
+    for archivo, etiquetas in en_uso.items():
+        if os.path.exists(os.path.join(directorio, archivo)):
+            filas += purge_compacted(archivo, etiquetas, gracia)
+    if filas:
+        print(f"Se borraron {filas} filas de versiones anteriores en archivos compactados.")
+    return eliminados
+
+def rollback(snapshot=None):
+    """
+    Vuelve a publicar una instantánea anterior (por defecto la más reciente). La
+    versión publicada actual se conserva a su vez como instantánea.
+
+    Args:
+        snapshot (str): Nombre o ruta de la instantánea
+
+    Raises:
+        FileNotFoundError: Si no hay instantáneas o no existe la indicada
+    """
+    disponibles = list_snapshots()
+    if not disponibles:
+        raise FileNotFoundError("No hay instantáneas del DW para hacer rollback.")
+    if snapshot is None:
+        ruta = disponibles[0]
+    else:
+        ruta = snapshot if os.path.exists(snapshot) else os.path.join(get_snapshots_dir(), snapshot)
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe la instantánea '{snapshot}'.")
+    _publicar(ruta, mover=False)
+    print(f"Rollback: DW publicado desde la instantánea '{os.path.basename(ruta)}'.")
@@ -0,0 +1,60 @@
+import importlib
+import pandas as pd
+import pytest
+from src import backfill, benchmarks
+from src.utils import db_connections
+from src.utils.partitions import compact_partitions, list_partitions, query_fact
+
+paso = importlib.import_module(".etl.10_fact_cambio_estado_servicio", package="src")
+
+DESDE, HASTA = "2023-02", "2023-04"
+
+@pytest.fixture
+def dw(tmp_path, monkeypatch):
+    """
+    DW temporal con las dimensiones sintéticas de benchmarks y un OLTP simulado
+    con la extracción sintética (los workers del pool heredan los reemplazos).
+    """
+    df_oltp = benchmarks.extraccion_sintetica(3000, seed=4)
+    periodos = pd.to_datetime(df_oltp["fecha"].astype(object)).dt.strftime("%Y-%m")
+
+    def extraer(engine_oltp, periodo=None, backend=None, particiones=1):
+        return df_oltp[periodos == periodo].reset_index(drop=True)
+
+    monkeypatch.setattr(paso, "extract_cambios_estado_oltp", extraer)
+    monkeypatch.setattr(paso, "get_fingerprints_periodos",
+                        lambda engine_oltp, engine_dw: {p: f"huella {p}" for p in periodos.dropna().unique()})
+    monkeypatch.setattr(backfill, "get_oltp_engine", lambda: None)
+
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        benchmarks._dimensiones_sinteticas(db_connections.get_dw_engine())
+        yield df_oltp[periodos.between(DESDE, HASTA)]
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _filas_dw():
+    return int(query_fact('SELECT COUNT(*) AS n FROM "Fact_Cambio_Estado_Servicio"')["n"].iloc[0])
+
+def test_backfill_igual_a_la_carga_serial(dw):
+    resultado = backfill.main(DESDE, HASTA, workers=2, verificar=True)
+
+    assert sorted(resultado["cargadas"]) == backfill.ventanas_mensuales(DESDE, HASTA)
+    assert resultado["fallidas"] == {}
+    assert resultado["diferencias"] == []
+    assert _filas_dw() == len(dw)
+
+def test_backfill_sobre_un_anio_compactado(dw):
+    backfill.main(DESDE, HASTA, workers=2)
+    engine_dw = db_connections.get_dw_engine()
+    compact_partitions(engine_dw, limite=1)
+    archivos = list_partitions(engine_dw)["Archivo"].unique().tolist()
+
+    resultado = backfill.main("2023-03", "2023-03", workers=1, verificar=True)
+
+    assert resultado["diferencias"] == []
+    assert list_partitions(engine_dw)["Archivo"].unique().tolist() == archivos
+    assert _filas_dw() == len(dw)
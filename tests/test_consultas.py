@@ -0,0 +1,60 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from src import benchmarks
+from src.analysis import reporte
+from src.analysis.consultas import CONSULTAS, conectar, consultar
+from src.analysis.query_cache import QueryCache
+from src.utils import db_connections
+from src.utils.dictionaries import encode_values
+from src.utils.etl_runs import new_run_id, record_run
+from src.utils.partitions import CLAVE_DIRECCION, VALOR_DIRECCION, write_partition
+
+@pytest.fixture(scope="module")
+def dw(tmp_path_factory):
+    """
+    DW temporal con las dimensiones sintéticas de benchmarks, dos meses de la
+    tabla de hechos y una ejecución registrada (versión de carga para la caché).
+    """
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path_factory.mktemp("dw") / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        engine_dw = db_connections.get_dw_engine()
+        benchmarks._dimensiones_sinteticas(engine_dw)
+        df = benchmarks.hechos_sinteticos(500, meses=2, seed=5)
+        df_fecha = pd.read_sql('SELECT "Fecha_Key", "Fecha_Completa" FROM "Dim_Fecha"', engine_dw)
+        claves = dict(zip(pd.to_datetime(df_fecha["Fecha_Completa"]), df_fecha["Fecha_Key"]))
+        df["Fecha_Key"] = df["Timestamp_Estado"].dt.normalize().map(claves)
+        for periodo, df_periodo in df.groupby(df["Timestamp_Estado"].dt.strftime("%Y-%m")):
+            df_periodo = df_periodo.assign(**{CLAVE_DIRECCION: encode_values(df_periodo[VALOR_DIRECCION], engine_dw)})
+            write_partition(df_periodo, periodo, engine_dw)
+        record_run(engine_dw, new_run_id(), datetime.now(), ["10_fact_cambio_estado_servicio"], [])
+        yield db_connections.DW_PATH
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def test_notebook_y_reporte_comparten_contexto(dw):
+    _, conexiones = reporte._abrir_conexiones()
+    try:
+        for clave in CONSULTAS:
+            connection = conectar(clave)
+            try:
+                assert connection.contexto == conexiones[clave].contexto
+            finally:
+                connection.close()
+    finally:
+        reporte._cerrar_conexiones(conexiones)
+
+def test_reporte_reutiliza_la_consulta_del_notebook(dw, tmp_path):
+    cache = QueryCache(directorio=str(tmp_path / "cache"))
+    esperado = consultar("p1", cache=cache)
+
+    _, conexiones = reporte._abrir_conexiones()
+    try:
+        df, _ = reporte._ejecutar_consulta("p1", conexiones["p1"], cache)
+    finally:
+        reporte._cerrar_conexiones(conexiones)
+    assert cache.stats()["hits"] == 1
+    pd.testing.assert_frame_equal(df, esperado)
@@ -0,0 +1,41 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from src.utils.dim_cache import read_dimension, invalidate_dimension, retag_dimensions
+from src.utils.etl_runs import new_run_id, record_run, get_engine_load_version
+
+@pytest.fixture
+def engine_dw(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'DW_FastAndSafe.db'}")
+    pd.DataFrame({"Cliente_Key": [1, 2], "Cliente_ID_Operacional": [10, 20]}).to_sql("Dim_Cliente", engine, index=False)
+    record_run(engine, new_run_id(), datetime.now(), ["03_dim_cliente"], [])
+    yield engine
+    invalidate_dimension()
+    engine.dispose()
+
+def _agregar_cliente(engine_dw):
+    with engine_dw.begin() as connection:
+        connection.execute(text('INSERT INTO "Dim_Cliente" VALUES (3, 30)'))
+
+def test_lookup_se_relee_si_cambia_la_version(engine_dw):
+    columnas = ["Cliente_Key", "Cliente_ID_Operacional"]
+    assert len(read_dimension(engine_dw, "Dim_Cliente", columnas)) == 2
+
+    # Otro proceso recarga la dimensión sin pasar por invalidate_dimension
+    _agregar_cliente(engine_dw)
+    assert len(read_dimension(engine_dw, "Dim_Cliente", columnas)) == 2
+    record_run(engine_dw, new_run_id(), datetime.now(), ["03_dim_cliente"], [])
+    assert len(read_dimension(engine_dw, "Dim_Cliente", columnas)) == 3
+
+def test_retag_conserva_los_lookups_propios(engine_dw):
+    columnas = ["Cliente_Key", "Cliente_ID_Operacional"]
+    read_dimension(engine_dw, "Dim_Cliente", columnas)
+    _agregar_cliente(engine_dw)
+
+    anterior = get_engine_load_version(engine_dw)
+    record_run(engine_dw, new_run_id(), datetime.now(), ["12_fact_novedad_servicio"], [])
+    retag_dimensions(engine_dw, anterior, get_engine_load_version(engine_dw))
+
+    # La versión nueva la registró este proceso: el lookup se sirve desde memoria
+    assert len(read_dimension(engine_dw, "Dim_Cliente", columnas)) == 2
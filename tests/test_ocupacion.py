@@ -0,0 +1,115 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+from src import benchmarks
+from src.analysis.ocupacion import calcular_segmentos, ocupacion_por_hora, ocupacion_por_minuto
+from src.utils import db_connections
+from src.utils.dictionaries import encode_values
+from src.utils.partitions import CLAVE_DIRECCION, VALOR_DIRECCION, write_partition
+
+paso = importlib.import_module(".etl.11_fact_ocupacion_mensajero", package="src")
+
+# Estados 1 a 5 por servicio: los que no llegan al 5 (terminal) quedan abiertos
+SERVICIOS = 3000
+ORDEN_TERMINAL = 5
+
+@pytest.fixture(scope="module")
+def hechos(tmp_path_factory):
+    """
+    DW temporal con las dimensiones sintéticas de benchmarks y tres meses de la
+    tabla de hechos sintética, con Fecha_Key resuelta contra Dim_Fecha.
+    """
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path_factory.mktemp("dw") / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        engine_dw = db_connections.get_dw_engine()
+        benchmarks._dimensiones_sinteticas(engine_dw)
+        df = benchmarks.hechos_sinteticos(SERVICIOS, meses=3, seed=3)
+        df_fecha = pd.read_sql('SELECT "Fecha_Key", "Fecha_Completa" FROM "Dim_Fecha"', engine_dw)
+        claves = dict(zip(pd.to_datetime(df_fecha["Fecha_Completa"]), df_fecha["Fecha_Key"]))
+        df["Fecha_Key"] = df["Timestamp_Estado"].dt.normalize().map(claves)
+        for periodo, df_periodo in df.groupby(df["Timestamp_Estado"].dt.strftime("%Y-%m")):
+            df_periodo = df_periodo.assign(**{CLAVE_DIRECCION: encode_values(df_periodo[VALOR_DIRECCION], engine_dw)})
+            write_partition(df_periodo, periodo, engine_dw)
+        yield df
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _intervalos_esperados(df):
+    """
+    Intervalos calculados servicio por servicio, sin SQL.
+    """
+    corte = df["Timestamp_Estado"].max()
+    filas = []
+    for _, estados in df.groupby("Servicio_ID_Operacional"):
+        asignado = estados.loc[estados["Estado_Servicio_Key"] >= paso.ORDEN_ESTADO_ASIGNADO, "Timestamp_Estado"]
+        if asignado.empty:
+            continue
+        inicio = asignado.min()
+        terminal = estados.loc[estados["Estado_Servicio_Key"] == ORDEN_TERMINAL, "Timestamp_Estado"]
+        fin = terminal.min() if not terminal.empty else min(corte, inicio + paso.DURACION_MAXIMA_ABIERTO)
+        filas.append((estados["Mensajero_Key"].max(), inicio, fin))
+    return pd.DataFrame(filas, columns=["Mensajero_Key", "Inicio", "Fin"])
+
+def _ordenar(df):
+    return df.sort_values(["Inicio", "Mensajero_Key", "Fin"]).reset_index(drop=True)
+
+def test_intervalos_abiertos_acotados(hechos):
+    obtenido = paso.extract_intervalos_dw()
+    esperado = _intervalos_esperados(hechos)
+
+    pd.testing.assert_frame_equal(_ordenar(esperado), _ordenar(obtenido), check_dtype=False)
+    # Los abiertos terminan a DURACION_MAXIMA_ABIERTO de la asignación, no en el corte
+    duracion = obtenido["Fin"] - obtenido["Inicio"]
+    assert (duracion == paso.DURACION_MAXIMA_ABIERTO).any()
+    assert (duracion <= paso.DURACION_MAXIMA_ABIERTO).all()
+
+@pytest.mark.parametrize("fecha_refresco", ["2024-02-01", "2024-03-15"])
+def test_extraccion_incremental(hechos, fecha_refresco):
+    fecha_refresco = pd.Timestamp(fecha_refresco)
+    completo = paso.extract_intervalos_dw()
+    esperado = completo[completo["Fin"] > fecha_refresco]
+
+    obtenido = paso.extract_intervalos_dw(fecha_refresco)
+
+    assert 0 < len(obtenido) < len(completo)
+    pd.testing.assert_frame_equal(_ordenar(esperado), _ordenar(obtenido))
+
+def _ocupacion_fuerza_bruta(mensajero, inicio, fin):
+    """
+    Servicios activos de cada mensajero en cada minuto, intervalo por intervalo.
+    """
+    minutos = np.arange(inicio.min(), fin.max())
+    activos = pd.DataFrame({m: ((mensajero == m)[:, None] & (inicio[:, None] <= minutos) & (minutos < fin[:, None])).sum(axis=0)
+                            for m in np.unique(mensajero)}, index=minutos)
+    return activos
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_barrido_contra_fuerza_bruta(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    mensajero = rng.integers(1, 8, n)
+    inicio = rng.integers(0, 600, n)
+    # Incluye intervalos vacíos (fin == inicio), que no cuentan
+    fin = inicio + rng.integers(0, 180, n)
+    activos = _ocupacion_fuerza_bruta(mensajero, inicio, fin)
+
+    m, desde, hasta, concurrencia = calcular_segmentos(mensajero, inicio, fin)
+    por_minuto = ocupacion_por_minuto(desde, hasta, concurrencia).set_index("Minuto")
+    ocupados = activos[activos.sum(axis=1) > 0]
+    assert por_minuto.index.tolist() == ocupados.index.tolist()
+    assert por_minuto["Servicios_Activos"].tolist() == ocupados.sum(axis=1).tolist()
+    assert por_minuto["Mensajeros_Ocupados"].tolist() == (ocupados > 0).sum(axis=1).tolist()
+
+    por_hora = ocupacion_por_hora(m, desde, hasta, concurrencia).set_index(["Mensajero_Key", "Hora"])
+    esperado = activos.rename_axis(index="Minuto", columns="Mensajero_Key").stack().rename("Activos").reset_index()
+    esperado = esperado[esperado["Activos"] > 0].assign(Hora=lambda df: df["Minuto"] // 60)
+    esperado = esperado.groupby(["Mensajero_Key", "Hora"]).agg(
+        Minutos_Ocupado=("Activos", "size"),
+        Servicios_Activos_Max=("Activos", "max"),
+        Servicios_Activos_Promedio=("Activos", lambda a: a.sum() / 60)
+    )
+    pd.testing.assert_frame_equal(por_hora[esperado.columns], esperado, check_dtype=False)
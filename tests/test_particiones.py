@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import pandas as pd
+import pytest
+from src import benchmarks
+from src.utils import db_connections, snapshots
+from src.utils.dictionaries import encode_values
+from src.utils.partitions import (
+    CLAVE_DIRECCION, FACT_TABLE, VALOR_DIRECCION, compact_partitions, connect_dw, get_partitions_dir,
+    list_partitions, max_partition_files, write_partition
+)
+
+MESES = 4
+CONTEO = f'SELECT COUNT(*), SUM("Servicio_Estado_Key") FROM "{FACT_TABLE}"'
+
+@pytest.fixture
+def dw(tmp_path):
+    """
+    DW temporal con las dimensiones sintéticas de benchmarks y MESES meses de la
+    tabla de hechos sintética, una partición mensual por archivo.
+    """
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        engine_dw = db_connections.get_dw_engine()
+        benchmarks._dimensiones_sinteticas(engine_dw)
+        df = _hechos(engine_dw, benchmarks.hechos_sinteticos(800, meses=MESES, seed=7))
+        for periodo, df_periodo in df.groupby("Periodo"):
+            _escribir(df_periodo, periodo, engine_dw)
+        yield df
+    finally:
+        snapshots.discard_staging()
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _hechos(engine_dw, df):
+    """
+    Resuelve Fecha_Key contra Dim_Fecha y agrega el periodo de cada fila.
+    """
+    df_fecha = pd.read_sql('SELECT "Fecha_Key", "Fecha_Completa" FROM "Dim_Fecha"', engine_dw)
+    claves = dict(zip(pd.to_datetime(df_fecha["Fecha_Completa"]), df_fecha["Fecha_Key"]))
+    df["Fecha_Key"] = df["Timestamp_Estado"].dt.normalize().map(claves)
+    df["Periodo"] = df["Timestamp_Estado"].dt.strftime("%Y-%m")
+    return df
+
+def _escribir(df, periodo, engine_dw):
+    df = df.drop(columns="Periodo").assign(**{CLAVE_DIRECCION: encode_values(df[VALOR_DIRECCION], engine_dw)})
+    write_partition(df, periodo, engine_dw)
+
+def _consultar(sql=CONTEO, **kwargs):
+    connection = connect_dw(**kwargs)
+    try:
+        return connection.execute(sql).fetchall()
+    finally:
+        connection.close()
+
+def _conteo(df):
+    return [(len(df), int(df["Servicio_Estado_Key"].sum()))]
+
+def _archivos_en_disco():
+    return sorted(a for a in os.listdir(get_partitions_dir()) if a.endswith(".db"))
+
+def _recargar(df, periodo, filas):
+    """
+    Recarga un periodo con sus primeras 'filas' filas en un staging y devuelve
+    las filas esperadas del DW después de la recarga.
+    """
+    staging = snapshots.prepare_staging()
+    df_periodo = df[df["Periodo"] == periodo].head(filas)
+    _escribir(df_periodo, periodo, db_connections.get_dw_engine())
+    return staging, pd.concat([df[df["Periodo"] != periodo], df_periodo])
+
+def test_recarga_de_un_mes(dw):
+    periodo = sorted(dw["Periodo"].unique())[1]
+    antes = list_partitions(db_connections.get_dw_engine()).set_index("Periodo")
+
+    staging, esperado = _recargar(dw, periodo, 10)
+    despues = list_partitions(db_connections.get_dw_engine()).set_index("Periodo")
+    assert despues.loc[periodo, "Filas"] == 10
+    otros = antes.index != periodo
+    pd.testing.assert_frame_equal(despues.loc[otros, ["Archivo", "Filas"]], antes.loc[otros, ["Archivo", "Filas"]])
+
+    # El DW publicado no ve la recarga hasta la promoción
+    db_connections.set_staging_path(None)
+    assert _consultar() == _conteo(dw)
+    db_connections.set_staging_path(staging)
+    assert _consultar() == _conteo(esperado)
+
+    snapshots.promote_staging(staging)
+    assert _consultar() == _conteo(esperado)
+    assert snapshots.validate_staging(db_connections.DW_PATH) == []
+
+def test_recarga_tras_compactar(dw):
+    engine_dw = db_connections.get_dw_engine()
+    assert compact_partitions(engine_dw, limite=1) > 0
+    compactado = list_partitions(engine_dw)["Archivo"].unique()
+    assert len(compactado) == 1
+    assert _consultar() == _conteo(dw)
+
+    periodo = sorted(dw["Periodo"].unique())[2]
+    archivos = _archivos_en_disco()
+    staging, esperado = _recargar(dw, periodo, 10)
+
+    # El mes recargado vive en el mismo archivo compactado con otra etiqueta
+    catalogo = list_partitions(db_connections.get_dw_engine()).set_index("Periodo")
+    assert catalogo["Archivo"].unique().tolist() == compactado.tolist()
+    assert catalogo.loc[periodo, "Etiqueta"].startswith(periodo)
+    assert _archivos_en_disco() == archivos
+
+    db_connections.set_staging_path(None)
+    assert _consultar() == _conteo(dw)
+    db_connections.set_staging_path(staging)
+
+    snapshots.promote_staging(staging)
+    assert _consultar() == _conteo(esperado)
+    assert snapshots.validate_staging(db_connections.DW_PATH) == []
+
+def test_rollback_restaura_el_catalogo(dw):
+    engine_dw = db_connections.get_dw_engine()
+    compact_partitions(engine_dw, limite=1)
+    snapshots.promote_staging(snapshots.prepare_staging())
+    catalogo = list_partitions(db_connections.get_dw_engine())
+
+    periodo = sorted(dw["Periodo"].unique())[0]
+    staging, esperado = _recargar(dw, periodo, 5)
+    snapshots.promote_staging(staging)
+    assert _consultar() == _conteo(esperado)
+
+    snapshots.rollback()
+    db_connections.dispose_engines()
+    columnas = ["Periodo", "Archivo", "Filas", "Etiqueta"]
+    pd.testing.assert_frame_equal(list_partitions(db_connections.get_dw_engine())[columnas], catalogo[columnas])
+    assert _consultar() == _conteo(dw)
+    assert snapshots.validate_staging(db_connections.DW_PATH) == []
+
+def test_recoleccion_borra_versiones_sin_referencias(dw):
+    compact_partitions(db_connections.get_dw_engine(), limite=1)
+    periodo = sorted(dw["Periodo"].unique())[1]
+    staging, esperado = _recargar(dw, periodo, 10)
+    snapshots.promote_staging(staging)
+    archivo = list_partitions(db_connections.get_dw_engine())["Archivo"].iloc[0]
+
+    def etiquetas():
+        connection = sqlite3.connect(os.path.join(get_partitions_dir(), archivo))
+        try:
+            return {e for (e,) in connection.execute(f'SELECT DISTINCT "Periodo" FROM "{FACT_TABLE}"') if e.startswith(periodo)}
+        finally:
+            connection.close()
+
+    # La instantánea retenida todavía lee la versión anterior del periodo
+    assert len(etiquetas()) == 2
+    snapshots.collect_partitions(gracia=0)
+    assert len(etiquetas()) == 2
+
+    snapshots.prune_snapshots(0)
+    snapshots.collect_partitions(gracia=0)
+    assert len(etiquetas()) == 1
+    assert _archivos_en_disco() == [archivo]
+    assert _consultar() == _conteo(esperado)
+    assert snapshots.validate_staging(db_connections.DW_PATH) == []
+
+def test_limite_de_archivos_adjuntos(dw):
+    engine_dw = db_connections.get_dw_engine()
+    limite = max_partition_files()
+    extra = _hechos(engine_dw, benchmarks.hechos_sinteticos(50 * (limite + 1), meses=limite + 1, seed=8))
+    for periodo, df_periodo in extra.groupby("Periodo"):
+        _escribir(df_periodo, periodo, engine_dw)
+    assert list_partitions(engine_dw)["Archivo"].nunique() > limite
+
+    with pytest.raises(RuntimeError, match="Compacte el catálogo"):
+        connect_dw()
+
+    # Poda de particiones: un rango de un mes adjunta solo el archivo de ese mes
+    mes = list_partitions(engine_dw).iloc[0]
+    connection = connect_dw(int(mes["Fecha_Key_Min"]), int(mes["Fecha_Key_Max"]))
+    try:
+        assert list(connection.contexto["archivos"]) == [mes["Archivo"]]
+        assert connection.execute(f'SELECT COUNT(*) FROM "{FACT_TABLE}"').fetchone()[0] == mes["Filas"]
+    finally:
+        connection.close()
+
+    compact_partitions(engine_dw)
+    assert list_partitions(engine_dw)["Archivo"].nunique() <= limite
+    # Los meses que ya existían se reemplazaron
+    assert _consultar() == _conteo(extra)
+
+def test_diccionario_estable(dw):
+    engine_dw = db_connections.get_dw_engine()
+    valores = pd.Series(["Calle 1", None, "Calle 2", "Calle 1"])
+    claves = encode_values(valores, engine_dw)
+    assert pd.isna(claves[1]) and claves[0] == claves[3] and claves[0] != claves[2]
+
+    # Los valores ya codificados conservan su clave y los nuevos reciben otra
+    nuevas = encode_values(pd.Series(["Calle nueva", "Calle 2"]), engine_dw)
+    assert nuevas[1] == claves[2]
+    assert nuevas[0] not in set(claves.dropna())
+
+    # La vista decodificada devuelve el texto original
+    decodificado = _consultar(f'SELECT "{VALOR_DIRECCION}" FROM "{FACT_TABLE}" ORDER BY "Servicio_Estado_Key"')
+    esperado = dw.sort_values("Servicio_Estado_Key")[VALOR_DIRECCION]
+    assert [v for (v,) in decodificado] == esperado.astype(object).where(esperado.notna(), None).tolist()
@@ -0,0 +1,66 @@
+import sqlite3
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.analysis.query_cache import QueryCache
+from src.utils import db_connections
+from src.utils.etl_runs import new_run_id, record_run
+from src.utils.partitions import connect_dw
+
+CONSULTA = 'SELECT COUNT(*) AS n FROM "Dim_Cliente"'
+
+@pytest.fixture
+def dw(tmp_path):
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        engine_dw = db_connections.get_dw_engine()
+        pd.DataFrame({"Cliente_Key": [1, 2], "Cliente_ID_Operacional": [10, 20]}).to_sql("Dim_Cliente", engine_dw, index=False)
+        record_run(engine_dw, new_run_id(), datetime.now(), ["03_dim_cliente"], [])
+        yield engine_dw
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _consultar(cache):
+    connection = connect_dw()
+    try:
+        return int(cache.query(CONSULTA, connection)["n"].iloc[0])
+    finally:
+        connection.close()
+
+def _agregar_cliente():
+    connection = sqlite3.connect(db_connections.DW_PATH)
+    try:
+        with connection:
+            connection.execute('INSERT INTO "Dim_Cliente" VALUES (3, 30)')
+    finally:
+        connection.close()
+
+def test_invalidacion_al_registrar_una_ejecucion(dw, tmp_path):
+    cache = QueryCache(directorio=str(tmp_path / "cache"))
+    assert _consultar(cache) == 2
+    assert _consultar(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Sin una ejecución registrada la versión de carga no cambia
+    _agregar_cliente()
+    assert _consultar(cache) == 2
+
+    record_run(dw, new_run_id(), datetime.now(), ["03_dim_cliente"], [])
+    assert _consultar(cache) == 3
+    assert cache.invalidations == 1
+    assert cache.stats()["entradas"] == 1
+
+def test_directorio_compartido_entre_instancias(dw, tmp_path):
+    directorio = str(tmp_path / "cache")
+    assert _consultar(QueryCache(directorio=directorio)) == 2
+
+    otra = QueryCache(directorio=directorio)
+    assert _consultar(otra) == 2
+    assert otra.hits == 1
+
+    record_run(dw, new_run_id(), datetime.now(), ["03_dim_cliente"], [])
+    _agregar_cliente()
+    assert _consultar(QueryCache(directorio=directorio)) == 3
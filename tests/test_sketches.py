@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analysis.sketches import (
+    PRECISION, UMBRAL_EXACTO, rollup_servicios, sketches_por_grupo, unir_sketches
+)
+
+CELDA = ["Fecha_Key", "Cliente_Key", "Mensajero_Key"]
+
+def _eventos(servicios, seed):
+    """
+    Eventos con 1 a 3 filas por servicio y claves de celda con nulos (mensajero sin asignar).
+    """
+    rng = np.random.default_rng(seed)
+    filas = rng.integers(1, 4, servicios)
+    df = pd.DataFrame({
+        "Servicio_ID_Operacional": np.repeat(rng.permutation(servicios * 3)[:servicios], filas),
+        "Fecha_Key": rng.integers(1, 60, filas.sum()),
+        "Cliente_Key": rng.integers(1, 12, filas.sum()),
+        "Mensajero_Key": rng.integers(1, 40, filas.sum()).astype(float)
+    })
+    df.loc[rng.random(len(df)) < 0.05, "Mensajero_Key"] = np.nan
+    return df
+
+def _esperado(df, por):
+    if not por:
+        return pd.DataFrame({"Total_Servicios": [df["Servicio_ID_Operacional"].nunique()]})
+    return df.groupby(por, dropna=False, sort=True)["Servicio_ID_Operacional"].nunique() \
+        .rename("Total_Servicios").reset_index()
+
+@pytest.mark.parametrize("por", [[], ["Cliente_Key"], ["Mensajero_Key"], ["Cliente_Key", "Fecha_Key"]])
+def test_rollup_exacto_igual_a_nunique(por):
+    df = _eventos(20000, seed=11)
+    sketches = sketches_por_grupo(df, CELDA, "Servicio_ID_Operacional", modo="exacto")
+
+    obtenido = rollup_servicios(sketches, por)
+
+    assert (obtenido["Error_Relativo"] == 0).all()
+    pd.testing.assert_frame_equal(obtenido[por + ["Total_Servicios"]], _esperado(df, por), check_dtype=False)
+
+def _sketches_por_dia(df):
+    """
+    Sketches HLL por día (celdas con más de UMBRAL_EXACTO servicios) y la semana de cada día.
+    """
+    sketches = sketches_por_grupo(df, ["Fecha_Key"], "Servicio_ID_Operacional", modo="hll", precision=PRECISION)
+    return sketches.assign(Semana=sketches["Fecha_Key"] // 7)
+
+def test_rollup_igual_a_unir_sketches():
+    df = _eventos(60000, seed=12)
+    sketches = _sketches_por_dia(df)
+    assert (sketches["Servicios"] > UMBRAL_EXACTO).all()
+
+    obtenido = rollup_servicios(sketches, ["Semana"]).set_index("Semana")
+
+    for semana, grupo in sketches.groupby("Semana"):
+        union = unir_sketches(grupo["Sketch"])
+        assert obtenido.loc[semana, "Total_Servicios"] == round(union.cardinalidad())
+        assert obtenido.loc[semana, "Error_Relativo"] == union.error_relativo()
+
+def test_rollup_hll_dentro_del_error():
+    df = _eventos(60000, seed=13)
+    sketches = _sketches_por_dia(df)
+    esperado = df.assign(Semana=df["Fecha_Key"] // 7).groupby("Semana")["Servicio_ID_Operacional"].nunique()
+
+    obtenido = rollup_servicios(sketches, ["Semana"]).set_index("Semana")
+
+    assert (obtenido["Error_Relativo"] > 0).all()
+    error = (obtenido["Total_Servicios"] - esperado).abs() / esperado
+    assert (error <= 4 * obtenido["Error_Relativo"]).all()
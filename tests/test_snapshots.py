@@ -0,0 +1,48 @@
+import sqlite3
+import subprocess
+import sys
+import pytest
+from src.utils import db_connections, snapshots
+
+# Intenta preparar el staging del mismo DW desde otro proceso
+OTRO_PROCESO = """
+import sys
+from src.utils import db_connections, snapshots
+db_connections.DW_PATH = sys.argv[1]
+try:
+    snapshots.prepare_staging()
+except RuntimeError:
+    sys.exit(3)
+snapshots.discard_staging()
+"""
+
+@pytest.fixture
+def dw(tmp_path):
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    connection = sqlite3.connect(db_connections.DW_PATH)
+    connection.execute("CREATE TABLE t (x INTEGER)")
+    connection.close()
+    try:
+        yield db_connections.DW_PATH
+    finally:
+        snapshots.discard_staging()
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _otro_proceso(dw_path):
+    return subprocess.run([sys.executable, "-c", OTRO_PROCESO, dw_path], capture_output=True).returncode
+
+def test_staging_exclusivo_entre_procesos(dw):
+    staging = snapshots.prepare_staging()
+
+    assert _otro_proceso(dw) == 3
+    # El intento fallido no toca el staging de esta carga
+    assert db_connections.get_dw_path() == staging
+    connection = sqlite3.connect(staging)
+    assert connection.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    connection.close()
+
+    snapshots.discard_staging()
+    assert _otro_proceso(dw) == 0
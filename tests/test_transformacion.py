@@ -0,0 +1,88 @@
+import importlib
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src import benchmarks
+from src.utils import db_connections
+
+pytest.importorskip("polars")
+
+paso = importlib.import_module(".etl.10_fact_cambio_estado_servicio", package="src")
+
+# Servicios de la extracción sintética: suficientes para que aparezcan todos los casos de nulos
+SERVICIOS = 3000
+
+@pytest.fixture(scope="module")
+def engine_dw(tmp_path_factory):
+    """
+    DW temporal con las dimensiones sintéticas de benchmarks (ids operacionales
+    distintos de las claves; la sede 1400, la ciudad 30 y el mensajero 5499 no existen).
+    """
+    dw_path = db_connections.DW_PATH
+    db_connections.DW_PATH = str(tmp_path_factory.mktemp("dw") / "DW_FastAndSafe.db")
+    db_connections.set_staging_path(None)
+    try:
+        benchmarks._dimensiones_sinteticas(db_connections.get_dw_engine())
+        yield db_connections.get_dw_engine()
+    finally:
+        db_connections.dispose_engines()
+        db_connections.DW_PATH = dw_path
+
+def _extraccion(origen):
+    """
+    Extracción sintética como la entrega cada backend de extracción: 'arrow'
+    (pd.ArrowDtype) o 'numpy' (fechas y horas como objetos, enteros con nulos en float64).
+    """
+    df = benchmarks.extraccion_sintetica(SERVICIOS, seed=7)
+    if origen == "numpy":
+        df = pa.Table.from_pandas(df, preserve_index=False).to_pandas()
+    return df
+
+@pytest.mark.parametrize("origen", ["arrow", "numpy"])
+def test_backends_producen_el_mismo_hecho(engine_dw, origen):
+    df_oltp = _extraccion(origen)
+    # La extracción debe incluir los casos que ejercitan los lookups
+    assert df_oltp["fecha"].isna().any()
+    assert df_oltp["Direccion_Destino"].isna().any()
+    for columna in ("Sede_Origen_ID", "mensajero_id", "Tipo_Novedad_ID"):
+        assert df_oltp[columna].isna().any()
+    assert (df_oltp["Sede_Origen_ID"] == 1400).any()
+    assert (df_oltp["mensajero_id"] == 5499).any()
+    assert (df_oltp["Geografia_Destino_ID"] == 30).any()
+
+    esperado = paso.transform_fact_table(df_oltp.copy(), engine_dw, backend="pandas")
+    obtenido = paso.transform_fact_table(df_oltp.copy(), engine_dw, backend="polars")
+
+    pd.testing.assert_frame_equal(esperado, obtenido)
+
+@pytest.mark.parametrize("backend", ["pandas", "polars"])
+def test_claves_por_defecto(engine_dw, backend):
+    df_oltp = _extraccion("arrow")
+    df_fact = paso.transform_fact_table(df_oltp.copy(), engine_dw, backend=backend)
+
+    assert len(df_fact) == len(df_oltp)
+    assert (df_fact["Servicio_Estado_Key"].to_numpy() == df_oltp["Servicio_Estado_ID"].to_numpy()).all()
+
+    sin_fecha = df_oltp["fecha"].isna().to_numpy()
+    assert df_fact.loc[sin_fecha, "Fecha_Key"].isna().all()
+    assert df_fact.loc[sin_fecha, "Timestamp_Estado"].isna().all()
+    assert df_fact.loc[~sin_fecha, "Fecha_Key"].notna().all()
+
+    sin_sede = (df_oltp["Sede_Origen_ID"].isna() | (df_oltp["Sede_Origen_ID"] == 1400)).to_numpy()
+    assert df_fact.loc[sin_sede, "Sede_Origen_Key"].isna().all()
+    assert df_fact.loc[~sin_sede, "Sede_Origen_Key"].notna().all()
+    sin_ciudad = (df_oltp["Geografia_Destino_ID"] == 30).to_numpy()
+    assert df_fact.loc[sin_ciudad, "Geografia_Destino_Key"].isna().all()
+
+    sin_mensajero = (df_oltp["mensajero_id"].isna() | (df_oltp["mensajero_id"] == 5499)).to_numpy()
+    assert (df_fact.loc[sin_mensajero, "Mensajero_Key"] == -1).all()
+    assert (df_fact.loc[~sin_mensajero, "Mensajero_Key"] > 0).all()
+
+    sin_novedad_key = paso.novedad_sin_novedad(paso.cargar_dimensiones_lookup(engine_dw)["Dim_Novedad"])
+    sin_novedad = df_oltp["Tipo_Novedad_ID"].isna().to_numpy()
+    assert (df_fact.loc[sin_novedad, "Novedad_Key"] == sin_novedad_key).all()
+    assert (df_fact.loc[~sin_novedad, "Novedad_Key"] != sin_novedad_key).all()
+
+    sin_direccion = df_oltp["Direccion_Destino"].isna().to_numpy()
+    assert df_fact.loc[sin_direccion, "Direccion_Destino_Key"].isna().all()
+    assert df_fact.loc[~sin_direccion, "Direccion_Destino_Key"].notna().all()